@@ -3,6 +3,7 @@ from app.api.product.routes import router as product_router
 from app.api.analysis.routes import router as analysis_router
 from app.api.public.routes import router as public_router
 from app.api.private.routes import router as private_router
+from app.api.metrics.routes import router as metrics_router
 
 __all__ = [
     "auth_router",
@@ -10,4 +11,5 @@ __all__ = [
     "analysis_router",
     "public_router",
     "private_router",
+    "metrics_router",
 ]
\ No newline at end of file
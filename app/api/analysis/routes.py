@@ -11,11 +11,19 @@ from sqlalchemy import func # For count
 from typing import List, Optional, Any # Added Any
 
 from app.templates import templates
+from app.core.responses import FastJSONResponse
 from app.api.auth.dependencies import get_current_user
 from app.database.session import get_db # This now provides AsyncSession
 from app.models import User, Product, Promt, Review
-from app.services.openai_service import analyze_reviews
+from app.services.ai_usage import usage_summary
+from app.services.analysis_jobs import get_job, job_history, runner as analysis_runner, submit_job, wait_for_job
 from app.services.review_service import add_review, add_review_to_session, update_review, delete_review, delete_all_reviews_for_product # These are now async
+from app.services.review_service import bulk_update_reviews, bulk_delete_reviews
+from app.services.review_export import EXPORT_FORMATS, export_reviews_response
+from app.schemas.review import ReviewBulkSelection, ReviewBulkUpdate, ReviewFilters
+from app.utils.converters import parse_str
+from app.database.versions import bump_version, get_versions_token
+from app.utils.http_cache import data_etag, not_modified, cache_headers
 from app.utils.permissions import check_object_permission
 from app.utils.security import ensure_csrf_token, csrf_protect, template_with_csrf
 from app.utils.query_params import extract_analyze_filters, extract_dashboard_return_params_clean, AnalyzeFilters
@@ -95,6 +103,7 @@ async def analyze_product_page(
     promts_stmt = select(Promt)
     promts_result = await db.execute(promts_stmt)
     promts = promts_result.scalars().all()
+    fragment_versions = await get_versions_token(db, [("promts", None)])
 
     # Extract dashboard return parameters
     dashboard_return_params = await extract_dashboard_return_params_clean(request)
@@ -119,11 +128,12 @@ async def analyze_product_page(
         "total_pages": total_pages,
         "return_params": dashboard_return_params,
         "return_params_str": return_params_str,
+        "fragment_versions": fragment_versions,
     }
     return template_with_csrf(request, templates, "analyze_product.html", context)
 
 
-@router.get("/analyze/data", response_class=JSONResponse, name="analyze_product_data")
+@router.get("/analyze/data", response_class=FastJSONResponse, name="analyze_product_data")
 async def analyze_product_data(
     request: Request,  # Добавляем request для отладки
     db: AsyncSession = Depends(get_db),
@@ -139,6 +149,8 @@ async def analyze_product_data(
     text = query_params.get("text", "")
     advantages = query_params.get("advantages", "")
     disadvantages = query_params.get("disadvantages", "")
+    sentiment_min = query_params.get("sentiment_min", "")
+    sentiment_max = query_params.get("sentiment_max", "")
     sort_by = query_params.get("sort_by", "id")
     sort_dir = query_params.get("sort_dir", "asc")
     
@@ -154,6 +166,11 @@ async def analyze_product_data(
     if not user.is_superuser:
         review_stmt = review_stmt.filter(Review.user_id == user.id)
 
+    etag = await data_etag(db, request, user, [("reviews", product_id)])
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
     if importance and importance != "":
         try:
             importance_int = int(importance)
@@ -168,6 +185,13 @@ async def analyze_product_data(
         review_stmt = review_stmt.filter(Review.advantages.ilike(f"%{advantages}%"))
     if disadvantages and disadvantages != "":
         review_stmt = review_stmt.filter(Review.disadvantages.ilike(f"%{disadvantages}%"))
+    try:
+        if sentiment_min != "":
+            review_stmt = review_stmt.filter(Review.sentiment >= float(sentiment_min))
+        if sentiment_max != "":
+            review_stmt = review_stmt.filter(Review.sentiment <= float(sentiment_max))
+    except ValueError:
+        pass  # Игнорируем невалидные значения
 
     sortable_fields = {
         "id": Review.id,
@@ -176,7 +200,8 @@ async def analyze_product_data(
         "text": Review.text,
         "advantages": Review.advantages,
         "disadvantages": Review.disadvantages,
-        "normalized_rating": Review.normalized_rating
+        "normalized_rating": Review.normalized_rating,
+        "sentiment": Review.sentiment,
     }
 
     sort_field = sortable_fields.get(sort_by, Review.id)
@@ -194,16 +219,37 @@ async def analyze_product_data(
     reviews_result = await db.execute(paginated_stmt)
     reviews = reviews_result.scalars().all()
 
-    return {
+    return FastJSONResponse({
         "items": [p.to_dict() for p in reviews], # to_dict() methods on models are synchronous
         "total": total_reviews,
         "page": page,
         "limit": limit,
         "total_pages": total_pages
-    }
+    }, headers=cache_headers(etag))
+
+
+@router.get("/api/review/export/{product_id}", name="export_reviews")
+async def export_reviews(
+    product_id: int,
+    format: str = Query("csv"),
+    filters: ReviewFilters = Depends(), # same query parameters as /analyze/data
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=422, detail=f"Неизвестный формат: {format}. Доступны: {', '.join(EXPORT_FORMATS)}")
 
+    product_result = await db.execute(select(Product).filter(Product.id == product_id))
+    product = product_result.scalar_one_or_none()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    check_object_permission(product, user)
 
-@router.post("/analyze/{product_id}")
+    # Rows are streamed from a server-side cursor while the response is being sent
+    return export_reviews_response(db, product_id, None if user.is_superuser else user.id, format, filters)
+
+
+@router.post("/analyze/{product_id}", status_code=202)
 async def analyze_product(
     product_id: int,
     filters: AnalyzeFilters = Body(...), # Assuming AnalyzeFilters is a Pydantic model
@@ -211,30 +257,7 @@ async def analyze_product(
     _: None = Depends(csrf_protect), # Assuming csrf_protect is async or compatible
     db: AsyncSession = Depends(get_db)
 ):
-    review_stmt = select(Review).filter(Review.product_id == product_id)
-    if not user.is_superuser:
-        review_stmt = review_stmt.filter(Review.user_id == user.id)
-
-    promt_id = filters.promt_id
-
-    if filters.importance is not None:
-        review_stmt = review_stmt.filter(Review.importance == filters.importance)
-    if filters.source:
-        review_stmt = review_stmt.filter(Review.source.ilike(f"%{filters.source}%"))
-    if filters.text:
-        review_stmt = review_stmt.filter(Review.text.ilike(f"%{filters.text}%"))
-    if filters.advantages:
-        review_stmt = review_stmt.filter(Review.advantages.ilike(f"%{filters.advantages}%"))
-    if filters.disadvantages:
-        review_stmt = review_stmt.filter(Review.disadvantages.ilike(f"%{filters.disadvantages}%"))
-    if filters.normalized_rating_min is not None:
-        review_stmt = review_stmt.filter(Review.normalized_rating >= filters.normalized_rating_min)
-    if filters.normalized_rating_max is not None:
-        review_stmt = review_stmt.filter(Review.normalized_rating <= filters.normalized_rating_max)
-
-    reviews_result = await db.execute(review_stmt)
-    reviews = reviews_result.scalars().all()
-
+    """Ставит анализ в очередь и сразу возвращает id задачи; результат — GET /analyze/jobs/{job_id}."""
     product_stmt = select(Product).filter(Product.id == product_id)
     product_result = await db.execute(product_stmt)
     product = product_result.scalar_one_or_none()
@@ -243,21 +266,62 @@ async def analyze_product(
         raise HTTPException(status_code=404, detail="Product not found for analysis")
     check_object_permission(product, user) # Sync call
 
-    structured_reviews = [{
-        "importance": r.importance or 100, # Defaulting if None
-        "source": r.source or "неизвестно",
-        "text": r.text or "",
-        "advantages": r.advantages or "",
-        "disadvantages": r.disadvantages or "",
-        "rating": r.normalized_rating if r.normalized_rating is not None else "нет оценки"
-    } for r in reviews]
+    job = await submit_job(db, product, user, filters)
+    await db.commit() # workers read the job from their own sessions
+    analysis_runner.enqueue(job.id)
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.get("/analyze/jobs/{job_id}", response_class=FastJSONResponse, name="analysis_job")
+async def get_analysis_job(
+    job_id: int,
+    wait: float = Query(0, ge=0, le=30), # long-poll: seconds to wait for the job to finish
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    job = await get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    product = await db.get(Product, job.product_id)
+    check_object_permission(product, user)
+
+    if wait and not job.finished:
+        job = await wait_for_job(db, job_id, wait)
+    return FastJSONResponse(job.to_dict())
+
 
-    # analyze_reviews service is already async and takes db session
-    analysis_result_str = await analyze_reviews(structured_reviews, promt_id=promt_id, db=db)
-    return {"result": analysis_result_str}
+@router.get("/analyze/{product_id}/jobs", response_class=FastJSONResponse, name="analysis_history")
+async def get_analysis_history(
+    product_id: int,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    product = await db.get(Product, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    check_object_permission(product, user)
+
+    jobs = await job_history(db, product_id)
+    return FastJSONResponse({"items": [job.to_dict() for job in jobs]})
 
 
-@router.post("/parse-reviews-file/{product_id}", name="parse_reviews_file")
+@router.get("/api/ai/usage", response_class=FastJSONResponse, name="ai_usage")
+async def get_ai_usage(
+    group_by: str = Query("product", pattern="^(user|product|promt|model)$"),
+    days: int = Query(30, ge=1, le=366),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Суперпользователь видит расход всех пользователей, остальные — только свой
+    items = await usage_summary(db, group_by, days, None if user.is_superuser else user)
+    totals = {
+        field: sum(item[field] or 0 for item in items)
+        for field in ("calls", "prompt_tokens", "completion_tokens", "reviews_sent", "reviews_dropped", "cost")
+    }
+    return FastJSONResponse({"group_by": group_by, "days": days, "items": items, "totals": totals})
+
+
+@router.post("/parse-reviews-file/{product_id}", response_class=FastJSONResponse, name="parse_reviews_file")
 async def parse_reviews_file(
     request: Request, # Not used directly, but often kept for context or future use
     product_id: int,
@@ -282,6 +346,8 @@ async def parse_reviews_file(
             review = await add_review_to_session(db, product_id, user.id, review_dict)
 
             added_reviews_objects.append(review)
+        # add_review_to_session не трогает версии — одна отметка на весь файл
+        await bump_version(db, "reviews", product_id)
             
     except Exception as e:
         await db.rollback()
@@ -300,7 +366,7 @@ async def parse_reviews_file(
     total_reviews_result = await db.execute(count_stmt)
     total_reviews = total_reviews_result.scalar_one()
     
-    return {
+    return FastJSONResponse({
         "status": "ok",
         "items": result_items, # to_dict() is sync
         "success_count": parsed_result["success_count"],
@@ -308,7 +374,7 @@ async def parse_reviews_file(
         "empty_rows": parsed_result["empty_rows"],
         "errors": parsed_result["errors"],
         "total": total_reviews
-    }
+    })
 
 
 @router.post("/api/review/{product_id}/add", name="add_review_item")
@@ -339,6 +405,51 @@ async def add_review_item(
     return {"status": "ok", "id": review.id}
 
 
+async def get_bulk_product(db: AsyncSession, product_id: int, user: User) -> Product:
+    """Товар массовой операции: 404, если его нет, 403 — если он чужой (как у выгрузки и анализа)."""
+    product = await db.get(Product, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    check_object_permission(product, user)
+    return product
+
+
+@router.post("/api/review/bulk/update", name="bulk_update_review_items")
+async def bulk_update_review_items(
+    body: ReviewBulkUpdate,
+    user: User = Depends(get_current_user),
+    _: None = Depends(csrf_protect),
+    db: AsyncSession = Depends(get_db)
+):
+    await get_bulk_product(db, body.product_id, user)
+    # Set-based UPDATE в одной транзакции вместо запроса на каждый отзыв
+    values = body.values.model_dump(exclude_unset=True)
+    for field in ("source", "text", "advantages", "disadvantages"):
+        if field in values:
+            values[field] = parse_str(values[field]) # same as update_review: None -> ""
+
+    updated = await bulk_update_reviews(
+        db, body.product_id, None if user.is_superuser else user.id, values, ids=body.ids, filters=body.filters
+    )
+    await db.commit()
+    return {"status": "ok", "updated": updated}
+
+
+@router.post("/api/review/bulk/delete", name="bulk_delete_review_items")
+async def bulk_delete_review_items(
+    body: ReviewBulkSelection,
+    user: User = Depends(get_current_user),
+    _: None = Depends(csrf_protect),
+    db: AsyncSession = Depends(get_db)
+):
+    await get_bulk_product(db, body.product_id, user)
+    deleted = await bulk_delete_reviews(
+        db, body.product_id, None if user.is_superuser else user.id, ids=body.ids, filters=body.filters
+    )
+    await db.commit()
+    return {"status": "ok", "deleted": deleted}
+
+
 @router.put("/api/review/{reviewId}/update", name="update_review_item")
 async def update_review_item(
     reviewId: int,
@@ -39,6 +39,8 @@ async def get_current_user( # Changed to async
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
+        # Same place AuthMiddleware uses; read by the profiling middleware
+        request.state.user = user
         return user
 
     except JWTError: # More specific exception handling
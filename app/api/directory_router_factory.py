@@ -39,6 +39,43 @@ def create_directory_router(
         created_item = await crud.create_directory_item(db=db, item_data=item_in, model_class=model, user=current_user)
         return created_item
 
+    def check_names(items: List[BaseModel]) -> None:
+        for index, item in enumerate(items):
+            if not getattr(item, 'name', None) or item.name.isspace():
+                raise HTTPException(status_code=422, detail=f"{model_name} name cannot be empty (item #{index}).")
+
+    # --- Batch endpoints: one transaction per request, ids in input order ---
+
+    @router.post("/batch", status_code=201, dependencies=[Depends(csrf_protect)])
+    async def create_items(
+        items_in: List[create_schema] = Body(...),
+        db: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+    ):
+        check_names(items_in)
+        ids = await crud.create_directory_items(db=db, items=items_in, model_class=model, user=current_user)
+        return {"ids": ids}
+
+    @router.post("/batch/upsert", dependencies=[Depends(csrf_protect)])
+    async def upsert_items(
+        items_in: List[create_schema] = Body(...),
+        db: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+    ):
+        check_names(items_in)
+        ids, created, updated = await crud.upsert_directory_items(db=db, items=items_in, model_class=model, user=current_user)
+        return {"ids": ids, "created": created, "updated": updated}
+
+    @router.post("/batch/delete", dependencies=[Depends(csrf_protect)])
+    async def delete_items(
+        ids: List[int] = Body(..., embed=True),
+        db: AsyncSession = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+    ):
+        # Ids that do not exist or belong to another user are skipped, not a 404
+        deleted = await crud.delete_directory_items(db=db, item_ids=ids, model_class=model, user=current_user)
+        return {"deleted": deleted}
+
     @router.get("/{item_id}", response_model=schema)
     async def get_item(
         item_id: int,
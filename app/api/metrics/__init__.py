@@ -0,0 +1 @@
+from app.api.metrics.routes import router
\ No newline at end of file
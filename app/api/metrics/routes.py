@@ -0,0 +1,26 @@
+import secrets
+
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+
+from app.core import settings
+from app.core import metrics
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False, name="metrics")
+async def metrics_endpoint(request: Request):
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if settings.METRICS_TOKEN:
+        auth_header = request.headers.get("Authorization", "")
+        if not secrets.compare_digest(auth_header, f"Bearer {settings.METRICS_TOKEN}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+    # Reading worker snapshots touches the filesystem, keep it off the event loop
+    body = await run_in_threadpool(metrics.generate_latest)
+    return Response(content=body, media_type=metrics.CONTENT_TYPE_LATEST)
@@ -10,11 +10,14 @@ from typing import Optional, Type, Any
 from pydantic import BaseModel
 
 from app.templates import templates
+from app.core.responses import FastJSONResponse
 from app.database.session import get_db # Provides AsyncSession
+from app.database.versions import get_versions_token
 from app.models import Product, User, Brand, Category, Promt # ProductImage not used here
 from app.api.auth.dependencies import get_current_user # Assumed async compatible
 from app.utils.permissions import check_object_permission # Assumed sync, CPU-bound
 from app.utils.security import csrf_protect, template_with_csrf # ensure_csrf_token not used
+from app.utils.http_cache import data_etag, not_modified, cache_headers
 from app.utils.query_params import extract_dashboard_filters, extract_dashboard_return_params_clean, apply_filters, apply_sorting, paginate # Assumed sync, CPU-bound
 # from app.utils.converters import to_int_or_none # Not directly used, standard int conversion
 
@@ -111,6 +114,8 @@ async def dashboard(
     categories_list = categories_result.scalars().all()
     promts_result = await db.execute(select(Promt).order_by(Promt.name))
     promts_list = promts_result.scalars().all()
+    # Ключ для кешируемых фрагментов с фильтрами (списки брендов/категорий)
+    fragment_versions = await get_versions_token(db, [("brands", None), ("categories", None)])
 
     # Получаем параметры для возврата без дефолтных значений
     return_params = await extract_dashboard_return_params_clean(request)
@@ -136,13 +141,15 @@ async def dashboard(
         "total_pages": total_pages,
         "active_menu": 'dashboard',
         "return_params": return_params,
-        "return_params_str": return_params_str
+        "return_params_str": return_params_str,
+        "fragment_versions": fragment_versions,
     }
     return template_with_csrf(request, templates, "dashboard.html", context)
 
 
-@router.get("/dashboard/data", response_class=JSONResponse, name="dashboard_data")
+@router.get("/dashboard/data", response_class=FastJSONResponse, name="dashboard_data")
 async def dashboard_data(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
     page: int = Query(1, ge=1),
@@ -156,6 +163,17 @@ async def dashboard_data(
     sort_by: str = Query("id", alias="sort_by"),
     sort_dir: str = Query("asc", alias="sort_dir"),
 ):
+    # Названия брендов/категорий/промтов попадают в выдачу, поэтому учитываем их версии целиком
+    etag = await data_etag(db, request, user, [
+        ("products", None if user.is_superuser else user.id),
+        ("brands", None),
+        ("categories", None),
+        ("promts", None),
+    ])
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
     allowed_fields = {
         "id": int,
         "name": str,
@@ -187,33 +205,25 @@ async def dashboard_data(
         else:
             filters["promt_id"] = promt_id
 
-    query = select(Product)
+    # Projection instead of full entities: no Product/ProductImage objects per row
+    query = Product.list_select()
+    count_query = select(Product.id)
     if not user.is_superuser:
         query = query.filter(Product.user_id == user.id)
+        count_query = count_query.filter(Product.user_id == user.id)
     query = apply_filters(query, Product, filters, allowed_fields)
+    count_query = apply_filters(count_query, Product, filters, allowed_fields)
 
-    # Сортировка по связанным моделям (brand/category)
+    # Сортировка по связанным моделям (brand/category) — они уже присоединены в list_select()
     join_map = {"brand": Brand, "category": Category}
     if sort_by in join_map:
-        query = query.outerjoin(getattr(Product, sort_by))
-        allowed_fields[sort_by] = str
-        # Для сортировки по имени бренда/категории
-        def brand_sort(q, col, val):
-            return q.order_by(getattr(join_map[sort_by], "name").desc() if sort_dir == "desc" else getattr(join_map[sort_by], "name").asc())
-        query = brand_sort(query, None, None)
+        sort_column = join_map[sort_by].name
+        query = query.order_by(sort_column.desc() if sort_dir == "desc" else sort_column.asc())
     else:
         query = apply_sorting(query, Product, sort_by, sort_dir, allowed_fields)
 
-    # Eager load relationships needed for to_dict()
-    query = query.options(
-        selectinload(Product.brand),
-        selectinload(Product.category),
-        selectinload(Product.promt),
-        selectinload(Product.images)
-    )
-
-    # Подсчет total до пагинации
-    count_stmt = select(func.count()).select_from(query.subquery())
+    # Подсчет total до пагинации (без join-ов и подзапроса картинки)
+    count_stmt = select(func.count()).select_from(count_query.subquery())
     total_products_result = await db.execute(count_stmt)
     total_products = total_products_result.scalar_one()
     total_pages = math.ceil(total_products / limit) if total_products > 0 else 1
@@ -221,17 +231,17 @@ async def dashboard_data(
     # Пагинация
     query = paginate(query, page, limit)
     products_result = await db.execute(query)
-    products_list = products_result.scalars().all()
+    product_rows = products_result.all()
 
-    return {
-        "items": [p.to_dict() for p in products_list],
+    return FastJSONResponse({
+        "items": [Product.row_to_dict(row) for row in product_rows],
         "total": total_products,
         "page": page,
         "limit": limit,
         "total_pages": total_pages,
         "sort_by": sort_by,
         "sort_dir": sort_dir
-    }
+    }, headers=cache_headers(etag))
 
 
 #  directory
@@ -272,6 +282,7 @@ async def directory_page(
 
     result = await db.execute(stmt)
     items = result.scalars().all()
+    fragment_versions = await get_versions_token(db, [(model_class.__tablename__, None if user.is_superuser else user.id)])
 
     context = {
         "request": request,
@@ -279,7 +290,8 @@ async def directory_page(
         "dict_items": items,
         "dict_type": directory_name, # This is same as directory_name, maybe redundant
         "directory_name": directory_name,
-        "active_menu": directory_name
+        "active_menu": directory_name,
+        "fragment_versions": fragment_versions,
     }
     return template_with_csrf(request, templates, "directory.html", context)
 
@@ -291,7 +303,7 @@ async def directory_page(
 # - POST /directory/{directory_name}/update/{item_id} (update_directory_item_action)
 # - DELETE /directory/{directory_name}/delete/{item_id} (delete_directory_item_action)
 # The associated Pydantic model `DirectoryInput` is also no longer needed here.
-@router.get("/directory/{directory_name}/data", response_class=JSONResponse, name="directory_data")
+@router.get("/directory/{directory_name}/data", response_class=FastJSONResponse, name="directory_data")
 async def directory_data(
     request: Request,
     directory_name: str,
@@ -306,6 +318,11 @@ async def directory_data(
     if not model_class:
         raise HTTPException(status_code=404, detail="Справочник не найден")
 
+    etag = await data_etag(db, request, user, [(model_class.__tablename__, None if user.is_superuser else user.id)])
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
     # Define allowed fields for filtering and sorting for this model
     allowed_fields = {
         "id": int,
@@ -352,7 +369,7 @@ async def directory_data(
     # Convert to a list of dicts. Make sure your models have a to_dict() method.
     items_as_dicts = [item.to_dict(include_user=True) for item in items_list]
 
-    return {
+    return FastJSONResponse({
         "items": items_as_dicts,
         "total": total_items,
         "page": page,
@@ -360,4 +377,4 @@ async def directory_data(
         "total_pages": total_pages,
         "sort_by": sort_by,
         "sort_dir": sort_dir,
-    }
+    }, headers=cache_headers(etag))
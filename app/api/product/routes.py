@@ -1,6 +1,6 @@
 import os
+import tempfile
 import aiofiles # For async file operations if uncommented
-import uuid
 
 from fastapi import APIRouter, Request, Form, Depends, HTTPException, File, UploadFile, Query
 from fastapi.responses import HTMLResponse, JSONResponse # RedirectResponse not used
@@ -10,25 +10,32 @@ from sqlalchemy.orm import selectinload # For eager loading
 from sqlalchemy import update, delete, func # For update and delete statements, func for count
 from sqlalchemy.exc import SQLAlchemyError # Import SQLAlchemyError
 from typing import List, Optional # List not used directly here
+from dataclasses import asdict
 # from fastapi.templating import Jinja2Templates # templates object used directly
 # from datetime import datetime, timedelta, timezone # Not used
 
 from pydantic import ValidationError
 
+from app.core import settings
 from app.templates import templates
 from app.models import User, Product, Brand, Category, Promt, ProductImage
 from app.schemas import ProductCreate, ProductUpdate
 from app.database.session import get_db
 from app.database import crud
+from app.database.versions import bump_version
 from app.api.auth.dependencies import get_current_user
 from app.utils.permissions import check_object_permission
 from app.utils.converters import to_int_or_none
 from app.utils.security import csrf_protect, template_with_csrf
 from app.utils.query_params import extract_dashboard_return_params_clean
+from app.utils.uploads import UPLOAD_DIR, discard_upload, receive_upload
+from app.services.image_store import release_image, store_image
+from app.services.image_variants import build_variants
+from app.services.catalogue import export_catalogue_response, import_catalogue
+from app.utils.export_writers import EXPORT_FORMATS
 
 
 router = APIRouter()
-UPLOAD_DIR = "app/static/uploads" # Ensure this directory exists
 
 
 @router.get("/product/new/form", response_class=HTMLResponse, name="product_new")
@@ -59,6 +66,7 @@ async def product_new_form( # Renamed for clarity
         "categories": categories,
         "promts": promts,
         "main_image_path": None,
+        "main_image_thumb": None,
         "return_params": dashboard_params,
         "return_params_str": return_params_str,
     }
@@ -132,13 +140,15 @@ async def product_page_form( # Renamed for clarity
         raise HTTPException(status_code=404, detail="Продукт не найден")
     check_object_permission(product, user) # Sync call
 
-    main_image_stmt = select(ProductImage).filter(
+    main_image_stmt = select(ProductImage).options(selectinload(ProductImage.variants)).filter(
         ProductImage.product_id == product.id,
         ProductImage.is_main == True
     )
     main_image_result = await db.execute(main_image_stmt)
     main_image = main_image_result.scalar_one_or_none()
     main_image_path = main_image.image_path if main_image else None
+    # Превью 200px: миниатюра вместо оригинала, если она уже есть
+    main_image_thumb = main_image.variant_path(settings.IMAGE_THUMBNAIL_WIDTH, webp=True) if main_image else None
 
     # Fetch brands, categories, and promts applying user-based filtering
     # Using a large limit to effectively get all items for dropdowns
@@ -162,6 +172,7 @@ async def product_page_form( # Renamed for clarity
         "categories": categories,
         "promts": promts,
         "main_image_path": main_image_path,
+        "main_image_thumb": main_image_thumb,
         "return_params": dashboard_params,
         "return_params_str": return_params_str,
     }
@@ -275,19 +286,15 @@ async def save_product(
             ).values(is_main=False)
             await db.execute(update_stmt)
 
-            file_ext = os.path.splitext(main_image.filename)[1]
-            filename = f"{uuid.uuid4().hex}{file_ext}"
-            file_path = os.path.join(UPLOAD_DIR, filename)
-            # Actual file save commented out in original, keep it that way
-            async with aiofiles.open(file_path, "wb") as buffer:
-                content = await main_image.read()
-                await buffer.write(content)
+            received = await receive_upload(main_image, UPLOAD_DIR)
+            filename = await store_image(db, received)
 
             new_img_obj = ProductImage(
                 user_id=user.id, # Assign current user as owner of the image
                 product_id=product.id,
                 image_path=filename,
-                is_main=True
+                is_main=True,
+                variants=await build_variants(filename),
             )
             db.add(new_img_obj)
 
@@ -305,6 +312,8 @@ async def save_product(
         if not product.id: # If still no ID, means it's new and wasn't flushed
             await db.flush([product]) # Ensure new product has ID before potential refresh needs it (though refresh is now after commit)
 
+        await bump_version(db, "products", product.user_id)
+
         # For existing products, changes are in the session. For new products, they are added.
         # Commit first to save changes to the DB.
         await db.commit() # Persist all changes
@@ -377,6 +386,39 @@ async def save_product(
         return JSONResponse({"error": "Internal server error", "details": str(e)}, status_code=500)
 
 
+@router.post("/product/import", name="import_products")
+async def import_products(
+    file: UploadFile = File(...),
+    user: User = Depends(get_current_user),
+    _: None = Depends(csrf_protect),
+    db: AsyncSession = Depends(get_db)
+):
+    """Импорт каталога из CSV / NDJSON / XLSX: товары сопоставляются по EAN, затем UPC, затем по имени."""
+    # Spooled to a private temp file in chunks: 413 as soon as MAX_IMPORT_SIZE is crossed
+    received = await receive_upload(file, tempfile.gettempdir(), settings.MAX_IMPORT_SIZE)
+    try:
+        with open(received.tmp_path, "rb") as fileobj:
+            report = await import_catalogue(db, fileobj, file.filename, user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        await discard_upload(received)
+    await db.commit()
+    return JSONResponse(asdict(report))
+
+
+@router.get("/product/export", name="export_products")
+async def export_products(
+    format: str = Query("csv"),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=422, detail=f"Неизвестный формат: {format}. Доступны: {', '.join(EXPORT_FORMATS)}")
+    # Same columns as the import takes; streamed from a server-side cursor
+    return export_catalogue_response(db, None if user.is_superuser else user.id, format)
+
+
 @router.delete("/product/{product_id}/delete", name="delete_product")
 async def delete_product(
     product_id: int,
@@ -403,12 +445,12 @@ async def delete_product(
     images_result = await db.execute(images_to_delete_stmt)
     images = images_result.scalars().all()
     for img in images:
-        # image_path = os.path.join(UPLOAD_DIR, img.image_path)
-        # if os.path.exists(image_path):
-        #     os.remove(image_path) # This would be sync, use aiofiles.os.remove for async
+        await release_image(db, img.image_path) # the shared file itself is left to the orphan cleanup
         await db.delete(img) # Delete DB record
 
     await db.delete(product)
+    await bump_version(db, "products", product.user_id)
+    await bump_version(db, "reviews", product.id)
     await db.commit() # Must be called to persist changes
     return JSONResponse({"success": True}) # Return JSONResponse for consistency
 
@@ -429,21 +471,19 @@ async def upload_gallery_image(
         raise HTTPException(status_code=404, detail="Продукт не найден для загрузки изображения")
     check_object_permission(product, user)
 
-    file_ext = os.path.splitext(image.filename)[1] if image.filename else ".png" # Default ext
-    filename = f"gallery_{uuid.uuid4().hex}_{image.filename if image.filename else ''}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
-    async with aiofiles.open(file_path, "wb") as buffer:
-        content = await image.read()
-        await buffer.write(content)
+    received = await receive_upload(image, UPLOAD_DIR)
+    filename = await store_image(db, received) # same content -> same shared file
 
     new_image_obj = ProductImage(
         product_id=product.id, # Use product.id
         user_id=user.id, # Assuming uploader is current user
         image_path=filename,
-        is_main=False
+        is_main=False,
+        variants=await build_variants(filename),
     )
     db.add(new_image_obj)
     # await db.commit() # Handled by get_db
+    await db.flush([new_image_obj]) # refresh() needs a persistent instance
     await db.refresh(new_image_obj) # To get ID and path for response
 
     return JSONResponse({ # Return JSONResponse
@@ -475,11 +515,11 @@ async def delete_image(
     else: # Should not happen for ProductImage tied to a Product
         raise HTTPException(status_code=403, detail="Невозможно определить права доступа к изображению")
 
-    # Actual file deletion is commented out
-    # image_file_path = os.path.join(UPLOAD_DIR, image.image_path)
-    # if os.path.exists(image_file_path):
-    #     os.remove(image_file_path)
-
+    # The file may be shared with other images: only the blob reference is dropped
+    await release_image(db, image.image_path)
     await db.delete(image)
+    if image.is_main and image.product:
+        # Главное изображение попадает в /dashboard/data
+        await bump_version(db, "products", image.product.user_id)
     # await db.commit() # Handled by get_db
     return JSONResponse({"status": "ok"}) # Return JSONResponse
@@ -0,0 +1,191 @@
+"""
+Сборка статики: имена с хешем содержимого и заранее сжатые копии.
+
+``python manage.py assets`` copies every file from ``app/static`` (except
+uploads) into ``app/static/build`` as ``<name>.<hash>.<ext>``, writes ``.gz``
+and, when the ``brotli`` package is installed, ``.br`` siblings for text
+assets, and records ``logical path -> hashed path`` in ``manifest.json``.
+Templates resolve URLs through the ``asset_url()`` Jinja helper; without a
+manifest (or in development) it falls back to the original file.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from typing import Dict, Optional
+
+from jinja2 import pass_context
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError: # optional: only .gz siblings are produced without it
+    brotli = None
+
+STATIC_DIR = "app/static"
+BUILD_DIR = "build" # relative to STATIC_DIR, served as /static/build/...
+MANIFEST_NAME = "manifest.json"
+SKIP_DIRS = {"uploads", BUILD_DIR}
+
+# Already compressed formats are only fingerprinted
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".json", ".svg", ".txt", ".html", ".map", ".ttf", ".otf", ".ico"}
+MIN_COMPRESS_SIZE = 256
+HASH_LENGTH = 12
+
+_CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+_manifest: Optional[Dict[str, str]] = None
+
+
+def _hashed_name(rel_path: str, content: bytes) -> str:
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest}{ext}"
+
+
+def _write_atomic(path: str, content: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(content)
+    os.replace(tmp_path, path)
+
+
+def _write_compressed(path: str, content: bytes) -> Dict[str, int]:
+    """Пишет .gz/.br рядом с файлом, только если они действительно меньше."""
+    sizes = {}
+    if len(content) < MIN_COMPRESS_SIZE:
+        return sizes
+    variants = {"gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(content, quality=11)
+    for suffix, data in variants.items():
+        if len(data) < len(content):
+            _write_atomic(f"{path}.{suffix}", data)
+            sizes[suffix] = len(data)
+    return sizes
+
+
+def _rewrite_css_urls(css: str, css_rel_path: str, manifest: Dict[str, str]) -> str:
+    """Заменяет ссылки url(...) на файлы из манифеста их хешированными версиями."""
+    hashed_css_dir = os.path.dirname(manifest.get(css_rel_path, os.path.join(BUILD_DIR, css_rel_path)))
+
+    def replace(match):
+        quote, target = match.group(1), match.group(2).strip()
+        if target.startswith(("data:", "http:", "https:", "//", "#")):
+            return match.group(0)
+        path, sep, suffix = target.partition("?")
+        if path.startswith("/static/"):
+            logical = path[len("/static/"):]
+        else:
+            logical = os.path.normpath(os.path.join(os.path.dirname(css_rel_path), path)).replace(os.sep, "/")
+        hashed = manifest.get(logical)
+        if hashed is None:
+            return match.group(0)
+        new_target = os.path.relpath(hashed, hashed_css_dir).replace(os.sep, "/")
+        return f"url({quote}{new_target}{sep}{suffix}{quote})"
+
+    return _CSS_URL_RE.sub(replace, css)
+
+
+def build_assets(static_dir: str = STATIC_DIR, clean: bool = False) -> Dict[str, Dict]:
+    """
+    Собирает статику в static_dir/build и возвращает сводку по файлам.
+    Old hashed files are kept unless clean=True, so pages rendered before a
+    deploy can still load the assets they reference.
+    """
+    build_root = os.path.join(static_dir, BUILD_DIR)
+    if clean and os.path.isdir(build_root):
+        shutil.rmtree(build_root)
+
+    sources = []
+    for root, dirs, files in os.walk(static_dir):
+        rel_root = os.path.relpath(root, static_dir)
+        dirs[:] = sorted(d for d in dirs if not (rel_root == "." and d in SKIP_DIRS))
+        for name in sorted(files):
+            rel_path = os.path.normpath(os.path.join(rel_root, name)).replace(os.sep, "/")
+            sources.append(rel_path)
+
+    manifest: Dict[str, str] = {}
+    report: Dict[str, Dict] = {}
+    # CSS last: its url() references need the hashed names of fonts and images
+    for rel_path in sorted(sources, key=lambda p: p.endswith(".css")):
+        with open(os.path.join(static_dir, rel_path), "rb") as fh:
+            content = fh.read()
+        if rel_path.endswith(".css"):
+            manifest[rel_path] = os.path.join(BUILD_DIR, rel_path) # provisional, for relative paths
+            content = _rewrite_css_urls(content.decode("utf-8"), rel_path, manifest).encode("utf-8")
+        hashed = f"{BUILD_DIR}/{_hashed_name(rel_path, content)}"
+        manifest[rel_path] = hashed
+
+        target = os.path.join(static_dir, hashed)
+        if not os.path.exists(target):
+            _write_atomic(target, content)
+        entry = {"path": hashed, "size": len(content)}
+        if os.path.splitext(rel_path)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+            entry.update(_write_compressed(target, content))
+        report[rel_path] = entry
+
+    _write_atomic(os.path.join(build_root, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    reset_manifest()
+    return report
+
+
+def load_manifest(static_dir: str = STATIC_DIR) -> Dict[str, str]:
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(os.path.join(static_dir, BUILD_DIR, MANIFEST_NAME), encoding="utf-8") as fh:
+                _manifest = json.load(fh)
+        except FileNotFoundError:
+            _manifest = {}
+    return _manifest
+
+
+def reset_manifest() -> None:
+    global _manifest
+    _manifest = None
+
+
+def resolve_asset(path: str) -> str:
+    """Логический путь ('js/main.js') -> путь внутри /static с учётом манифеста."""
+    if settings.is_development:
+        return path
+    return load_manifest().get(path, path)
+
+
+@pass_context
+def asset_url(context, path: str) -> str:
+    """Jinja helper: {{ asset_url('js/main.js') }}."""
+    resolved = resolve_asset(path)
+    request = context.get("request")
+    if request is not None:
+        return str(request.url_for("static", path=resolved))
+    return f"/static/{resolved}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build fingerprinted and precompressed static assets")
+    parser.add_argument("--static-dir", default=STATIC_DIR)
+    parser.add_argument("--clean", action="store_true", help="Remove previously built files first")
+    args = parser.parse_args(argv)
+
+    report = build_assets(args.static_dir, clean=args.clean)
+    original = sum(entry["size"] for entry in report.values())
+    gz = sum(entry.get("gz", entry["size"]) for entry in report.values())
+    br = sum(entry.get("br", entry.get("gz", entry["size"])) for entry in report.values())
+    print(json.dumps({
+        "files": len(report),
+        "bytes": original,
+        "gzip_bytes": gz,
+        "brotli_bytes": br if brotli is not None else None,
+    }))
+
+
+if __name__ == "__main__":
+    main()
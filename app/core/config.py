@@ -1,6 +1,6 @@
 import os
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import List, Optional
 
 
 def get_env_file() -> str:
@@ -18,12 +18,70 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-3.5-turbo"
     OPENAI_API_BASE: str = "https://api.openai.com/v1"
+    OPENAI_API_BASES: List[str] = [] # Several OpenAI-compatible endpoints to route between (default: OPENAI_API_BASE)
+    OPENAI_API_WEIGHTS: List[float] = [] # Share of calls per endpoint for "weighted" routing (missing = 1)
+    AI_PROVIDER: str = "openai" # "openai" (any OpenAI-compatible API) or "local" (deterministic, no network)
+    AI_ROUTING: str = "weighted" # "weighted" or "latency" (lowest recent response time first)
+    AI_LOCAL_LATENCY: float = 0 # Simulated seconds per call of the local provider (benchmarks)
+    OPENAI_RPM_LIMIT: int = 0 # Requests per minute allowed by the provider (0 = no limit)
+    OPENAI_TPM_LIMIT: int = 0 # Tokens per minute allowed by the provider (0 = no limit)
+    OPENAI_TIMEOUT: float = 30.0 # Seconds per attempt
+    OPENAI_CONTEXT_TOKENS: int = 0 # Model context window (0 = known value for OPENAI_MODEL, see app/utils/tokens.py)
+    OPENAI_COMPLETION_TOKENS: int = 1024 # Part of the context kept free for the answer
+    AI_PROMPT_FORMAT: str = "table" # Reviews in the prompt: "table", "tsv" or "legacy" (dict per review); a Promt may override
+    AI_PROMPT_OVERFLOW: str = "truncate" # Reviews over the budget: "truncate" (least important first) or "reject" (413)
+    OPENAI_PROMPT_PRICE: float = 0 # Price per 1M prompt tokens, for ai_usage.cost
+    OPENAI_COMPLETION_PRICE: float = 0 # Price per 1M completion tokens
+    OPENAI_RETRY_ATTEMPTS: int = 3 # Attempts per call on timeouts, 429 and 5xx (1 = no retries)
+    OPENAI_RETRY_BASE_DELAY: float = 0.5 # Backoff: random(0, base * 2^retry), capped below
+    OPENAI_RETRY_MAX_DELAY: float = 20.0
+    OPENAI_HEDGE_DELAY: float = 0 # Seconds before a duplicate request is sent for a slow call (0 = off)
+    OPENAI_BREAKER_THRESHOLD: int = 5 # Transient failures in a row that open the circuit (0 = off)
+    OPENAI_BREAKER_RESET: float = 30.0 # Seconds before a trial call is let through an open circuit
 
     DATABASE_URL: str # For async application operations
     SYNC_DATABASE_URL: Optional[str] = None # For synchronous Alembic operations
 
     ROOT_PASSWORD: str = "root"
 
+    METRICS_ENABLED: bool = True
+    METRICS_DIR: Optional[str] = None # Shared dir for multi-worker aggregation (one snapshot file per worker)
+    METRICS_FLUSH_INTERVAL: float = 5.0
+    METRICS_TOKEN: str = "" # If set, /metrics requires "Authorization: Bearer <token>"
+
+    PROFILING_ENABLED: bool = True # Allows superusers to profile a request via X-Profile header / ?__profile=1
+    PROFILING_SAMPLE_RATE: int = 0 # Profile 1 in N requests into aggregated files (0 = off)
+    PROFILING_INTERVAL: float = 0.005 # Seconds between stack samples
+    PROFILING_DIR: str = "profiles"
+
+    MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024 # Bytes per uploaded image
+    MAX_IMPORT_SIZE: int = 50 * 1024 * 1024 # Bytes per catalogue file for POST /product/import
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+
+    IMAGE_THUMBNAIL_WIDTH: int = 320 # Dashboard cards and table rows (160px at 2x)
+    IMAGE_VARIANT_WIDTHS: List[int] = [320, 640] # Rendered as WebP + JPEG/PNG each
+    IMAGE_WEBP_QUALITY: int = 80
+    IMAGE_JPEG_QUALITY: int = 85
+    IMAGE_WORKERS: int = 2 # Processes rendering variants (0 = default thread pool)
+
+    UPLOAD_GC_INTERVAL: float = 0 # Seconds between background sweeps of unreferenced uploads (0 = off)
+    UPLOAD_GC_GRACE_PERIOD: int = 24 * 3600 # Seconds a file must be unreferenced-and-old before removal
+    UPLOAD_GC_BATCH_SIZE: int = 500
+
+    ANALYSIS_WORKERS: int = 2 # In-process AI analysis workers (0 = jobs only run in `manage.py worker`)
+    ANALYSIS_POLL_INTERVAL: float = 2.0 # Seconds between checks of the jobs table for queued work
+    ANALYSIS_STALE_AFTER: int = 900 # A job "running" longer than this (crashed worker) is re-queued
+    ANALYSIS_MAX_ATTEMPTS: int = 3
+    ANALYSIS_WAIT_INTERVAL: float = 1.0 # Seconds between job status reads while GET /analyze/jobs/{id}?wait= long-polls
+
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024 # Bytes; smaller bodies are sent as is
+    COMPRESSION_GZIP_LEVEL: int = 5 # Capped at 6 by the middleware
+    COMPRESSION_BROTLI_QUALITY: int = 4 # Capped at 5 by the middleware
+
+    FRAGMENT_CACHE_ENABLED: bool = True # {% cache %} blocks in templates
+    FRAGMENT_CACHE_SIZE: int = 1024 # Max rendered fragments kept per worker (LRU)
+
     model_config = SettingsConfigDict(
         env_file_encoding='utf-8',
         extra='ignore',
@@ -0,0 +1,484 @@
+"""
+Prometheus-совместимые метрики приложения (text exposition format 0.0.4).
+
+Hot path is lock-light: the registry lock is only taken when a new label
+combination is created, every child keeps its own tiny lock for updates.
+
+Uvicorn workers are separate processes, so when ``settings.METRICS_DIR`` is set
+each worker periodically dumps its snapshot to ``metrics_<pid>.json`` in that
+directory and ``/metrics`` merges all files. Counters and histograms are summed
+(including ones left by dead workers, so totals stay monotonic); gauges are
+summed only over live processes.
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+# --- Children (one per label combination) ---
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Counter can only increase")
+        with self._lock:
+            self._value += amount
+
+    def get(self) -> float:
+        return self._value
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def get(self) -> float:
+        return self._value
+
+
+class _HistogramChild:
+    __slots__ = ("_upper_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, upper_bounds: Sequence[float]):
+        self._upper_bounds = upper_bounds
+        # Последний слот — бакет +Inf
+        self._counts = [0] * (len(upper_bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def get(self) -> List[Any]:
+        with self._lock:
+            return [list(self._counts), self._sum]
+
+
+# --- Metric families ---
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, Any] = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: Any, **kwargs: Any):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {values}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def samples(self) -> List[List[Any]]:
+        return [[list(key), child.get()] for key, child in list(self._children.items())]
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "doc": self.documentation,
+            "labels": list(self.labelnames),
+        }
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default().dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional["Registry"] = None):
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def describe(self) -> Dict[str, Any]:
+        data = super().describe()
+        data["buckets"] = list(self.buckets)
+        return data
+
+    def time(self, *labelvalues: Any) -> "_Timer":
+        """Context manager: ``with HIST.time("a", "b"): ...``"""
+        return _Timer(self.labels(*labelvalues))
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: _HistogramChild):
+        self._child = child
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._start)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Текущее состояние метрик процесса в JSON-сериализуемом виде."""
+        data = {}
+        for name, metric in self._metrics.items():
+            entry = metric.describe()
+            entry["samples"] = metric.samples()
+            data[name] = entry
+        return data
+
+
+REGISTRY = Registry()
+
+
+# --- Merging and rendering ---
+
+def merge_snapshots(snapshots: List[Tuple[Dict[str, Any], bool]]) -> Dict[str, Any]:
+    """
+    Складывает снапшоты нескольких процессов.
+    snapshots: список пар (snapshot, process_alive).
+    """
+    merged: Dict[str, Any] = {}
+    for snapshot, alive in snapshots:
+        for name, entry in snapshot.items():
+            if entry["kind"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, {**entry, "samples": {}})
+            if target.get("buckets") != entry.get("buckets"):
+                # Разные версии кода у воркеров — не смешиваем несовместимые гистограммы
+                continue
+            for labelvalues, value in entry["samples"]:
+                key = tuple(labelvalues)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = value if entry["kind"] != "histogram" else [list(value[0]), value[1]]
+                elif entry["kind"] == "histogram":
+                    current[0] = [a + b for a, b in zip(current[0], value[0])]
+                    current[1] += value[1]
+                else:
+                    target["samples"][key] = current + value
+    for entry in merged.values():
+        entry["samples"] = [[list(k), v] for k, v in entry["samples"].items()]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(snapshot: Dict[str, Any]) -> str:
+    lines: List[str] = []
+    for name in sorted(snapshot):
+        entry = snapshot[name]
+        kind, labelnames = entry["kind"], entry["labels"]
+        lines.append(f"# HELP {name} {entry['doc']}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labelvalues, value in sorted(entry["samples"], key=lambda s: s[0]):
+            if kind == "histogram":
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(list(entry["buckets"]) + [float("inf")], counts):
+                    cumulative += count
+                    labels = _format_labels(labelnames, labelvalues, ("le", _format_value(bound)))
+                    lines.append(f"{name}_bucket{labels} {cumulative}")
+                labels = _format_labels(labelnames, labelvalues)
+                lines.append(f"{name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{name}_count{labels} {cumulative}")
+            else:
+                lines.append(f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Multiprocess support ---
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics_{pid}.json")
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def flush() -> None:
+    """Атомарно записывает снапшот текущего процесса в METRICS_DIR."""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = _snapshot_path(directory, os.getpid())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(REGISTRY.snapshot(), fh, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def collect() -> Dict[str, Any]:
+    """Снапшот для отдачи на /metrics: локальный или агрегированный по воркерам."""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return REGISTRY.snapshot()
+
+    flush()
+    snapshots: List[Tuple[Dict[str, Any], bool]] = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not (entry.name.startswith("metrics_") and entry.name.endswith(".json")):
+                continue
+            try:
+                pid = int(entry.name[len("metrics_"):-len(".json")])
+                with open(entry.path, encoding="utf-8") as fh:
+                    snapshots.append((json.load(fh), _pid_alive(pid)))
+            except (ValueError, OSError) as e:
+                logger.warning(f"Skipping metrics snapshot {entry.name}: {e}")
+    return merge_snapshots(snapshots)
+
+
+def generate_latest() -> str:
+    return render(collect())
+
+
+async def run_flusher(interval: float) -> None:
+    """Фоновая задача воркера: периодически сбрасывает снапшот на диск."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, flush)
+        except Exception as e:
+            logger.warning(f"Metrics flush failed: {e}")
+
+
+# --- Application metrics ---
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route name, method and status.",
+    ("route", "method", "status"),
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route name.",
+    ("route", "method"),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being processed.",
+)
+
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total", "Connections checked out from the DB pool.",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently checked out from the DB pool.",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a DB pool connection.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+
+AI_REQUEST_DURATION = Histogram(
+    "ai_request_duration_seconds", "Outbound AI call latency.",
+    ("model", "outcome"),
+)
+AI_TOKENS = Counter(
+    "ai_tokens_total", "Tokens reported by the AI provider.",
+    ("model", "kind"),
+)
+AI_COST = Counter(
+    "ai_cost_total", "AI spend computed from reported tokens and the configured prices.",
+    ("model",),
+)
+AI_REVIEWS_DROPPED = Counter(
+    "ai_prompt_reviews_dropped_total", "Reviews left out of AI prompts to fit the model context.",
+    ("model",),
+)
+AI_ERRORS = Counter(
+    "ai_errors_total", "Failed AI calls by reason.",
+    ("model", "reason"),
+)
+AI_RETRIES = Counter(
+    "ai_retries_total", "AI calls retried after a transient failure, by reason.",
+    ("backend", "reason"),
+)
+AI_HEDGED = Counter(
+    "ai_hedged_requests_total", "Second (hedged) AI requests sent because the first was slow.",
+    ("backend",),
+)
+AI_CIRCUIT_OPEN = Gauge(
+    "ai_circuit_open", "1 while the AI backend circuit breaker is open or half-open.",
+    ("backend",),
+)
+AI_PROVIDER_REQUESTS = Counter(
+    "ai_provider_requests_total", "AI attempts by provider endpoint and outcome.",
+    ("provider", "outcome"),
+)
+AI_QUEUE_DEPTH = Gauge(
+    "ai_rate_limit_queue_depth", "Calls waiting for the AI rate limiter.",
+    ("limiter",),
+)
+AI_QUEUE_WAIT = Histogram(
+    "ai_rate_limit_wait_seconds", "Time calls spent waiting for the AI rate limiter.",
+    ("limiter",),
+    buckets=(0.001, 0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+AI_COALESCED = Counter(
+    "ai_coalesced_requests_total", "AI calls served by an identical call already in flight.",
+    ("flight",),
+)
+ANALYSIS_JOBS = Counter(
+    "analysis_jobs_total", "Finished AI analysis jobs by status.",
+    ("status",),
+)
+ANALYSIS_JOB_DURATION = Histogram(
+    "analysis_job_duration_seconds", "Time from claiming an AI analysis job to its result.",
+)
+
+# Rows per second: rate(import_rows_total[1m])
+IMPORT_ROWS = Counter(
+    "import_rows_total", "Rows processed by the review file parser.",
+    ("status",),
+)
+IMPORT_DURATION = Histogram(
+    "import_duration_seconds", "Review file parsing duration.",
+)
+EXPORT_ROWS = Counter(
+    "export_rows_total", "Review rows written by streaming exports.",
+    ("format",),
+)
+
+FRAGMENT_CACHE_HITS = Counter(
+    "fragment_cache_hits_total", "Template fragments served from the fragment cache.",
+    ("fragment",),
+)
+FRAGMENT_CACHE_MISSES = Counter(
+    "fragment_cache_misses_total", "Template fragments rendered and stored in the fragment cache.",
+    ("fragment",),
+)
+# Render time of the cached copy, added on every hit
+FRAGMENT_RENDER_SAVED = Counter(
+    "fragment_render_seconds_saved_total", "Render time saved by fragment cache hits.",
+    ("fragment",),
+)
+
+# Compression ratio: rate(..{direction="out"}) / rate(..{direction="in"})
+COMPRESSION_BYTES = Counter(
+    "http_compression_bytes_total", "Response bytes before and after on-the-fly compression.",
+    ("encoding", "direction"),
+)
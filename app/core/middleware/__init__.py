@@ -1,4 +1,7 @@
 from .auth_middleware import AuthMiddleware
 from .security_headers import SecurityHeadersMiddleware
+from .metrics_middleware import MetricsMiddleware
+from .profiling_middleware import ProfilingMiddleware
+from .compression_middleware import CompressionMiddleware
 
-__all__ = ["AuthMiddleware", "SecurityHeadersMiddleware"]
\ No newline at end of file
+__all__ = ["AuthMiddleware", "SecurityHeadersMiddleware", "MetricsMiddleware", "ProfilingMiddleware", "CompressionMiddleware"]
\ No newline at end of file
@@ -26,7 +26,8 @@ PUBLIC_PATHS = [
 # ]
 
 SERVICE_PREFIXES = [
-    "/.well-known", "/static", "/docs", "/openapi.json", "/redoc"
+    "/.well-known", "/static", "/docs", "/openapi.json", "/redoc",
+    "/metrics",  # Protected by METRICS_TOKEN instead of the session cookie
 ]
 
 # Ensure that any path not in PUBLIC_PATHS or SERVICE_PREFIXES is considered private
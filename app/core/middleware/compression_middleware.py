@@ -0,0 +1,191 @@
+import gzip
+import zlib
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics, settings
+from app.core.static_files import choose_encoding
+
+try:
+    import brotli
+except ImportError: # optional: gzip only without it
+    brotli = None
+
+# Upper bounds regardless of settings: higher levels cost a lot of CPU for a few % of bytes
+MAX_GZIP_LEVEL = 6
+MAX_BROTLI_QUALITY = 5
+
+# No text/html: pages carry the CSRF token next to reflected user input, and
+# compressing both in one body leaks the token length-wise (BREACH)
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "text/javascript",
+    "text/css",
+    "text/csv",
+    "image/svg+xml",
+)
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        # wbits=31: gzip container, same as gzip.compress()
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.process(data)
+        return out + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов на лету (gzip / brotli) без BaseHTTPMiddleware.
+
+    Small bodies (below ``minimum_size``), types outside COMPRESSIBLE_TYPES, responses
+    that already carry Content-Encoding (precompressed static files) and
+    file responses sent via pathsend/zerocopysend pass through untouched.
+    Streaming bodies are compressed chunk by chunk with a sync flush, so the
+    client keeps receiving data as it is produced.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: Optional[int] = None,
+        gzip_level: Optional[int] = None,
+        brotli_quality: Optional[int] = None,
+        content_types: Tuple[str, ...] = COMPRESSIBLE_TYPES,
+    ):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.gzip_level = max(1, min(settings.COMPRESSION_GZIP_LEVEL if gzip_level is None else gzip_level, MAX_GZIP_LEVEL))
+        quality = settings.COMPRESSION_BROTLI_QUALITY if brotli_quality is None else brotli_quality
+        self.brotli_quality = max(0, min(quality, MAX_BROTLI_QUALITY))
+        self.content_types = content_types
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def is_compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return content_type.startswith(self.content_types)
+
+    def new_stream(self, encoding: str):
+        if encoding == "br":
+            return _BrotliStream(self.brotli_quality)
+        return _GzipStream(self.gzip_level)
+
+    def compress_whole(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.stream = None
+        self.pending: List[bytes] = []
+        self.pending_size = 0
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if message["status"] in (204, 304) or not self.middleware.is_compressible(headers):
+                self.passthrough = True
+                await self._send(message)
+            else:
+                self.start_message = message
+            return
+
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        if message_type != "http.response.body":
+            # pathsend / zerocopysend: the server writes the file itself
+            self.passthrough = True
+            await self._send(self.start_message)
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.stream is None:
+            self.pending.append(body)
+            self.pending_size += len(body)
+            if more_body and self.pending_size < self.middleware.minimum_size:
+                return # keep buffering until we know whether it is worth it
+            body = b"".join(self.pending)
+            self.pending = []
+            if not more_body:
+                await self._send_whole(body)
+                return
+            await self._start_stream()
+
+        chunk = self.stream.compress(body, final=not more_body)
+        metrics.COMPRESSION_BYTES.labels(self.encoding, "in").inc(len(body))
+        metrics.COMPRESSION_BYTES.labels(self.encoding, "out").inc(len(chunk))
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    async def _send_whole(self, body: bytes) -> None:
+        if len(body) < self.middleware.minimum_size:
+            await self._send(self.start_message)
+            await self._send({"type": "http.response.body", "body": body, "more_body": False})
+            return
+        compressed = self.middleware.compress_whole(self.encoding, body)
+        metrics.COMPRESSION_BYTES.labels(self.encoding, "in").inc(len(body))
+        metrics.COMPRESSION_BYTES.labels(self.encoding, "out").inc(len(compressed))
+        headers = self._compressed_headers()
+        headers["Content-Length"] = str(len(compressed))
+        await self._send(self.start_message)
+        await self._send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+    async def _start_stream(self) -> None:
+        self.stream = self.middleware.new_stream(self.encoding)
+        headers = self._compressed_headers()
+        if "content-length" in headers:
+            del headers["content-length"]
+        await self._send(self.start_message)
+
+    def _compressed_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(scope=self.start_message)
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        # The encoded body is a different representation: a strong ETag would lie
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        return headers
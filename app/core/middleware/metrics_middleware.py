@@ -0,0 +1,46 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+
+
+def get_route_name(scope: Scope) -> str:
+    # Starlette stores the matched route in scope after routing; fall back to the endpoint
+    route = scope.get("route")
+    name = getattr(route, "name", None)
+    if name:
+        return name
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        return getattr(endpoint, "__name__", "unknown")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.HTTP_IN_FLIGHT.dec()
+            route = get_route_name(scope)
+            method = scope.get("method", "")
+            metrics.HTTP_REQUEST_DURATION.labels(route, method).observe(elapsed)
+            metrics.HTTP_REQUESTS.labels(route, method, status_code).inc()
@@ -0,0 +1,121 @@
+from typing import List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import QueryParams
+from starlette.requests import HTTPConnection
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.profiling import SamplingProfiler, aggregator, store_profile
+from app.core.middleware.metrics_middleware import get_route_name
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_PARAM = "__profile"
+
+
+def _requested_mode(scope: Scope) -> Optional[str]:
+    """'return' — отдать профиль вместо ответа, 'store' — сохранить на диск."""
+    value = None
+    for name, header_value in scope.get("headers", []):
+        if name == PROFILE_HEADER:
+            value = header_value.decode("latin-1")
+            break
+    if value is None and scope.get("query_string"):
+        value = QueryParams(scope["query_string"]).get(PROFILE_QUERY_PARAM)
+    if not value or value in ("0", "false"):
+        return None
+    return "store" if value == "store" else "return"
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in request profiling.
+
+    ``X-Profile: 1`` (or ``?__profile=1``) returns the collapsed stacks instead
+    of the page, ``X-Profile: store`` writes them to PROFILING_DIR and adds an
+    ``X-Profile-File`` header. Both are honoured for superusers only. The
+    user is resolved by get_current_user while the request runs, so the
+    check happens on ``http.response.start``: for anyone else the profiler
+    is stopped there and the response is sent straight through, never
+    buffered. Requests without a session cookie are not profiled at all.
+    Independently, every PROFILING_SAMPLE_RATE-th request is profiled and
+    merged into per-route aggregated files.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._active = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Shared with request.state, so the user resolved by get_current_user is visible here
+        scope.setdefault("state", {})
+
+        mode = _requested_mode(scope)
+        if mode is not None and "access_token" in HTTPConnection(scope).cookies:
+            await self._profile_explicit(scope, receive, send, mode)
+        elif self._active == 0 and aggregator.should_sample():
+            await self._profile_sampled(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    async def _profile_explicit(self, scope: Scope, receive: Receive, send: Send, mode: str):
+        messages: List[Message] = []
+        passthrough = False
+
+        async def buffer_send(message: Message):
+            nonlocal passthrough
+            if message["type"] == "http.response.start":
+                user = scope["state"].get("user")
+                passthrough = not (user and user.is_superuser)
+                if passthrough:
+                    profiler.stop()
+            if passthrough:
+                await send(message)
+            else:
+                messages.append(message)
+
+        self._active += 1
+        profiler = SamplingProfiler().start()
+        try:
+            await self.app(scope, receive, buffer_send)
+        finally:
+            profiler.stop()
+            self._active -= 1
+        if passthrough:
+            return
+
+        route = get_route_name(scope)
+        if mode == "return":
+            response = PlainTextResponse(
+                profiler.collapsed(),
+                headers={
+                    "Content-Disposition": f'attachment; filename="{route}.collapsed"',
+                    "X-Profile-Samples": str(profiler.samples),
+                    "X-Profile-Duration": f"{profiler.duration:.6f}",
+                },
+            )
+            await response(scope, receive, send)
+            return
+
+        path = await run_in_threadpool(store_profile, profiler, route)
+        for message in messages:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-file", path.replace("\\", "/").encode("latin-1")),
+                ]
+            await send(message)
+
+    async def _profile_sampled(self, scope: Scope, receive: Receive, send: Send):
+        self._active += 1
+        profiler = SamplingProfiler().start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.stop()
+            self._active -= 1
+        if profiler.samples:
+            await run_in_threadpool(aggregator.add, get_route_name(scope), profiler)
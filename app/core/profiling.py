@@ -0,0 +1,135 @@
+"""
+Встроенный сэмплирующий профилировщик для production-запросов.
+
+A background thread periodically grabs the stack of the event-loop thread via
+``sys._current_frames()`` and counts identical stacks. The result is written in
+the "collapsed stack" format (``frame;frame;frame count``) understood by
+flamegraph.pl, speedscope and inferno.
+
+Note: the loop thread is shared by all concurrent requests of the worker, so a
+profile may also contain samples from other requests running at the same time.
+"""
+
+import collections
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from typing import Counter, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{module}:{name}"
+
+
+class SamplingProfiler:
+    """Samples one thread's stack every ``interval`` seconds until stopped."""
+
+    def __init__(self, thread_id: Optional[int] = None, interval: Optional[float] = None):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval if interval is not None else settings.PROFILING_INTERVAL
+        self.stacks: Counter[str] = collections.Counter()
+        self.samples = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.reverse()
+            self.stacks[";".join(labels)] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return render_collapsed(self.stacks)
+
+
+def render_collapsed(stacks: Counter[str]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def parse_collapsed(text: str) -> Counter[str]:
+    stacks: Counter[str] = collections.Counter()
+    for line in text.splitlines():
+        stack, _, count = line.rpartition(" ")
+        if stack and count.isdigit():
+            stacks[stack] += int(count)
+    return stacks
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", value).strip("_") or "unknown"
+
+
+def store_profile(profiler: SamplingProfiler, route: str) -> str:
+    """Сохраняет профиль одного запроса, возвращает путь к файлу."""
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    filename = f"{_safe_name(route)}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{id(profiler):x}.collapsed"
+    path = os.path.join(settings.PROFILING_DIR, filename)
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(profiler.collapsed())
+    return path
+
+
+class ProfileAggregator:
+    """
+    Collects the "1 in N requests" profiles per route name and keeps one
+    aggregated ``<route>.<pid>.collapsed`` file per worker on disk.
+    """
+
+    def __init__(self):
+        self._stacks: Dict[str, Counter[str]] = collections.defaultdict(collections.Counter)
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def should_sample(self) -> bool:
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate <= 0:
+            return False
+        with self._lock:
+            self._counter += 1
+            return self._counter % rate == 0
+
+    def add(self, route: str, profiler: SamplingProfiler) -> None:
+        with self._lock:
+            self._stacks[route].update(profiler.stacks)
+            snapshot = collections.Counter(self._stacks[route])
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILING_DIR, f"{_safe_name(route)}.{os.getpid()}.collapsed")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            fh.write(render_collapsed(snapshot))
+        os.replace(tmp_path, path)
+
+
+aggregator = ProfileAggregator()
@@ -0,0 +1,100 @@
+"""
+Раздача статики с учётом заранее сжатых копий.
+
+Files under ``/static/build/`` are content-hashed by ``manage.py assets`` and
+never change, so they are served with ``Cache-Control: immutable`` and, when
+the client accepts it, from their ``.br``/``.gz`` sibling. Everything else
+goes through the regular StaticFiles logic (ETag / Last-Modified).
+"""
+
+import mimetypes
+import os
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, PathLike, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from app.core.assets import BUILD_DIR
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Preferred order when the client accepts several encodings with the same weight
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(header: Optional[str], available: Tuple[str, ...]) -> Optional[str]:
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for coding in available:
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class ZeroCopyFileResponse(FileResponse):
+    """
+    FileResponse that hands the open file to the server when it supports the
+    ASGI zero-copy send extension (sendfile); otherwise Starlette's own path
+    is used, which already covers ``http.response.pathsend``.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        extensions = scope.get("extensions") or {}
+        if (
+            scope.get("method") == "HEAD"
+            or "http.response.zerocopysend" not in extensions
+            or "http.response.pathsend" in extensions
+            or Headers(scope=scope).get("range")
+        ):
+            await super().__call__(scope, receive, send)
+            return
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        with open(self.path, "rb") as fh:
+            await send({"type": "http.response.zerocopysend", "file": fh, "more_body": False})
+        if self.background is not None:
+            await self.background()
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    def file_response(self, full_path: PathLike, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        rel_path = self.get_path(scope).replace(os.sep, "/")
+        if not rel_path.startswith(f"{BUILD_DIR}/"):
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        request_headers = Headers(scope=scope)
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        path, stat_result_to_send = full_path, stat_result
+
+        available = tuple(coding for coding, suffix in ENCODINGS if os.path.isfile(f"{full_path}{suffix}"))
+        coding = choose_encoding(request_headers.get("accept-encoding"), available) if available else None
+        if coding is not None:
+            suffix = dict(ENCODINGS)[coding]
+            path = f"{full_path}{suffix}"
+            stat_result_to_send = os.stat(path)
+            headers["Content-Encoding"] = coding
+
+        response = ZeroCopyFileResponse(path, status_code=status_code, headers=headers, media_type=media_type, stat_result=stat_result_to_send)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -1,9 +1,10 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete
+from sqlalchemy import update as sqlalchemy_update, delete as sqlalchemy_delete, insert as sqlalchemy_insert
 from pydantic import BaseModel
-from typing import List, Optional, Type, TypeVar
+from typing import Dict, List, Optional, Sequence, Tuple, Type, TypeVar
 from app.database.base import Base
+from app.database.versions import bump_version
 from app.models.user import User # Assuming User model is needed for user_id checks
 
 # Define a TypeVar for the SQLAlchemy model type
@@ -11,6 +12,9 @@ ModelType = TypeVar("ModelType", bound=Base)
 # Define a TypeVar for the Pydantic schema type
 SchemaType = TypeVar("SchemaType", bound=BaseModel)
 
+# Size of IN (...) lists in batch operations
+BATCH_CHUNK_SIZE = 1000
+
 async def get_user(db: AsyncSession, user_id: int) -> Optional[User]:
     result = await db.execute(select(User).filter(User.id == user_id))
     return result.scalar_one_or_none()
@@ -26,15 +30,19 @@ async def create_directory_item(db: AsyncSession, item_data: SchemaType, model_c
 
     db_item = model_class(**item_dict)
     db.add(db_item)
+    await bump_version(db, model_class.__tablename__, item_dict.get("user_id"))
     await db.commit()
     await db.refresh(db_item)
     return db_item
 
-async def get_directory_item(db: AsyncSession, item_id: int, model_class: Type[ModelType], user: Optional[User] = None) -> Optional[ModelType]:
-    stmt = select(model_class).filter(model_class.id == item_id)
+def _owner_conditions(model_class: Type[ModelType], user: Optional[User]) -> list:
+    """Ограничение по владельцу: обычный пользователь видит и меняет только свои записи."""
     if user and not user.is_superuser and hasattr(model_class, "user_id"):
-        stmt = stmt.filter(model_class.user_id == user.id)
+        return [model_class.user_id == user.id]
+    return []
 
+async def get_directory_item(db: AsyncSession, item_id: int, model_class: Type[ModelType], user: Optional[User] = None) -> Optional[ModelType]:
+    stmt = select(model_class).filter(model_class.id == item_id, *_owner_conditions(model_class, user))
     result = await db.execute(stmt)
     return result.scalar_one_or_none()
 
@@ -45,10 +53,7 @@ async def get_directory_items(
     skip: int = 0,
     limit: int = 100
 ) -> List[ModelType]:
-    stmt = select(model_class)
-    if user and not user.is_superuser and hasattr(model_class, "user_id"):
-        stmt = stmt.filter(model_class.user_id == user.id)
-
+    stmt = select(model_class).filter(*_owner_conditions(model_class, user))
     stmt = stmt.offset(skip).limit(limit)
     if hasattr(model_class, "name"): # Default sort by name if exists
         stmt = stmt.order_by(model_class.name)
@@ -59,44 +64,163 @@ async def get_directory_items(
     return result.scalars().all()
 
 async def update_directory_item(db: AsyncSession, item_id: int, item_data: SchemaType, model_class: Type[ModelType], user: Optional[User] = None) -> Optional[ModelType]:
-    # First, retrieve the item to ensure it exists and the user has permission
-    db_item = await get_directory_item(db, item_id, model_class, user)
-    if not db_item:
-        return None
-
+    """
+    UPDATE ... WHERE id AND владелец RETURNING: existence, permission and the
+    new row come back in one statement. None: not found or no permission.
+    """
     update_data = item_data.model_dump(exclude_unset=True)
 
     # Prevent user_id from being updated directly through this generic function
-    if "user_id" in update_data:
-        del update_data["user_id"]
+    update_data.pop("user_id", None)
 
     if not update_data: # No actual data to update
-        return db_item
-
-    stmt = (
-        sqlalchemy_update(model_class)
-        .where(model_class.id == item_id)
-        .values(**update_data)
-        .execution_options(synchronize_session="fetch")
-    )
-    await db.execute(stmt)
-    await db.commit()
-    await db.refresh(db_item) # Refresh the original instance
+        return await get_directory_item(db, item_id, model_class, user)
+
+    conditions = [model_class.id == item_id, *_owner_conditions(model_class, user)]
+    if db.get_bind().dialect.update_returning:
+        stmt = (
+            sqlalchemy_update(model_class)
+            .where(*conditions)
+            .values(**update_data)
+            .returning(model_class)
+            .execution_options(synchronize_session="fetch", populate_existing=True)
+        )
+        db_item = (await db.execute(stmt)).scalar_one_or_none()
+        if db_item is None:
+            return None
+    else:
+        # No UPDATE ... RETURNING: load the row and let the flush on commit write it
+        db_item = await get_directory_item(db, item_id, model_class, user)
+        if db_item is None:
+            return None
+        for field, value in update_data.items():
+            setattr(db_item, field, value)
+
+    await bump_version(db, model_class.__tablename__, getattr(db_item, "user_id", None))
+    await db.commit() # expire_on_commit=False: db_item stays loaded
     return db_item
 
 async def delete_directory_item(db: AsyncSession, item_id: int, model_class: Type[ModelType], user: Optional[User] = None) -> bool:
-    # First, retrieve the item to ensure it exists and the user has permission
-    db_item = await get_directory_item(db, item_id, model_class, user)
-    if not db_item:
+    deleted = await _delete_returning_owners(db, model_class, [model_class.id == item_id, *_owner_conditions(model_class, user)])
+    if not deleted:
         return False # Item not found or no permission
 
-    stmt = sqlalchemy_delete(model_class).where(model_class.id == item_id)
-    # The permission check is implicitly handled by get_directory_item,
-    # so we don't strictly need to re-filter by user_id here for deletion,
-    # but it's safer if get_directory_item's permission logic were to change.
-    # However, for simplicity, we rely on the fact that db_item would be None if user doesn't have access.
-
-    await db.execute(stmt)
+    await bump_version(db, model_class.__tablename__, deleted[item_id])
     await db.commit()
     return True
 
+async def _delete_returning_owners(db: AsyncSession, model_class: Type[ModelType], conditions: list) -> Dict[int, Optional[int]]:
+    """DELETE по условиям; {id: user_id} удалённых строк (DELETE ... RETURNING, иначе SELECT + DELETE)."""
+    owner_column = getattr(model_class, "user_id", None)
+    columns = (model_class.id, owner_column) if owner_column is not None else (model_class.id,)
+    if db.get_bind().dialect.delete_returning:
+        result = await db.execute(sqlalchemy_delete(model_class).where(*conditions).returning(*columns))
+        rows = result.all()
+    else:
+        rows = (await db.execute(select(*columns).where(*conditions))).all()
+        if rows:
+            await db.execute(sqlalchemy_delete(model_class).where(model_class.id.in_([row[0] for row in rows])))
+    return {row[0]: (row[1] if len(row) > 1 else None) for row in rows}
+
+
+# --- Пакетные операции со справочниками ---
+# One transaction and a fixed number of statements per call, whatever the
+# number of items: rows are inserted with a single executemany INSERT ... RETURNING.
+
+def _chunks(values: Sequence, size: int = BATCH_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _owned_values(item_dict: dict, model_class: Type[ModelType], user: Optional[User]) -> dict:
+    if hasattr(model_class, "user_id") and user:
+        item_dict["user_id"] = user.id
+    else:
+        item_dict.pop("user_id", None)
+    return item_dict
+
+
+async def _insert_many(db: AsyncSession, model_class: Type[ModelType], rows: List[dict]) -> List[int]:
+    """INSERT строк одним executemany; id возвращаются в порядке rows."""
+    if not rows:
+        return []
+    if db.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+        stmt = sqlalchemy_insert(model_class).returning(model_class.id, sort_by_parameter_order=True)
+        return list(await db.scalars(stmt, rows))
+    # Dialects without ordered RETURNING: one statement per row
+    ids = []
+    for row in rows:
+        result = await db.execute(sqlalchemy_insert(model_class).values(**row))
+        ids.append(result.inserted_primary_key[0])
+    return ids
+
+
+async def create_directory_items(db: AsyncSession, items: Sequence[SchemaType], model_class: Type[ModelType], user: Optional[User] = None) -> List[int]:
+    """Создаёт записи одной транзакцией; id в порядке items."""
+    rows = [_owned_values(item.model_dump(), model_class, user) for item in items]
+    ids = await _insert_many(db, model_class, rows)
+    if ids:
+        await bump_version(db, model_class.__tablename__, user.id if user else None)
+    await db.commit()
+    return ids
+
+
+async def upsert_directory_items(
+    db: AsyncSession,
+    items: Sequence[SchemaType],
+    model_class: Type[ModelType],
+    user: Optional[User] = None,
+) -> Tuple[List[int], int, int]:
+    """
+    Создаёт или обновляет записи по name (в пределах записей пользователя).
+    Returns (ids in the order of items, created, updated); repeated names map
+    to one row and the last occurrence wins.
+    """
+    values_by_name: Dict[str, dict] = {} # fields given for updates
+    rows_by_name: Dict[str, dict] = {} # full rows for inserts: executemany needs the same keys
+    for item in items:
+        values = item.model_dump(exclude_unset=True)
+        values.pop("user_id", None)
+        values["name"] = item.name
+        values_by_name.setdefault(item.name, {}).update(values)
+        rows_by_name.setdefault(item.name, item.model_dump()).update(values)
+
+    id_by_name: Dict[str, int] = {}
+    names = list(values_by_name)
+    for chunk in _chunks(names):
+        stmt = select(model_class.id, model_class.name).where(model_class.name.in_(chunk))
+        if hasattr(model_class, "user_id") and user:
+            stmt = stmt.where(model_class.user_id == user.id)
+        for item_id, name in (await db.execute(stmt.order_by(model_class.id))).all():
+            id_by_name.setdefault(name, item_id)
+
+    updates = [
+        {**values, "id": id_by_name[name]}
+        for name, values in values_by_name.items()
+        if name in id_by_name and len(values) > 1 # name alone: nothing to change
+    ]
+    if updates:
+        await db.execute(sqlalchemy_update(model_class), updates)
+
+    new_names = [name for name in names if name not in id_by_name]
+    rows = [_owned_values(rows_by_name[name], model_class, user) for name in new_names]
+    id_by_name.update(zip(new_names, await _insert_many(db, model_class, rows)))
+
+    if updates or new_names:
+        await bump_version(db, model_class.__tablename__, user.id if user else None)
+    await db.commit()
+    return [id_by_name[item.name] for item in items], len(new_names), len(updates)
+
+
+async def delete_directory_items(db: AsyncSession, item_ids: Sequence[int], model_class: Type[ModelType], user: Optional[User] = None) -> List[int]:
+    """Удаляет доступные пользователю записи; возвращает удалённые id в порядке item_ids."""
+    owners: Dict[int, Optional[int]] = {}
+    unique_ids = list(dict.fromkeys(item_ids))
+    for chunk in _chunks(unique_ids):
+        owners.update(await _delete_returning_owners(db, model_class, [model_class.id.in_(chunk), *_owner_conditions(model_class, user)]))
+
+    # Superusers can delete other users' items: every owner's version changes
+    for owner_id in set(owners.values()):
+        await bump_version(db, model_class.__tablename__, owner_id)
+    await db.commit()
+    return [item_id for item_id in unique_ids if item_id in owners]
@@ -1,3 +1,7 @@
+from typing import List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 from app.database.sync_session import engine, SessionLocal
 from app.models.user import User
@@ -5,6 +9,14 @@ from app.utils.security import hash_password
 from app.core.config import settings
 from app.database.base import Base
 
+# Columns added to tables that already existed. create_all only creates
+# missing tables, so on older databases these are added by ALTER TABLE
+# (with their indexes). All are nullable: existing rows need no default.
+ADDED_COLUMNS = {
+    "reviews": ("sentiment", "sentiment_advantages", "sentiment_disadvantages", "aspects"),
+    "promts": ("review_format",),
+}
+
 
 def create_root_user():
     db: Session = SessionLocal()
@@ -25,6 +37,34 @@ def create_root_user():
         db.close()
 
 
+def add_missing_columns(bind: Engine) -> List[str]:
+    """Добавляет колонки из ADDED_COLUMNS, которых ещё нет в базе; возвращает добавленные ("table.column")."""
+    added = []
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        quote = conn.dialect.identifier_preparer.quote
+        for table_name, column_names in ADDED_COLUMNS.items():
+            if not inspector.has_table(table_name):
+                continue # create_all has just created it with every column
+            existing = {column["name"] for column in inspector.get_columns(table_name)}
+            table = Base.metadata.tables[table_name]
+            for name in column_names:
+                if name in existing:
+                    continue
+                column_type = table.c[name].type.compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {quote(table_name)} ADD COLUMN {quote(name)} {column_type}"))
+                added.append(f"{table_name}.{name}")
+            for index in table.indexes:
+                if any(column.name in column_names for column in index.columns):
+                    index.create(conn, checkfirst=True)
+    return added
+
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    added = add_missing_columns(engine)
+    if added:
+        print(f"✅ Добавлены колонки: {', '.join(added)}.")
+        if any(name.startswith("reviews.sentiment") for name in added):
+            print("ℹ️ Оценки тональности существующих отзывов: python manage.py sentiment")
     create_root_user()
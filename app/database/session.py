@@ -1,10 +1,43 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core import metrics
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that reports how long callers wait for a free connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+
+engine_kwargs = {}
+if make_url(settings.DATABASE_URL).get_backend_name() != "sqlite":
+    # SQLite uses its own pool implementations; queue-pool waits only make sense for server DBs
+    engine_kwargs["poolclass"] = InstrumentedAsyncQueuePool
 
 engine = create_async_engine(
-    settings.DATABASE_URL, echo=settings.DEBUG, future=True
+    settings.DATABASE_URL, echo=settings.DEBUG, future=True, **engine_kwargs
 )
 
+
+@event.listens_for(engine.sync_engine, "checkout")
+def _on_pool_checkout(dbapi_connection, connection_record, connection_proxy):
+    metrics.DB_POOL_CHECKOUTS.inc()
+    metrics.DB_POOL_CHECKED_OUT.inc()
+
+
+@event.listens_for(engine.sync_engine, "checkin")
+def _on_pool_checkin(dbapi_connection, connection_record):
+    metrics.DB_POOL_CHECKED_OUT.dec()
+
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
     expire_on_commit=False,
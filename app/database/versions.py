@@ -0,0 +1,65 @@
+"""
+Версии данных для условного кеширования (ETag / 304).
+
+Every write to products, directories and reviews bumps a counter in
+``data_versions`` inside the same transaction. Read endpoints fold the
+relevant counters into an ETag, so a repeat request costs one small query.
+"""
+
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.data_version import DataVersion
+
+# (table_name, scope_id); scope_id=None means "every scope of the table"
+VersionScope = Tuple[str, Optional[int]]
+
+_UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+async def bump_version(db: AsyncSession, table_name: str, scope_id: Optional[int]) -> None:
+    """Увеличивает счётчик (table_name, scope_id); коммит остаётся за вызывающим."""
+    scope_id = scope_id or 0
+    insert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(DataVersion).values(table_name=table_name, scope_id=scope_id, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DataVersion.table_name, DataVersion.scope_id],
+            set_={"version": DataVersion.version + 1},
+        )
+        await db.execute(stmt)
+        return
+
+    result = await db.execute(
+        update(DataVersion)
+        .where(DataVersion.table_name == table_name, DataVersion.scope_id == scope_id)
+        .values(version=DataVersion.version + 1)
+    )
+    if not result.rowcount:
+        db.add(DataVersion(table_name=table_name, scope_id=scope_id, version=1))
+        await db.flush()
+
+
+async def get_versions_token(db: AsyncSession, scopes: Iterable[VersionScope]) -> str:
+    """Одним запросом собирает версии указанных областей в строку вида 'brands=3;products=12'."""
+    conditions = []
+    for table_name, scope_id in scopes:
+        if scope_id is None:
+            conditions.append(DataVersion.table_name == table_name)
+        else:
+            conditions.append((DataVersion.table_name == table_name) & (DataVersion.scope_id == scope_id))
+    if not conditions:
+        return ""
+
+    result = await db.execute(
+        select(DataVersion.table_name, func.sum(DataVersion.version))
+        .where(or_(*conditions))
+        .group_by(DataVersion.table_name)
+    )
+    return ";".join(f"{name}={total}" for name, total in sorted(result.all()))
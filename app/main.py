@@ -18,22 +18,30 @@ from typing import List
 
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
 
 # Core configuration and database
 from app.core.config import settings
+from app.core import metrics
+from app.core.static_files import PrecompressedStaticFiles
 from app.database.init_db import init_db
+from app.services import upload_gc
+from app.services.analysis_jobs import runner as analysis_runner
+from app.services.image_variants import shutdown_executor as shutdown_image_workers
 
 # Middleware
 from app.core.middleware.auth_middleware import AuthMiddleware
 from app.core.middleware.db_middleware import DatabaseMiddleware
 from app.core.middleware.security_headers import SecurityHeadersMiddleware
+from app.core.middleware.metrics_middleware import MetricsMiddleware
+from app.core.middleware.profiling_middleware import ProfilingMiddleware
+from app.core.middleware.compression_middleware import CompressionMiddleware
 
 # API Routers
 from app.api import (
     analysis_router,
     auth_router,
+    metrics_router,
     private_router,
     product_router,
     public_router,
@@ -69,9 +77,29 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
         raise
+
+    # Per-worker metrics snapshots for multi-process aggregation
+    metrics_flusher = None
+    if settings.METRICS_ENABLED and settings.METRICS_DIR:
+        metrics_flusher = asyncio.create_task(metrics.run_flusher(settings.METRICS_FLUSH_INTERVAL))
+
+    # Optional sweep of uploads no row refers to any more (also: manage.py gcuploads)
+    upload_collector = None
+    if settings.UPLOAD_GC_INTERVAL > 0:
+        upload_collector = asyncio.create_task(upload_gc.run_periodic(settings.UPLOAD_GC_INTERVAL))
+
+    # AI analysis jobs (ANALYSIS_WORKERS=0: only a separate `manage.py worker` runs them)
+    await analysis_runner.start(settings.ANALYSIS_WORKERS, settings.ANALYSIS_POLL_INTERVAL)
     
     yield
     
+    await analysis_runner.stop()
+    if metrics_flusher:
+        metrics_flusher.cancel()
+        metrics.flush()
+    if upload_collector:
+        upload_collector.cancel()
+    shutdown_image_workers()
     logger.info("Shutting down AI Review Analyzer application") 
 
 # --- FastAPI Application Configuration ---
@@ -84,7 +112,8 @@ app = FastAPI(
 )
 
 # --- Static files ---
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Hashed files from `manage.py assets` (static/build/) are immutable and served precompressed
+app.mount("/static", PrecompressedStaticFiles(directory="app/static"), name="static")
 
 # --- Middleware configuration ---
 # Order matters: DatabaseMiddleware must run before any middleware requiring DB session
@@ -97,8 +126,16 @@ middleware_config = [
         "same_site": "strict" if settings.is_production else "lax"
     }),
     (AuthMiddleware, {}),
-    (SecurityHeadersMiddleware, {})
+    (SecurityHeadersMiddleware, {}),
 ]
+if settings.COMPRESSION_ENABLED:
+    # Outside of the app middlewares, inside profiling/metrics so its CPU cost is measured
+    middleware_config.append((CompressionMiddleware, {}))
+if settings.PROFILING_ENABLED or settings.PROFILING_SAMPLE_RATE > 0:
+    middleware_config.append((ProfilingMiddleware, {}))
+if settings.METRICS_ENABLED:
+    # Added last so it is the outermost layer and sees the full request latency
+    middleware_config.append((MetricsMiddleware, {}))
 
 for middleware_class, kwargs in middleware_config:
     app.add_middleware(middleware_class, **kwargs)
@@ -109,6 +146,7 @@ app.include_router(public_router)
 app.include_router(private_router)
 app.include_router(product_router) # Assuming product routes are at /product or similar, not /api/product
 app.include_router(analysis_router) # Assuming analysis routes are not /api/analysis
+app.include_router(metrics_router)
 
 # --- Directory routers configuration ---
 def setup_directory_routers() -> List[tuple]:
@@ -1,6 +1,11 @@
+from app.models.ai_usage import AIUsage
+from app.models.analysis_job import AnalysisJob
 from app.models.brand import Brand
 from app.models.category import Category
+from app.models.data_version import DataVersion
 from app.models.image import ProductImage
+from app.models.image_blob import ImageBlob
+from app.models.image_variant import ImageVariant
 from app.models.product import Product
 from app.models.promt import Promt
 from app.models.review import Review
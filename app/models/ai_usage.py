@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+from app.models.analysis_job import utcnow
+
+
+class AIUsage(Base):
+    """
+    Один вызов ИИ: фактические токены из ответа провайдера и стоимость.
+
+    Rows outlive the product and the user they are attributed to (the ids
+    are set to NULL), so totals over a period stay correct.
+    """
+    __tablename__ = "ai_usage"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow, index=True)
+    user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    product_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("products.id", ondelete="SET NULL"), nullable=True, index=True)
+    promt_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    job_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+    provider: Mapped[str] = mapped_column(String(255), nullable=False)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    estimated_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    prompt_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completion_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    reviews_sent: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    reviews_dropped: Mapped[int] = mapped_column(Integer, nullable=False, default=0) # cut to fit the context
+    cost: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+
+    def __repr__(self) -> str:
+        return f"<AIUsage(id={self.id}, product_id={self.product_id}, tokens={self.prompt_tokens}+{self.completion_tokens})>"
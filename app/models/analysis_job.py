@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import DateTime, ForeignKey, Integer, JSON, String, Text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.database.base import Base
+
+if TYPE_CHECKING:
+    from .product import Product
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class AnalysisJob(Base):
+    """
+    Задача ИИ-анализа отзывов товара: очередь и история запусков.
+
+    status goes queued -> running -> done | failed. Finished rows are kept,
+    so the table is also the history of results; the latest successful
+    result is copied to Product.analysis_result.
+    """
+    __tablename__ = "analysis_jobs"
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id", ondelete="CASCADE"), index=True)
+    user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    promt_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    filters: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default=QUEUED, index=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    result: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    product: Mapped["Product"] = relationship("Product", back_populates="analysis_jobs")
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.DONE, self.FAILED)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "product_id": self.product_id,
+            "user_id": self.user_id,
+            "promt_id": self.promt_id,
+            "filters": self.filters,
+            "status": self.status,
+            "attempts": self.attempts,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self) -> str:
+        return f"<AnalysisJob(id={self.id}, product_id={self.product_id}, status='{self.status}')>"
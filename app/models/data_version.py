@@ -0,0 +1,22 @@
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class DataVersion(Base):
+    """
+    Счётчик изменений таблицы в разрезе владельца (scope_id).
+
+    scope_id is the owning user id for products and directories and the
+    product id for reviews; 0 stands for "no owner". Rows are only ever
+    incremented, so the sum over a table is monotonic as well.
+    """
+    __tablename__ = "data_versions"
+
+    table_name: Mapped[str] = mapped_column(String, primary_key=True)
+    scope_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<DataVersion(table_name='{self.table_name}', scope_id={self.scope_id}, version={self.version})>"
@@ -1,12 +1,13 @@
 from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List, Optional
 
 from app.database.base import Base
 
 if TYPE_CHECKING:
     from .user import User
     from .product import Product
+    from .image_variant import ImageVariant
 
 
 class ProductImage(Base):
@@ -21,6 +22,11 @@ class ProductImage(Base):
 
     product: Mapped["Product"] = relationship("Product", back_populates="images")
     user: Mapped["User"] = relationship("User", back_populates="images")
+    variants: Mapped[List["ImageVariant"]] = relationship("ImageVariant", back_populates="image", cascade="all, delete-orphan")
+
+    def variant_path(self, width: int, webp: bool = False) -> Optional[str]:
+        """Путь уменьшенной копии заданной ширины: WebP или в исходном формате (JPEG/PNG)."""
+        return next((v.path for v in self.variants if v.width == width and (v.format == "webp") == webp), None)
 
     def __repr__(self) -> str:
         return f"<ProductImage(id={self.id}, product_id={self.product_id}, path='{self.image_path}')>"
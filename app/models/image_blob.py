@@ -0,0 +1,23 @@
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import Base
+
+
+class ImageBlob(Base):
+    """
+    Файл изображения, адресуемый по содержимому.
+
+    One row per distinct SHA-256 stored under the uploads directory;
+    ``ref_count`` is the number of ProductImage rows whose ``image_path``
+    points at ``path``.
+    """
+    __tablename__ = "image_blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    path: Mapped[str] = mapped_column(String, unique=True, nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<ImageBlob(sha256='{self.sha256}', path='{self.path}', ref_count={self.ref_count})>"
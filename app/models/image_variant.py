@@ -0,0 +1,25 @@
+from sqlalchemy import Integer, String, ForeignKey
+from sqlalchemy.orm import relationship, Mapped, mapped_column
+from typing import TYPE_CHECKING
+
+from app.database.base import Base
+
+if TYPE_CHECKING:
+    from .image import ProductImage
+
+
+class ImageVariant(Base):
+    """Уменьшенная копия ProductImage: ширина слота, формат и путь в каталоге загрузок."""
+    __tablename__ = "image_variants"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    image_id: Mapped[int] = mapped_column(Integer, ForeignKey("product_images.id", ondelete="CASCADE"), index=True)
+
+    width: Mapped[int] = mapped_column(Integer, nullable=False)
+    format: Mapped[str] = mapped_column(String(8), nullable=False)
+    path: Mapped[str] = mapped_column(String, nullable=False)
+
+    image: Mapped["ProductImage"] = relationship("ProductImage", back_populates="variants")
+
+    def __repr__(self) -> str:
+        return f"<ImageVariant(id={self.id}, image_id={self.image_id}, width={self.width}, format='{self.format}')>"
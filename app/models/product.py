@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, select
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from typing import TYPE_CHECKING, List, Optional
 
+from app.core import settings
 from app.database.base import Base
 
 if TYPE_CHECKING:
@@ -11,6 +12,7 @@ if TYPE_CHECKING:
     from .promt import Promt
     from .review import Review
     from .image import ProductImage
+    from .analysis_job import AnalysisJob
 
 
 # Продукты
@@ -37,9 +39,11 @@ class Product(Base):
 
     reviews: Mapped[List["Review"]] = relationship("Review", back_populates="product", cascade="all, delete")
     images: Mapped[List["ProductImage"]] = relationship("ProductImage", back_populates="product", cascade="all, delete")
+    analysis_jobs: Mapped[List["AnalysisJob"]] = relationship("AnalysisJob", back_populates="product", cascade="all, delete")
 
     def to_dict(self):
         main_image = next((img for img in self.images if img.is_main), None)
+        thumbnail_width = settings.IMAGE_THUMBNAIL_WIDTH
         return {
             "id": self.id,
             "name": self.name,
@@ -55,6 +59,88 @@ class Product(Base):
             "promt": {"id": self.promt.id, "name": self.promt.name} if self.promt else None,
             "analysis_result": self.analysis_result,
             "main_image_filename": main_image.image_path if main_image else None,
+            "main_thumbnail_filename": main_image.variant_path(thumbnail_width) if main_image else None,
+            "main_thumbnail_webp_filename": main_image.variant_path(thumbnail_width, webp=True) if main_image else None,
+        }
+
+    @classmethod
+    def list_select(cls):
+        """
+        Lean SELECT for list pages: only the columns to_dict() needs plus the
+        main image and thumbnail paths from correlated subqueries, so no
+        Product/ProductImage entities are hydrated. Rows are turned into dicts
+        by row_to_dict().
+        """
+        from .brand import Brand
+        from .category import Category
+        from .promt import Promt
+        from .image import ProductImage
+        from .image_variant import ImageVariant
+
+        main_image = (
+            select(ProductImage.image_path)
+            .where(ProductImage.product_id == cls.id, ProductImage.is_main == True)
+            .order_by(ProductImage.id)
+            .limit(1)
+            .correlate(cls)
+            .scalar_subquery()
+        )
+
+        def main_thumbnail(webp: bool):
+            fmt_condition = ImageVariant.format == "webp" if webp else ImageVariant.format != "webp"
+            return (
+                select(ImageVariant.path)
+                .join(ProductImage, ImageVariant.image_id == ProductImage.id)
+                .where(
+                    ProductImage.product_id == cls.id,
+                    ProductImage.is_main == True,
+                    ImageVariant.width == settings.IMAGE_THUMBNAIL_WIDTH,
+                    fmt_condition,
+                )
+                .order_by(ProductImage.id)
+                .limit(1)
+                .correlate(cls)
+                .scalar_subquery()
+            )
+
+        return (
+            select(
+                cls.id, cls.name, cls.description, cls.ean, cls.upc,
+                cls.user_id, cls.brand_id, cls.category_id, cls.promt_id,
+                cls.analysis_result,
+                Brand.id.label("brand_ref_id"), Brand.name.label("brand_name"),
+                Category.id.label("category_ref_id"), Category.name.label("category_name"),
+                Promt.id.label("promt_ref_id"), Promt.name.label("promt_name"),
+                main_image.label("main_image_filename"),
+                main_thumbnail(webp=False).label("main_thumbnail_filename"),
+                main_thumbnail(webp=True).label("main_thumbnail_webp_filename"),
+            )
+            .select_from(cls)
+            .outerjoin(Brand, cls.brand_id == Brand.id)
+            .outerjoin(Category, cls.category_id == Category.id)
+            .outerjoin(Promt, cls.promt_id == Promt.id)
+        )
+
+    @staticmethod
+    def row_to_dict(row) -> dict:
+        """Same output as to_dict() for a row produced by list_select()."""
+        return {
+            "id": row.id,
+            "name": row.name,
+            "description": row.description,
+            "ean": row.ean,
+            "upc": row.upc,
+            "user_id": row.user_id,
+            "brand_id": row.brand_id,
+            "category_id": row.category_id,
+            "promt_id": row.promt_id,
+            "brand": {"id": row.brand_ref_id, "name": row.brand_name} if row.brand_ref_id is not None else None,
+            "category": {"id": row.category_ref_id, "name": row.category_name} if row.category_ref_id is not None else None,
+            "promt": {"id": row.promt_ref_id, "name": row.promt_name} if row.promt_ref_id is not None else None,
+            "analysis_result": row.analysis_result,
+            "main_image_filename": row.main_image_filename,
+            "main_thumbnail_filename": row.main_thumbnail_filename,
+            "main_thumbnail_webp_filename": row.main_thumbnail_webp_filename,
         }
 
     def __repr__(self) -> str:
@@ -15,6 +15,7 @@ class Promt(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String, nullable=False)
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    review_format: Mapped[Optional[str]] = mapped_column(String(16), nullable=True) # legacy | table | tsv; None = AI_PROMPT_FORMAT
 
     user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"), nullable=True) # Assuming user_id can be nullable
     user: Mapped[Optional["User"]] = relationship("User", back_populates="promts")
@@ -32,6 +33,7 @@ class Promt(Base):
             "id": self.id,
             "name": self.name,
             "description": self.description,
+            "review_format": self.review_format,
             "user_id": self.user_id,
         }
         if include_user and self.user:
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, JSON
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from typing import TYPE_CHECKING, Optional
 
@@ -22,6 +22,11 @@ class Review(Base):
     rating: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     max_rating: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     normalized_rating: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # Словарная оценка тональности (app/services/sentiment.py): от -1 до 1, None — нечего оценивать
+    sentiment: Mapped[Optional[float]] = mapped_column(Float, nullable=True, index=True)
+    sentiment_advantages: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    sentiment_disadvantages: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    aspects: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True) # {"цена": -0.5, "доставка": 0.6}
 
     product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id"))
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"))
@@ -43,6 +48,10 @@ class Review(Base):
             "rating": self.rating,
             "max_rating": self.max_rating,
             "normalized_rating": self.normalized_rating,
+            "sentiment": self.sentiment,
+            "sentiment_advantages": self.sentiment_advantages,
+            "sentiment_disadvantages": self.sentiment_disadvantages,
+            "aspects": self.aspects,
         }
 
     def __repr__(self) -> str:
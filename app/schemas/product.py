@@ -36,6 +36,8 @@ class Product(ProductInDBBase):
     category: Optional[dict] = None # Simplified representation for now
     promt: Optional[dict] = None # Simplified representation for now
     main_image_filename: Optional[str] = None
+    main_thumbnail_filename: Optional[str] = None
+    main_thumbnail_webp_filename: Optional[str] = None
     # Add other related data if needed, e.g., images, reviews
 
 # Schema for product list items (could be a subset of Product)
@@ -1,9 +1,13 @@
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import BaseModel, Field
 
+# How reviews are serialized into the prompt, see app/services/prompt_format.py
+ReviewFormat = Literal["legacy", "table", "tsv"]
+
 class PromtBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=255)
     description: Optional[str] = None
+    review_format: Optional[ReviewFormat] = None # None: AI_PROMPT_FORMAT
 
 class PromtCreate(PromtBase):
     pass
@@ -11,6 +15,7 @@ class PromtCreate(PromtBase):
 class PromtUpdate(PromtBase):
     name: Optional[str] = Field(None, min_length=1, max_length=255) # All fields optional for update
     description: Optional[str] = None
+    review_format: Optional[ReviewFormat] = None
 
 class PromtInDBBase(PromtBase):
     id: int
@@ -1,8 +1,8 @@
 # app/schemas/review.py
 
 import re
-from typing import Optional
-from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 # ======= Функции безопасного преобразования =======
 
@@ -101,3 +101,67 @@ class ReviewUploadIn(BaseModel):
         if v is not None and not (0 <= v <= 100):
             raise ValueError("normalized_rating должен быть от 0 до 100")
         return v
+
+
+# ======= Массовые операции =======
+
+class ReviewFilters(BaseModel):
+    """Фильтры страницы анализа (те же поля, что у AnalyzeFilters, без promt_id)."""
+    importance: Optional[int] = 0
+    source: Optional[str] = ""
+    text: Optional[str] = ""
+    advantages: Optional[str] = ""
+    disadvantages: Optional[str] = ""
+    normalized_rating_min: Optional[int] = 0
+    normalized_rating_max: Optional[int] = 0
+    sentiment_min: Optional[float] = None # -1..1, see app/services/sentiment.py
+    sentiment_max: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        """Есть ли хоть одно условие (по тем же правилам, что review_filter_conditions)."""
+        return bool(
+            self.importance or self.source or self.text or self.advantages or self.disadvantages
+            or self.normalized_rating_min or self.normalized_rating_max
+            or self.sentiment_min is not None or self.sentiment_max is not None
+        )
+
+
+class ReviewBulkSelection(BaseModel):
+    """
+    Какие отзывы товара затрагивает операция: список id, фильтры как у
+    /analyze/data, или и то и другое (пересечение). Все отзывы товара —
+    только явно, через all=true: пустые фильтры ничего не выбирают.
+    """
+    product_id: int
+    ids: Optional[List[int]] = None
+    filters: Optional[ReviewFilters] = None
+    all: bool = False
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        narrowed = bool(self.ids) or (self.filters is not None and self.filters.active)
+        if self.all and (self.ids is not None or self.filters is not None):
+            raise ValueError("all=true нельзя сочетать с ids или filters")
+        if not self.all and not narrowed:
+            raise ValueError("Нужно указать непустой ids или хотя бы один фильтр (или all=true для всех отзывов товара)")
+        return self
+
+
+class ReviewBulkValues(BaseModel):
+    importance: Optional[int] = Field(default=None, ge=1)
+    source: Optional[str] = Field(default=None, max_length=100)
+    text: Optional[str] = None
+    advantages: Optional[str] = None
+    disadvantages: Optional[str] = None
+    normalized_rating: Optional[int] = Field(default=None, ge=0, le=100)
+
+
+class ReviewBulkUpdate(ReviewBulkSelection):
+    values: ReviewBulkValues
+
+    @model_validator(mode="after")
+    def check_values(self):
+        if not self.values.model_fields_set:
+            raise ValueError("Нет полей для обновления")
+        return self
@@ -1,2 +1,12 @@
+from app.services import ai_providers as ai_providers
+from app.services import ai_usage as ai_usage
+from app.services import analysis_jobs as analysis_jobs
+from app.services import catalogue as catalogue
+from app.services import image_store as image_store
+from app.services import image_variants as image_variants
 from app.services import openai_service as openai_service
+from app.services import prompt_format as prompt_format
+from app.services import review_export as review_export
 from app.services import review_service as review_service
+from app.services import sentiment as sentiment
+from app.services import upload_gc as upload_gc
@@ -0,0 +1,217 @@
+"""
+Провайдеры ИИ-анализа и маршрутизация между ними.
+
+* OpenAICompatibleProvider: POST {base_url}/chat/completions of any
+  OpenAI-compatible endpoint (OpenAI, Azure/vLLM/Ollama gateways).
+* LocalProvider: a deterministic answer built by ``fake_analysis``, with
+  no network, for tests, CI and benchmarks (``AI_PROVIDER=local``).
+
+ProviderRouter spreads calls across several endpoints (OPENAI_API_BASES),
+either at random by weight or to the endpoint with the lowest recent
+latency. Each endpoint has its own circuit breaker, so an endpoint that is
+down is skipped, and a retry goes to an endpoint not yet tried in the call.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Set
+
+import httpx
+from fastapi import HTTPException
+
+from app.core import metrics, settings
+from app.utils.resilience import CircuitBreaker, CircuitOpenError, TransientError, parse_retry_after
+from app.utils.tokens import estimate_tokens
+
+# Rate limits and server errors: worth another attempt after a pause
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+LATENCY_SMOOTHING = 0.3 # weight of the newest sample in the moving average
+REVIEWS_CAPTION = "Отзывы пользователей:" # separates the instruction from the reviews in a prompt
+
+
+@dataclass
+class Completion:
+    content: str
+    provider: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    recorded: bool = False # usage already written: coalesced callers share one Completion
+
+
+class AIProvider:
+    """Один бэкенд: complete() делает одну попытку; TransientError — повторяемый сбой."""
+
+    name = "provider"
+    rate_limited = True # waits for the shared RPM/TPM limiter before each attempt
+
+    def __init__(self, weight: float = 1.0, breaker: Optional[CircuitBreaker] = None):
+        self.weight = weight
+        self.breaker = breaker or CircuitBreaker(
+            settings.OPENAI_BREAKER_THRESHOLD, settings.OPENAI_BREAKER_RESET, name=self.name
+        )
+        self.latency: Optional[float] = None # moving average, seconds
+
+    def observe(self, seconds: float) -> None:
+        self.latency = seconds if self.latency is None else (
+            LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * self.latency
+        )
+
+    async def complete(self, client: httpx.AsyncClient, prompt: str, estimated_tokens: int) -> Completion:
+        raise NotImplementedError
+
+    async def call(self, client: httpx.AsyncClient, prompt: str, estimated_tokens: int) -> Completion:
+        """complete() под circuit breaker'ом провайдера, с учётом задержки."""
+        self.breaker.before_call()
+        started_at = time.perf_counter()
+        try:
+            completion = await self.complete(client, prompt, estimated_tokens)
+        except TransientError:
+            self.breaker.record_failure()
+            self.observe(max(time.perf_counter() - started_at, settings.OPENAI_TIMEOUT)) # slow down its score
+            metrics.AI_PROVIDER_REQUESTS.labels(self.name, "error").inc()
+            raise
+        except Exception:
+            self.breaker.record_success() # it answered: only this request was wrong
+            metrics.AI_PROVIDER_REQUESTS.labels(self.name, "error").inc()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        self.observe(time.perf_counter() - started_at)
+        metrics.AI_PROVIDER_REQUESTS.labels(self.name, "ok").inc()
+        return completion
+
+
+class OpenAICompatibleProvider(AIProvider):
+    def __init__(self, base_url: str, api_key: str, model: str, weight: float = 1.0, breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url.rstrip("/")
+        self.name = self.base_url
+        self.api_key = api_key
+        self.model = model
+        super().__init__(weight, breaker)
+
+    async def complete(self, client: httpx.AsyncClient, prompt: str, estimated_tokens: int) -> Completion:
+        from app.services.openai_service import limiter # per-process AI state lives there
+
+        model = self.model
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.7, # Consider making this configurable
+        }
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        try:
+            response = await client.post(f"{self.base_url}/chat/completions", headers=headers, json=payload)
+        except httpx.TimeoutException:
+            metrics.AI_ERRORS.labels(model, "timeout").inc()
+            raise TransientError("timeout", status_code=504)
+        except httpx.TransportError:
+            metrics.AI_ERRORS.labels(model, "connection").inc()
+            raise TransientError("connection", status_code=502)
+
+        if response.status_code != 200:
+            error_text = await response.aread()
+            # Log the detailed error for backend visibility
+            print(f"❌ Ошибка от {self.base_url}: {response.status_code} {error_text.decode(errors='replace')}")
+            metrics.AI_ERRORS.labels(model, f"http_{response.status_code}").inc()
+            if response.status_code in RETRY_STATUSES:
+                raise TransientError(
+                    f"http_{response.status_code}",
+                    status_code=response.status_code,
+                    retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                )
+            # Provide a more generic error to the client
+            raise HTTPException(status_code=response.status_code, detail="Ошибка при обращении к ИИ-сервису.")
+
+        data = response.json()
+        usage = data.get("usage") or {}
+        limiter.record_usage(estimated_tokens, usage.get("total_tokens"))
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind):
+                metrics.AI_TOKENS.labels(model, kind.replace("_tokens", "")).inc(usage[kind])
+        if "choices" in data and len(data["choices"]) > 0 and "message" in data["choices"][0] and "content" in data["choices"][0]["message"]:
+            content = data["choices"][0]["message"]["content"]
+            # Some compatible servers omit usage: fall back to the estimates
+            return Completion(
+                content, self.name, model,
+                prompt_tokens=usage.get("prompt_tokens") or estimated_tokens,
+                completion_tokens=usage.get("completion_tokens") or estimate_tokens(content),
+            )
+        # Log unexpected response structure
+        print(f"❌ Неожиданный формат ответа от {self.base_url}: {data}")
+        metrics.AI_ERRORS.labels(model, "bad_response").inc()
+        raise HTTPException(status_code=500, detail="Неожиданный формат ответа от ИИ-сервиса.")
+
+
+class LocalProvider(AIProvider):
+    """Детерминированный ответ без сети: fake_analysis по строкам отзывов из промпта."""
+
+    name = "local"
+    rate_limited = False
+
+    def __init__(self, latency: float = 0.0, weight: float = 1.0):
+        self.simulated_latency = latency
+        super().__init__(weight, CircuitBreaker(0, name=self.name)) # never opens
+
+    async def complete(self, client: httpx.AsyncClient, prompt: str, estimated_tokens: int) -> Completion:
+        from app.services.openai_service import fake_analysis
+
+        if self.simulated_latency:
+            await asyncio.sleep(self.simulated_latency)
+        _, _, reviews = prompt.partition(f"\n{REVIEWS_CAPTION}\n")
+        content = fake_analysis([line for line in reviews.splitlines() if line.strip()])
+        return Completion(content, self.name, self.name, estimated_tokens, estimate_tokens(content))
+
+
+class ProviderRouter:
+    WEIGHTED, LATENCY = "weighted", "latency"
+
+    def __init__(self, providers: Iterable[AIProvider], strategy: str = WEIGHTED, rng: Callable[[], float] = random.random):
+        self.providers: List[AIProvider] = list(providers)
+        if not self.providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+        if strategy not in (self.WEIGHTED, self.LATENCY):
+            raise ValueError(f"Unknown AI routing strategy: {strategy}")
+        self.strategy = strategy
+        self.rng = rng
+
+    def pick(self, exclude: Set[AIProvider] = frozenset()) -> AIProvider:
+        """Провайдер для следующей попытки; сначала не пробованные в этом вызове."""
+        candidates = [p for p in self.providers if p.breaker.available and p.weight > 0]
+        if not candidates:
+            raise CircuitOpenError("all AI providers are unavailable")
+        candidates = [p for p in candidates if p not in exclude] or candidates
+
+        if self.strategy == self.LATENCY:
+            # Endpoints without a sample yet go first so that each gets measured
+            return min(candidates, key=lambda p: -1.0 if p.latency is None else p.latency)
+
+        point = self.rng() * sum(p.weight for p in candidates)
+        for provider in candidates:
+            point -= provider.weight
+            if point < 0:
+                return provider
+        return candidates[-1]
+
+
+def build_router() -> ProviderRouter:
+    """Маршрутизатор по настройкам: AI_PROVIDER, OPENAI_API_BASES / OPENAI_API_WEIGHTS, AI_ROUTING."""
+    if settings.AI_PROVIDER == "local":
+        return ProviderRouter([LocalProvider(settings.AI_LOCAL_LATENCY)])
+    if settings.AI_PROVIDER != "openai":
+        raise ValueError(f"Unknown AI_PROVIDER: {settings.AI_PROVIDER}")
+
+    bases = settings.OPENAI_API_BASES or [settings.OPENAI_API_BASE]
+    weights = list(settings.OPENAI_API_WEIGHTS) + [1.0] * (len(bases) - len(settings.OPENAI_API_WEIGHTS))
+    providers = [
+        OpenAICompatibleProvider(base, settings.OPENAI_API_KEY, settings.OPENAI_MODEL, weight)
+        for base, weight in zip(bases, weights)
+    ]
+    return ProviderRouter(providers, settings.AI_ROUTING)
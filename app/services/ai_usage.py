@@ -0,0 +1,78 @@
+"""
+Учёт токенов и стоимости вызовов ИИ по пользователям, товарам и промптам.
+
+analyze_reviews records one AIUsage row per provider call with the token
+counts the provider reported (a coalesced duplicate call records
+nothing). usage_summary() sums them per user, product or prompt over a
+period for GET /api/ai/usage.
+"""
+
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics, settings
+from app.models import AIUsage, User
+from app.models.analysis_job import utcnow
+from app.services.ai_providers import Completion, LocalProvider
+
+USAGE_GROUPS = {
+    "user": AIUsage.user_id,
+    "product": AIUsage.product_id,
+    "promt": AIUsage.promt_id,
+    "model": AIUsage.model,
+}
+
+
+def completion_cost(completion: Completion) -> float:
+    if completion.provider == LocalProvider.name:
+        return 0.0
+    return (
+        completion.prompt_tokens * settings.OPENAI_PROMPT_PRICE
+        + completion.completion_tokens * settings.OPENAI_COMPLETION_PRICE
+    ) / 1_000_000
+
+
+def record_usage(db: AsyncSession, completion: Completion, **attribution: Any) -> Optional[AIUsage]:
+    """Добавляет запись в сессию (коммит — за вызывающим); повторно для той же Completion — ничего."""
+    if completion.recorded:
+        return None
+    completion.recorded = True
+    usage = AIUsage(
+        provider=completion.provider,
+        model=completion.model,
+        prompt_tokens=completion.prompt_tokens,
+        completion_tokens=completion.completion_tokens,
+        cost=completion_cost(completion),
+        **attribution,
+    )
+    db.add(usage)
+    metrics.AI_COST.labels(completion.model).inc(usage.cost)
+    return usage
+
+
+async def usage_summary(db: AsyncSession, group_by: str, days: int, user: Optional[User] = None) -> List[Dict[str, Any]]:
+    """Суммы за последние days дней по группе; без user (суперпользователь) — по всем."""
+    key = USAGE_GROUPS[group_by]
+    stmt = (
+        select(
+            key.label("key"),
+            func.count(AIUsage.id).label("calls"),
+            func.sum(AIUsage.prompt_tokens).label("prompt_tokens"),
+            func.sum(AIUsage.completion_tokens).label("completion_tokens"),
+            func.sum(AIUsage.reviews_sent).label("reviews_sent"),
+            func.sum(AIUsage.reviews_dropped).label("reviews_dropped"),
+            func.sum(AIUsage.cost).label("cost"),
+        )
+        .where(AIUsage.created_at >= utcnow() - timedelta(days=days))
+        .group_by(key)
+        .order_by(func.sum(AIUsage.cost).desc(), func.count(AIUsage.id).desc())
+    )
+    if user is not None:
+        stmt = stmt.where(AIUsage.user_id == user.id)
+    return [
+        {**row._asdict(), "cost": round(row.cost or 0.0, 6)}
+        for row in (await db.execute(stmt)).all()
+    ]
@@ -0,0 +1,290 @@
+"""
+Очередь задач ИИ-анализа отзывов.
+
+``POST /analyze/{product_id}`` only inserts a queued AnalysisJob and returns
+its id; a bounded pool of asyncio workers runs ``analyze_reviews`` and stores
+the result on the job and on Product.analysis_result. Clients poll
+``GET /analyze/jobs/{id}`` (optionally long-polling with ``wait``).
+
+The jobs table is the queue. A job is claimed with a conditional UPDATE
+(queued -> running), so every app process and ``manage.py worker`` can share
+it without running a job twice. Each runner also polls the table, which
+picks up jobs queued before a restart, jobs submitted to other processes and
+jobs left "running" by a crashed worker once they are older than
+ANALYSIS_STALE_AFTER. On a clean shutdown the jobs in progress go straight
+back to the queue.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics, settings
+from app.database.versions import bump_version
+from app.models import AnalysisJob, Product, Review, User
+from app.models.analysis_job import utcnow
+from app.schemas.review import ReviewFilters
+from app.services.openai_service import analyze_reviews
+from app.services.review_service import review_filter_conditions
+
+logger = logging.getLogger(__name__)
+
+POLL_BATCH_SIZE = 100
+HISTORY_LIMIT = 20
+
+
+async def collect_structured_reviews(db: AsyncSession, product_id: int, user: Optional[User], filters) -> List[Dict[str, Any]]:
+    """Отзывы товара по фильтрам в виде, который получает analyze_reviews."""
+    stmt = select(
+        Review.importance, Review.source, Review.text, Review.advantages, Review.disadvantages, Review.normalized_rating
+    ).where(Review.product_id == product_id, *review_filter_conditions(filters))
+    if user is not None and not user.is_superuser:
+        stmt = stmt.where(Review.user_id == user.id)
+    result = await db.execute(stmt.order_by(Review.id))
+    # Raw values: each prompt format decides how to show missing ones (app/services/prompt_format.py)
+    return [{
+        "importance": r.importance,
+        "source": r.source,
+        "text": r.text,
+        "advantages": r.advantages,
+        "disadvantages": r.disadvantages,
+        "rating": r.normalized_rating,
+    } for r in result.all()]
+
+
+async def submit_job(db: AsyncSession, product: Product, user: User, filters) -> AnalysisJob:
+    """Ставит анализ в очередь; коммит и runner.enqueue() — за вызывающим."""
+    job = AnalysisJob(
+        product_id=product.id,
+        user_id=user.id,
+        promt_id=filters.promt_id or None,
+        filters=ReviewFilters(**filters.model_dump(exclude={"promt_id"})).model_dump(),
+        status=AnalysisJob.QUEUED,
+    )
+    db.add(job)
+    await db.flush()
+    return job
+
+
+async def get_job(db: AsyncSession, job_id: int) -> Optional[AnalysisJob]:
+    result = await db.execute(select(AnalysisJob).where(AnalysisJob.id == job_id).execution_options(populate_existing=True))
+    return result.scalar_one_or_none()
+
+
+async def wait_for_job(db: AsyncSession, job_id: int, timeout: float, interval: Optional[float] = None) -> Optional[AnalysisJob]:
+    """Long-poll: ждёт завершения задачи не дольше timeout секунд."""
+    interval = settings.ANALYSIS_WAIT_INTERVAL if interval is None else interval
+    deadline = time.monotonic() + timeout
+    while True:
+        job = await get_job(db, job_id)
+        if job is None or job.finished or time.monotonic() >= deadline:
+            return job
+        # Close the transaction so that the next read sees other sessions' commits
+        await db.commit()
+        await asyncio.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+
+
+async def job_history(db: AsyncSession, product_id: int, limit: int = HISTORY_LIMIT) -> List[AnalysisJob]:
+    result = await db.execute(
+        select(AnalysisJob).where(AnalysisJob.product_id == product_id).order_by(AnalysisJob.id.desc()).limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+# --- Выполнение ---
+
+async def claim_job(db: AsyncSession, job_id: int) -> bool:
+    """queued -> running; False, если задачу уже взял другой воркер."""
+    result = await db.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.id == job_id, AnalysisJob.status == AnalysisJob.QUEUED)
+        .values(status=AnalysisJob.RUNNING, started_at=utcnow(), attempts=AnalysisJob.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def run_job(db: AsyncSession, job_id: int) -> bool:
+    """Выполняет задачу, если удалось её взять; результат коммитится здесь же."""
+    if not await claim_job(db, job_id):
+        return False
+
+    started_at = time.perf_counter()
+    job = await get_job(db, job_id)
+    try:
+        product = await db.get(Product, job.product_id)
+        if product is None:
+            raise LookupError("Товар удалён")
+        user = await db.get(User, job.user_id) if job.user_id else None
+        reviews = await collect_structured_reviews(db, product.id, user, ReviewFilters(**job.filters))
+        result = await analyze_reviews(
+            reviews, promt_id=job.promt_id, db=db, user_id=job.user_id, product_id=product.id, job_id=job.id
+        )
+    except Exception as e:
+        await db.rollback()
+        error = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.warning(f"Analysis job {job_id} failed: {error}")
+        await _finish(db, job_id, AnalysisJob.FAILED, error=str(error))
+        return True
+
+    job.status, job.result, job.error, job.finished_at = AnalysisJob.DONE, result, None, utcnow()
+    product.analysis_result = result
+    # analysis_result is part of /dashboard/data rows
+    await bump_version(db, "products", product.user_id)
+    await db.commit()
+    metrics.ANALYSIS_JOBS.labels(AnalysisJob.DONE).inc()
+    metrics.ANALYSIS_JOB_DURATION.observe(time.perf_counter() - started_at)
+    return True
+
+
+async def _finish(db: AsyncSession, job_id: int, status: str, error: Optional[str] = None) -> None:
+    await db.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.id == job_id)
+        .values(status=status, error=error, finished_at=utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    metrics.ANALYSIS_JOBS.labels(status).inc()
+
+
+async def requeue_stale(db: AsyncSession, stale_after: float, max_attempts: int) -> int:
+    """Задачи, зависшие в running (упавший воркер): снова в очередь или failed после max_attempts."""
+    cutoff = utcnow() - timedelta(seconds=stale_after)
+    stale = (AnalysisJob.status == AnalysisJob.RUNNING, AnalysisJob.started_at < cutoff)
+    await db.execute(
+        update(AnalysisJob)
+        .where(*stale, AnalysisJob.attempts >= max_attempts)
+        .values(status=AnalysisJob.FAILED, error="Превышено число попыток", finished_at=utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(
+        update(AnalysisJob).where(*stale).values(status=AnalysisJob.QUEUED).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if result.rowcount:
+        logger.warning(f"Re-queued {result.rowcount} stale analysis jobs")
+    return result.rowcount
+
+
+async def queued_job_ids(db: AsyncSession, limit: int = POLL_BATCH_SIZE) -> List[int]:
+    result = await db.execute(
+        select(AnalysisJob.id).where(AnalysisJob.status == AnalysisJob.QUEUED).order_by(AnalysisJob.id).limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+class AnalysisRunner:
+    """Пул из N asyncio-воркеров над таблицей analysis_jobs (один на процесс)."""
+
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self.queue: Optional[asyncio.Queue] = None
+        self.pending: Set[int] = set() # queued locally or running here
+        self.running: Set[int] = set()
+        self.tasks: List[asyncio.Task] = []
+
+    @property
+    def started(self) -> bool:
+        return self.queue is not None
+
+    def _session(self) -> AsyncSession:
+        if self.session_factory is None:
+            from app.database.session import AsyncSessionLocal
+            self.session_factory = AsyncSessionLocal
+        return self.session_factory()
+
+    def enqueue(self, job_id: int) -> None:
+        """Запустить задачу без ожидания опроса; без запущенного пула её возьмёт опрос другого процесса."""
+        if self.queue is None or job_id in self.pending:
+            return
+        self.pending.add(job_id)
+        self.queue.put_nowait(job_id)
+
+    async def start(self, workers: int, poll_interval: float) -> None:
+        if workers <= 0 or self.started:
+            return
+        self.queue = asyncio.Queue()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(workers)]
+        self.tasks.append(asyncio.create_task(self._poll(poll_interval)))
+        logger.info(f"Analysis runner started with {workers} workers")
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        if self.running:
+            # Interrupted jobs go back to the queue for the next start
+            async with self._session() as db:
+                await db.execute(
+                    update(AnalysisJob)
+                    .where(AnalysisJob.id.in_(self.running), AnalysisJob.status == AnalysisJob.RUNNING)
+                    .values(status=AnalysisJob.QUEUED)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        self.tasks, self.queue = [], None
+        self.pending.clear()
+        self.running.clear()
+
+    async def poll_once(self) -> None:
+        async with self._session() as db:
+            await requeue_stale(db, settings.ANALYSIS_STALE_AFTER, settings.ANALYSIS_MAX_ATTEMPTS)
+            for job_id in await queued_job_ids(db):
+                self.enqueue(job_id)
+
+    async def _poll(self, interval: float) -> None:
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.warning(f"Analysis job poll failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self.queue.get()
+            self.running.add(job_id)
+            try:
+                async with self._session() as db:
+                    await run_job(db, job_id)
+            except Exception as e:
+                logger.exception(f"Analysis job {job_id} crashed: {e}")
+            finally:
+                self.running.discard(job_id)
+                self.pending.discard(job_id)
+                self.queue.task_done()
+
+
+runner = AnalysisRunner()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run queued AI analysis jobs outside the web process")
+    parser.add_argument("--workers", type=int, default=max(1, settings.ANALYSIS_WORKERS))
+    parser.add_argument("--poll-interval", type=float, default=settings.ANALYSIS_POLL_INTERVAL)
+    args = parser.parse_args(argv)
+
+    async def run() -> None:
+        await runner.start(args.workers, args.poll_interval)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+Массовый импорт товаров и потоковая выгрузка каталога.
+
+The import reads CSV, NDJSON or XLSX row by row in a worker thread and
+applies it in batches of IMPORT_BATCH_SIZE rows:
+
+* brand and category names are resolved through a name -> id map loaded
+  once per import; missing names are created for the importing user in one
+  flush per batch;
+* products are matched by EAN, then UPC, among the user's products with one
+  SELECT per batch; rows with neither are matched by case-folded name (a
+  name shared by several products is reported, not guessed). Matches are
+  updated and the rest inserted with two executemany statements. Empty
+  cells keep the stored value.
+
+The export streams the same columns from a server-side cursor, so a
+catalogue export can be fed back into the import.
+"""
+
+import csv
+import io
+import json
+import logging
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Type
+
+import openpyxl
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.versions import bump_version
+from app.models import Brand, Category, Product
+from app.utils.export_writers import Rows, streaming_export, unescape_formula
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_FIELDS = ("name", "description", "ean", "upc", "brand", "category")
+IMPORT_FORMATS = ("csv", "ndjson", "jsonl", "xlsx")
+IMPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+# Column lengths of products.ean / products.upc
+CODE_LENGTHS = {"ean": 13, "upc": 12}
+
+
+@dataclass
+class ImportReport:
+    total_rows: int = 0
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    brands_created: int = 0
+    categories_created: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def error(self, line: int, message: str) -> None:
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"Строка #{line}: {message}")
+
+
+# --- Чтение файла (в потоке) ---
+
+def iter_file_rows(fileobj, filename: str) -> Iterator[Dict[str, Any]]:
+    """Строки файла как dict с ключами в нижнем регистре; файл не читается целиком."""
+    ext = (filename or "").lower().rsplit(".", 1)[-1]
+    if ext not in IMPORT_FORMATS:
+        raise ValueError("Формат файла должен быть .csv, .ndjson или .xlsx")
+    if ext == "xlsx":
+        return _iter_xlsx(fileobj)
+    return _iter_text(fileobj, ext)
+
+
+def _iter_xlsx(fileobj) -> Iterator[Dict[str, Any]]:
+    workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [str(h or "").strip().lower() for h in next(rows, ())]
+        for row in rows:
+            yield dict(zip(headers, row))
+    finally:
+        workbook.close()
+
+
+def _iter_text(fileobj, ext: str) -> Iterator[Dict[str, Any]]:
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    if ext == "csv":
+        for row in csv.DictReader(text):
+            yield {str(k).strip().lower(): unescape_formula(v) for k, v in row.items() if k is not None}
+    else:
+        for line in text:
+            if line.strip():
+                yield {str(k).strip().lower(): v for k, v in json.loads(line).items()}
+
+
+def _take(rows: Iterator[Dict[str, Any]], size: int) -> List[Dict[str, Any]]:
+    return list(islice(rows, size))
+
+
+# --- Нормализация ---
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _code(value: Any) -> Optional[str]:
+    # Excel stores barcodes as numbers: 4006381333931.0 -> "4006381333931"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return _text(value)
+
+
+def normalize_row(raw: Dict[str, Any]) -> Tuple[Dict[str, Optional[str]], Optional[str]]:
+    row = {
+        "name": _text(raw.get("name")),
+        "description": _text(raw.get("description")),
+        "ean": _code(raw.get("ean")),
+        "upc": _code(raw.get("upc")),
+        "brand": _text(raw.get("brand")),
+        "category": _text(raw.get("category")),
+    }
+    for code, length in CODE_LENGTHS.items():
+        if row[code] and len(row[code]) > length:
+            return row, f"{code.upper()} длиннее {length} символов: «{row[code]}»"
+    if not any(row.values()):
+        return row, "нет данных"
+    return row, None
+
+
+# --- Справочники ---
+
+class DirectoryMap:
+    """name -> id для справочника пользователя; недостающие записи создаются пачкой."""
+
+    def __init__(self, model: Type[Any], user_id: int):
+        self.model = model
+        self.user_id = user_id
+        self.ids: Dict[str, int] = {}
+        self.created = 0
+
+    @staticmethod
+    def key(name: str) -> str:
+        return name.casefold()
+
+    async def load(self, db: AsyncSession) -> "DirectoryMap":
+        result = await db.execute(
+            select(self.model.id, self.model.name).where(self.model.user_id == self.user_id).order_by(self.model.id)
+        )
+        for item_id, name in result.all():
+            self.ids.setdefault(self.key(name.strip()), item_id)
+        return self
+
+    async def resolve(self, db: AsyncSession, names) -> None:
+        missing = {}
+        for name in names:
+            if name and self.key(name) not in self.ids:
+                missing.setdefault(self.key(name), name)
+        if not missing:
+            return
+        items = [self.model(name=name, user_id=self.user_id) for name in missing.values()]
+        db.add_all(items)
+        await db.flush()
+        for item in items:
+            self.ids[self.key(item.name)] = item.id
+        self.created += len(items)
+
+    def get(self, name: Optional[str]) -> Optional[int]:
+        return self.ids.get(self.key(name)) if name else None
+
+
+# --- Импорт ---
+
+async def import_catalogue(
+    db: AsyncSession,
+    fileobj,
+    filename: str,
+    user_id: int,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> ImportReport:
+    """Импортирует файл в каталог пользователя; коммит остаётся за вызывающим."""
+    report = ImportReport()
+    rows = await run_in_threadpool(iter_file_rows, fileobj, filename)
+    brands = await DirectoryMap(Brand, user_id).load(db)
+    categories = await DirectoryMap(Category, user_id).load(db)
+
+    while True:
+        try:
+            raw_rows = await run_in_threadpool(_take, rows, batch_size)
+        except Exception as e:
+            # Broken file in the middle: keep what was already applied, report where it stopped
+            report.errors.append(f"Ошибка чтения файла после строки #{report.total_rows + 1}: {e}")
+            break
+        if not raw_rows:
+            break
+        await _apply_batch(db, user_id, raw_rows, report, brands, categories)
+
+    report.brands_created, report.categories_created = brands.created, categories.created
+    if report.created or report.updated:
+        await bump_version(db, "products", user_id)
+    if brands.created:
+        await bump_version(db, "brands", user_id)
+    if categories.created:
+        await bump_version(db, "categories", user_id)
+    return report
+
+
+async def _apply_batch(
+    db: AsyncSession,
+    user_id: int,
+    raw_rows: List[Dict[str, Any]],
+    report: ImportReport,
+    brands: DirectoryMap,
+    categories: DirectoryMap,
+) -> None:
+    # Header is line 1: the first data row is line 2
+    first_line = report.total_rows + 2
+    report.total_rows += len(raw_rows)
+
+    rows: List[Tuple[int, Dict[str, Optional[str]]]] = []
+    for offset, raw in enumerate(raw_rows):
+        row, error = normalize_row(raw)
+        if error:
+            report.error(first_line + offset, error)
+        else:
+            rows.append((first_line + offset, row))
+    if not rows:
+        return
+
+    await brands.resolve(db, (row["brand"] for _, row in rows))
+    await categories.resolve(db, (row["category"] for _, row in rows))
+
+    eans = {row["ean"] for _, row in rows if row["ean"]}
+    upcs = {row["upc"] for _, row in rows if row["upc"]}
+    by_ean: Dict[str, int] = {}
+    by_upc: Dict[str, int] = {}
+    if eans or upcs:
+        conditions = []
+        if eans:
+            conditions.append(Product.ean.in_(eans))
+        if upcs:
+            conditions.append(Product.upc.in_(upcs))
+        result = await db.execute(
+            select(Product.id, Product.ean, Product.upc).where(Product.user_id == user_id, or_(*conditions))
+        )
+        for product_id, ean, upc in result.all():
+            if ean:
+                by_ean.setdefault(ean, product_id)
+            if upc:
+                by_upc.setdefault(upc, product_id)
+
+    # Rows without a barcode (e.g. from a catalogue export) are matched by name
+    names = {row["name"] for _, row in rows if row["name"] and not row["ean"] and not row["upc"]}
+    by_name: Dict[str, List[int]] = {}
+    if names:
+        # lower() is ASCII-only on SQLite: exact names are looked up as well
+        result = await db.execute(
+            select(Product.id, Product.name).where(
+                Product.user_id == user_id,
+                or_(Product.name.in_(names), func.lower(Product.name).in_({name.lower() for name in names})),
+            )
+        )
+        for product_id, name in result.all():
+            by_name.setdefault(DirectoryMap.key(name.strip()), []).append(product_id)
+
+    updates: Dict[int, Dict[str, Any]] = {}
+    inserts: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for line, row in rows:
+        values = {
+            "name": row["name"],
+            "description": row["description"],
+            "ean": row["ean"],
+            "upc": row["upc"],
+            "brand_id": brands.get(row["brand"]),
+            "category_id": categories.get(row["category"]),
+        }
+        if row["ean"] or row["upc"]:
+            product_id = by_ean.get(row["ean"]) or by_upc.get(row["upc"])
+        else:
+            matches = by_name.get(DirectoryMap.key(row["name"]), []) if row["name"] else []
+            if len(matches) > 1:
+                report.error(line, f"несколько товаров с именем «{row['name']}» — укажите EAN или UPC")
+                continue
+            product_id = matches[0] if matches else None
+        if product_id:
+            # Later rows for the same product win, empty cells keep the stored value
+            updates.setdefault(product_id, {"id": product_id}).update(
+                {key: value for key, value in values.items() if value is not None}
+            )
+            continue
+
+        if not row["name"]:
+            report.error(line, "нет name для нового товара")
+            continue
+        values.update(user_id=user_id, description=values["description"] or "", ean=values["ean"] or "", upc=values["upc"] or "")
+        if row["ean"]:
+            inserts[("ean", row["ean"])] = values
+        elif row["upc"]:
+            inserts[("upc", row["upc"])] = values
+        else:
+            inserts[("name", DirectoryMap.key(row["name"]))] = values
+
+    if updates:
+        await db.execute(update(Product), list(updates.values()))
+        report.updated += len(updates)
+    new_products = list(inserts.values())
+    if new_products:
+        await db.execute(insert(Product), new_products)
+        report.created += len(new_products)
+
+
+# --- Выгрузка ---
+
+async def iter_catalogue_rows(db: AsyncSession, user_id: Optional[int], chunk_size: int = EXPORT_CHUNK_SIZE) -> AsyncIterator[Rows]:
+    """Пачки строк каталога (в порядке CATALOGUE_FIELDS) с серверного курсора; user_id=None — все товары."""
+    stmt = (
+        select(Product.name, Product.description, Product.ean, Product.upc, Brand.name, Category.name)
+        .outerjoin(Brand, Product.brand_id == Brand.id)
+        .outerjoin(Category, Product.category_id == Category.id)
+    )
+    if user_id is not None:
+        stmt = stmt.where(Product.user_id == user_id)
+    stmt = stmt.order_by(Product.id).execution_options(yield_per=chunk_size)
+
+    result = await db.stream(stmt)
+    async for partition in result.partitions():
+        yield partition
+
+
+def export_catalogue_response(db: AsyncSession, user_id: Optional[int], export_format: str) -> StreamingResponse:
+    return streaming_export(CATALOGUE_FIELDS, iter_catalogue_rows(db, user_id), export_format, "catalogue")
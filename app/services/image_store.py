@@ -0,0 +1,95 @@
+"""
+Хранилище изображений с адресацией по содержимому.
+
+A blob lives at ``blobs/<sha[:2]>/<sha><ext>`` inside the uploads directory
+and is shared by every ProductImage with the same content. ``image_blobs``
+keeps a reference count per blob: acquiring a blob that already exists only
+bumps the counter and drops the freshly received temporary file.
+
+Releasing the last reference removes the row but leaves the file: a
+concurrent upload of the same content may already have decided to reuse
+it. Unreferenced files are removed by app.services.upload_gc after a grace
+period, so reusing a blob refreshes its mtime.
+"""
+
+import os
+from typing import Optional
+
+import aiofiles.os
+from aiofiles.os import wrap
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.image_blob import ImageBlob
+from app.utils.uploads import ReceivedUpload, discard_upload, store_upload
+
+BLOB_DIR = "blobs"
+
+_UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def blob_path(sha256: str, extension: str = "") -> str:
+    """Путь блоба относительно каталога загрузок (то, что пишется в ProductImage.image_path)."""
+    return f"{BLOB_DIR}/{sha256[:2]}/{sha256}{extension}"
+
+
+async def store_image(db: AsyncSession, received: ReceivedUpload) -> str:
+    """
+    Сохраняет полученный файл как блоб и возвращает его путь для image_path.
+
+    The reference is taken inside the caller's transaction; the disk write
+    is skipped when a blob with the same hash is already on disk.
+    """
+    path = await _acquire(db, received.sha256, blob_path(received.sha256, received.extension), received.size)
+    full_path = os.path.join(received.directory, path)
+    try:
+        # Already on disk: refreshing the mtime keeps the GC grace period from expiring under us
+        await _touch(full_path)
+    except FileNotFoundError:
+        await aiofiles.os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        await store_upload(received, path)
+        return path
+
+    await discard_upload(received)
+    return path
+
+
+async def release_image(db: AsyncSession, image_path: Optional[str]) -> None:
+    """Снимает одну ссылку с блоба; пути, которые не являются блобами, игнорируются."""
+    if not image_path or not image_path.startswith(f"{BLOB_DIR}/"):
+        return
+    await db.execute(
+        update(ImageBlob)
+        .where(ImageBlob.path == image_path, ImageBlob.ref_count > 0)
+        .values(ref_count=ImageBlob.ref_count - 1)
+    )
+    await db.execute(delete(ImageBlob).where(ImageBlob.path == image_path, ImageBlob.ref_count <= 0))
+
+
+_touch = wrap(os.utime)
+
+
+async def _acquire(db: AsyncSession, sha256: str, path: str, size: int) -> str:
+    # The first upload fixes the extension: later duplicates reuse its path
+    insert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(ImageBlob).values(sha256=sha256, path=path, size=size, ref_count=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ImageBlob.sha256],
+            set_={"ref_count": ImageBlob.ref_count + 1},
+        )
+        await db.execute(stmt)
+    else:
+        result = await db.execute(
+            update(ImageBlob).where(ImageBlob.sha256 == sha256).values(ref_count=ImageBlob.ref_count + 1)
+        )
+        if not result.rowcount:
+            db.add(ImageBlob(sha256=sha256, path=path, size=size, ref_count=1))
+            await db.flush()
+
+    result = await db.execute(select(ImageBlob.path).where(ImageBlob.sha256 == sha256))
+    return result.scalar_one()
@@ -0,0 +1,112 @@
+"""
+Генерация миниатюр и WebP-копий для ProductImage.
+
+Rendering is CPU-bound, so it runs in a process pool (IMAGE_WORKERS
+processes; 0 falls back to the default thread pool) and the event loop only
+awaits the result. ``python manage.py thumbnails`` backfills images that
+were uploaded before variants existed.
+"""
+
+import argparse
+import asyncio
+import functools
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from app.core import settings
+from app.models.image import ProductImage
+from app.models.image_variant import ImageVariant
+from app.utils.images import render_variants
+from app.utils.uploads import UPLOAD_DIR
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[Executor] = None
+
+
+def get_executor() -> Optional[Executor]:
+    global _executor
+    if _executor is None and settings.IMAGE_WORKERS > 0:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def variant_widths() -> List[int]:
+    return sorted({settings.IMAGE_THUMBNAIL_WIDTH, *settings.IMAGE_VARIANT_WIDTHS})
+
+
+async def build_variants(image_path: str, upload_dir: str = UPLOAD_DIR) -> List[ImageVariant]:
+    """Рендерит копии вне event loop и возвращает несохранённые ImageVariant."""
+    job = functools.partial(
+        render_variants,
+        upload_dir,
+        image_path,
+        variant_widths(),
+        settings.IMAGE_WEBP_QUALITY,
+        settings.IMAGE_JPEG_QUALITY,
+    )
+    try:
+        rendered = await asyncio.get_running_loop().run_in_executor(get_executor(), job)
+    except Exception as e:
+        # An upload must not fail because of its thumbnails: the original is still served
+        logger.warning(f"Не удалось создать уменьшенные копии для {image_path}: {e}")
+        return []
+    return [ImageVariant(width=width, format=fmt, path=path) for width, fmt, path in rendered]
+
+
+async def backfill(batch_size: int = 100, upload_dir: str = UPLOAD_DIR) -> int:
+    """Создаёт копии для изображений без них; коммит после каждой пачки. Возвращает число изображений."""
+    from app.database.session import AsyncSessionLocal
+
+    processed = 0
+    last_id = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(ProductImage)
+                .where(ProductImage.id > last_id, ~ProductImage.variants.any())
+                .order_by(ProductImage.id)
+                .limit(batch_size)
+            )
+            images = result.scalars().all()
+            if not images:
+                return processed
+
+            batches = await asyncio.gather(*(build_variants(image.image_path, upload_dir) for image in images))
+            for image, variants in zip(images, batches):
+                for variant in variants:
+                    variant.image_id = image.id
+                    db.add(variant)
+            processed += len(images)
+            last_id = images[-1].id # read before commit() expires the instances
+            await db.commit()
+            logger.info(f"Уменьшенные копии: обработано {processed} изображений")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Создать миниатюры и WebP-копии для уже загруженных изображений")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--upload-dir", default=UPLOAD_DIR)
+    args = parser.parse_args(argv)
+
+    from app.database.init_db import init_db
+    init_db() # image_variants may not exist yet if the app has not been started since the upgrade
+    try:
+        processed = asyncio.run(backfill(args.batch_size, args.upload_dir))
+    finally:
+        shutdown_executor()
+    print(f"Обработано изображений: {processed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,103 @@
+import hashlib
+import time
 import httpx
 from fastapi import HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List, Optional
+from typing import Any, List, Optional, Set
 
 from app.core import settings
+from app.core import metrics
 from app.database.session import get_db # get_db is already async
 from app.models import Promt
+from app.services.ai_providers import REVIEWS_CAPTION, AIProvider, Completion, ProviderRouter, build_router
+from app.services.ai_usage import record_usage
+from app.services.prompt_format import DEFAULT_IMPORTANCE, format_reviews, resolve_format
+from app.services.sentiment import summarize
+from app.utils.resilience import CircuitOpenError, RetryPolicy, TransientError, call_with_retries
+from app.utils.throttling import RateLimiter, SingleFlight
+from app.utils.tokens import MESSAGE_OVERHEAD, context_window, estimate_message_tokens, estimate_tokens, fit_lines
+
+# Per process: identical concurrent prompts share one call, and calls queue
+# for the provider's RPM/TPM budget instead of running into 429s
+limiter = RateLimiter(settings.OPENAI_RPM_LIMIT, settings.OPENAI_TPM_LIMIT, name="openai")
+flights = SingleFlight("openai")
+# Built on first use from the settings; each endpoint has its own circuit breaker
+router: Optional[ProviderRouter] = None
+
+
+def get_router() -> ProviderRouter:
+    global router
+    if router is None:
+        router = build_router()
+    return router
+
+
+def retry_policy() -> RetryPolicy:
+    return RetryPolicy(
+        attempts=max(1, settings.OPENAI_RETRY_ATTEMPTS),
+        base_delay=settings.OPENAI_RETRY_BASE_DELAY,
+        max_delay=settings.OPENAI_RETRY_MAX_DELAY,
+    )
+
+
+def prompt_budget(model: str) -> int:
+    """Сколько токенов может занять промпт: контекст модели минус место под ответ."""
+    context = settings.OPENAI_CONTEXT_TOKENS or context_window(model)
+    return context - settings.OPENAI_COMPLETION_TOKENS - MESSAGE_OVERHEAD
+
+
+def review_priority(review: Any) -> tuple:
+    """Порядок отбора при обрезке: сначала важные, затем с оценкой, затем с более резкой оценкой."""
+    if not isinstance(review, dict):
+        return (0, True, 0)
+    importance = review.get("importance") or DEFAULT_IMPORTANCE
+    rating = review.get("rating")
+    rated = isinstance(rating, (int, float))
+    return (-(importance if isinstance(importance, int) else 0), not rated, -abs(rating - 50) if rated else 0)
+
+
+def fit_reviews(header: str, reviews: List[Any], lines: List[str], model: str) -> List[str]:
+    """
+    Строки отзывов, которые помещаются в контекст модели вместе с header.
+    Лишние отбрасываются по review_priority (AI_PROMPT_OVERFLOW="truncate")
+    или запрос отклоняется с 413 ("reject") — до обращения к сети.
+    """
+    available = prompt_budget(model) - estimate_tokens(header) - 1
+    kept = fit_lines(lines, available, lambda i: review_priority(reviews[i])) if available > 0 else []
+    if len(kept) == len(lines):
+        return lines
+    if settings.AI_PROMPT_OVERFLOW == "reject" or not kept:
+        needed = estimate_tokens(header) + estimate_tokens("\n".join(lines))
+        raise HTTPException(
+            status_code=413,
+            detail=f"Отзывы не помещаются в контекст модели: около {needed} токенов при лимите {prompt_budget(model)}. Сузьте фильтры.",
+        )
+    metrics.AI_REVIEWS_DROPPED.labels(model).inc(len(lines) - len(kept))
+    return [lines[i] for i in kept]
+
+
+def prompt_key(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
 
 
 async def analyze_reviews(
-    reviewsBlock: List[str],
+    reviewsBlock: List[Any],
     promt_id: Optional[int] = None,
-    db: AsyncSession = Depends(get_db) # This will now correctly inject an AsyncSession
+    db: AsyncSession = Depends(get_db), # This will now correctly inject an AsyncSession
+    user_id: Optional[int] = None, # attribution of the recorded usage
+    product_id: Optional[int] = None,
+    job_id: Optional[int] = None,
 ) -> str:    
     # if 1==1: # Keeping the placeholder logic as it was, but commenting out for actual run
     #     return "OOOOOOOOOOOOOOOOOOOOOOOOO."
 
-    if not settings.OPENAI_API_KEY:
+    if settings.AI_PROVIDER == "openai" and not settings.OPENAI_API_KEY:
         # Consider raising an HTTPException or logging a warning if key is missing in production
         return "ИИ-ключ не указан. Анализ не может быть выполнен. Используется заглушка."
 
     titlePromt = "Проанализируй отзывы"
+    promt = None
     if promt_id:
         stmt = select(Promt).filter(Promt.id == promt_id)
         result = await db.execute(stmt)
@@ -29,65 +105,84 @@ async def analyze_reviews(
         if promt and promt.description:
             titlePromt = f"{promt.description.strip()}"
 
-    headers = {
-        "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
+    # Compact table (header once, no repeated keys) unless the prompt asks for another format
+    formatted = format_reviews(reviewsBlock, resolve_format(promt.review_format if promt else None))
+    userReviews = REVIEWS_CAPTION
+    header = f"{titlePromt}\n{formatted.legend}\n{userReviews}" if formatted.legend else f"{titlePromt}\n{userReviews}"
+    model = settings.OPENAI_MODEL
+    lines = fit_reviews(header, reviewsBlock, formatted.rows, model)
+    reviews_str = "\n".join(lines)
+    promtRreviews = f"{header}\n{reviews_str}"
 
-    userReviews = "Отзывы пользователей:"
-    # Ensure reviewsBlock is a string representation suitable for the prompt
-    reviews_str = "\n".join(map(str, reviewsBlock)) # Example: join list of strings
-    promtRreviews = f"{titlePromt}\n{userReviews}\n{reviews_str}"
+    # Same prompt in flight (double click, two users with the same filters): wait for that call
+    completion = await flights.do(prompt_key(model, promtRreviews), lambda: _complete(promtRreviews, model))
+    dropped = len(reviewsBlock) - len(lines)
+    if db is not None:
+        record_usage(
+            db, completion,
+            user_id=user_id, product_id=product_id, promt_id=promt_id or None, job_id=job_id,
+            estimated_tokens=estimate_message_tokens(promtRreviews),
+            reviews_sent=len(lines), reviews_dropped=dropped,
+        )
+    if dropped:
+        return f"{completion.content}\n\n(Проанализировано отзывов: {len(lines)} из {len(reviewsBlock)}; остальные не поместились в контекст модели.)"
+    return completion.content
 
 
-    payload = {
-        "model": settings.OPENAI_MODEL,
-        "messages": [{"role": "user", "content": promtRreviews}],
-        "temperature": 0.7, # Consider making this configurable
-    }
+async def _complete(promtRreviews: str, model: str) -> Completion:
+    estimated_tokens = estimate_message_tokens(promtRreviews)
+    providers = get_router()
+    tried: Set[AIProvider] = set()
 
+    started_at = time.perf_counter()
+    outcome = "error"
     try:
-        async with httpx.AsyncClient(timeout=settings.OPENAI_TIMEOUT if hasattr(settings, 'OPENAI_TIMEOUT') else 30.0) as client: # Configurable timeout
-            response = await client.post(f"{settings.OPENAI_API_BASE}/chat/completions", headers=headers, json=payload)
-
-            if response.status_code != 200:
-                error_text = await response.aread()
-                # Log the detailed error for backend visibility
-                print(f"❌ Ошибка от OpenAI: {response.status_code} {error_text.decode()}")
-                # Provide a more generic error to the client
-                raise HTTPException(status_code=response.status_code, detail="Ошибка при обращении к ИИ-сервису.")
-
-            data = response.json()
-            if "choices" in data and len(data["choices"]) > 0 and "message" in data["choices"][0] and "content" in data["choices"][0]["message"]:
-                return data["choices"][0]["message"]["content"]
-            else:
-                # Log unexpected response structure
-                print(f"❌ Неожиданный формат ответа от OpenAI: {data}")
-                raise HTTPException(status_code=500, detail="Неожиданный формат ответа от ИИ-сервиса.")
-
-    except httpx.TimeoutException:
-        print(f"⏳ Таймаут при обращении к ИИ-сервису: {settings.OPENAI_API_BASE}")
-        raise HTTPException(status_code=504, detail="Таймаут при обращении к ИИ-сервису. Попробуйте позже.")
-    except httpx.HTTPStatusError as e: # Specific HTTP errors from httpx
-        error_content = await e.response.aread()
-        print(f"🚨 HTTP ошибка: {e.response.status_code} {error_content.decode()}")
-        raise HTTPException(status_code=e.response.status_code, detail=f"Ошибка HTTP ({e.response.status_code}) при обращении к ИИ-сервису.")
+        async with httpx.AsyncClient(timeout=settings.OPENAI_TIMEOUT) as client:
+            async def attempt() -> Completion:
+                # A retry or a hedge goes to an endpoint this call has not tried yet, if there is one
+                provider = providers.pick(exclude=tried)
+                tried.add(provider)
+                if provider.rate_limited:
+                    # Every attempt (retry or hedge) is a request the provider counts
+                    await limiter.acquire(estimated_tokens)
+                return await provider.call(client, promtRreviews, estimated_tokens)
+
+            completion = await call_with_retries(
+                attempt, retry_policy(), hedge_delay=settings.OPENAI_HEDGE_DELAY, name="openai"
+            )
+            outcome = "ok"
+            return completion
+
+    except CircuitOpenError:
+        metrics.AI_ERRORS.labels(model, "circuit_open").inc()
+        raise HTTPException(status_code=503, detail="ИИ-сервис временно недоступен. Попробуйте позже.")
+    except TransientError as e: # retries exhausted
+        print(f"⏳ ИИ-сервис не ответил после повторов: {e.reason} ({', '.join(p.name for p in tried)})")
+        if e.reason == "timeout":
+            raise HTTPException(status_code=504, detail="Таймаут при обращении к ИИ-сервису. Попробуйте позже.")
+        raise HTTPException(status_code=e.status_code, detail="Ошибка при обращении к ИИ-сервису.")
+    except HTTPException:
+        raise
     except Exception as e: # Catch other exceptions, including potential JSON parsing errors if response is not JSON
         print(f"⚡ Общая ошибка при работе с ИИ: {str(e)}")
+        metrics.AI_ERRORS.labels(model, "exception").inc()
         # Avoid exposing internal error details directly to the client
         raise HTTPException(status_code=500, detail="Внутренняя ошибка при работе с ИИ-сервисом. Попробуйте позже.")
+    finally:
+        metrics.AI_REQUEST_DURATION.labels(model, outcome).observe(time.perf_counter() - started_at)
 
 
-# fake_analysis can remain as a synchronous utility function if needed for other purposes
-# or if it's purely a CPU-bound operation not involving I/O.
 def fake_analysis(reviews: List[str]) -> str:
-    """Функция-заглушка для анализа без OpenAI."""
-    positives = sum(1 for r in reviews if "хорош" in r.lower() or "отличн" in r.lower())
-    negatives = sum(1 for r in reviews if "плох" in r.lower() or "ужасн" in r.lower())
-    total = len(reviews)
-    print(f"Функция-заглушка (синхронная)")
-    return (f"Итоговый анализ (заглушка):\n"
-            f"Всего отзывов: {total}\n"
-            f"Позитивных: {positives}\n"
-            f"Негативных: {negatives}\n"
-            f"Нейтральных: {total - positives - negatives}")
+    """Анализ без ИИ: словарная оценка тональности и аспектов (app/services/sentiment.py)."""
+    positives, negatives, neutrals, aspects = summarize((review, None, None) for review in reviews)
+    lines = [
+        "Итоговый анализ (без ИИ):",
+        f"Всего отзывов: {positives + negatives + neutrals}",
+        f"Позитивных: {positives}",
+        f"Негативных: {negatives}",
+        f"Нейтральных: {neutrals}",
+    ]
+    if aspects:
+        ranked = sorted(aspects.items(), key=lambda item: item[1])
+        lines.append("Аспекты: " + ", ".join(f"{aspect} {value:+.2f}" for aspect, value in ranked))
+    return "\n".join(lines)
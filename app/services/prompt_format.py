@@ -0,0 +1,154 @@
+"""
+Сериализация отзывов в промпт ИИ-анализа.
+
+* "legacy": one Python dict repr per review, with placeholders for missing
+  values. This is how prompts were built before, and every row repeats
+  the keys and quotes.
+* "table" / "tsv": the column names go once into a legend line. Then
+  comes one row per review with cells separated by "|" or a tab.
+  Whitespace is collapsed. Columns empty in every review are left out,
+  and so are trailing empty cells. A column with the same value in every
+  review ("важность 100") is stated once in the legend.
+
+The format is chosen per Promt (Promt.review_format), or AI_PROMPT_FORMAT
+when there is no prompt. ``manage.py promptstats`` renders real reviews
+in every format and reports the estimated tokens saved.
+"""
+
+import argparse
+import asyncio
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.core import settings
+from app.utils.tokens import estimate_tokens
+
+LEGACY, TABLE, TSV = "legacy", "table", "tsv"
+PROMPT_FORMATS = (LEGACY, TABLE, TSV)
+DELIMITERS = {TABLE: "|", TSV: "\t"}
+DEFAULT_IMPORTANCE = 100 # what a review without importance counts as
+
+# Review key, column title for the model
+COLUMNS = (
+    ("rating", "оценка"),
+    ("importance", "важность"),
+    ("source", "источник"),
+    ("text", "отзыв"),
+    ("advantages", "плюсы"),
+    ("disadvantages", "минусы"),
+)
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+@dataclass
+class FormattedReviews:
+    legend: str # goes before the reviews caption; "" for legacy
+    rows: List[str] # one per review, in the order given
+
+
+def resolve_format(review_format: Optional[str]) -> str:
+    for candidate in (review_format, settings.AI_PROMPT_FORMAT):
+        if candidate in PROMPT_FORMATS:
+            return candidate
+    return TABLE
+
+
+def legacy_row(review: Dict[str, Any]) -> str:
+    return str({
+        "importance": review.get("importance") or DEFAULT_IMPORTANCE,
+        "source": review.get("source") or "неизвестно",
+        "text": review.get("text") or "",
+        "advantages": review.get("advantages") or "",
+        "disadvantages": review.get("disadvantages") or "",
+        "rating": review["rating"] if review.get("rating") is not None else "нет оценки",
+    })
+
+
+def cell(value: Any, delimiter: str) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return WHITESPACE_RE.sub(" ", str(value)).strip().replace(delimiter, "/")
+
+
+def format_reviews(reviews: Sequence[Any], review_format: str) -> FormattedReviews:
+    if not reviews:
+        return FormattedReviews("", [])
+    if review_format == LEGACY:
+        return FormattedReviews("", [legacy_row(r) if isinstance(r, dict) else str(r) for r in reviews])
+
+    delimiter = DELIMITERS[review_format]
+    cells = [
+        [cell(r.get(key), delimiter) for key, _ in COLUMNS] if isinstance(r, dict) else [cell(r, delimiter)]
+        for r in reviews
+    ]
+    if not all(isinstance(r, dict) for r in reviews):
+        # Plain strings (callers outside the jobs): nothing to tabulate
+        return FormattedReviews("", [row[-1] for row in cells])
+
+    used = [i for i in range(len(COLUMNS)) if any(row[i] for row in cells)]
+    constant = [i for i in used if len(cells) > 1 and all(row[i] == cells[0][i] for row in cells)]
+    columns = [i for i in used if i not in constant]
+
+    shown = "|" if delimiter == "|" else "табуляция"
+    legend = (
+        f"Формат: одна строка на отзыв, поля через «{shown}»: "
+        + "|".join(COLUMNS[i][1] for i in columns)
+        + ". Пустое поле — нет данных."
+    )
+    if constant:
+        legend += " У всех отзывов: " + ", ".join(f"{COLUMNS[i][1]} {cells[0][i]}" for i in constant) + "."
+    rows = [delimiter.join(row[i] for i in columns).rstrip(delimiter) for row in cells]
+    return FormattedReviews(legend, rows)
+
+
+def measure(reviews: Sequence[Any]) -> Dict[str, int]:
+    """Оценка токенов блока отзывов (легенда и строки) в каждом формате."""
+    result = {}
+    for review_format in PROMPT_FORMATS:
+        formatted = format_reviews(reviews, review_format)
+        lines = ([formatted.legend] if formatted.legend else []) + formatted.rows
+        result[review_format] = estimate_tokens("\n".join(lines))
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="manage.py promptstats", description="Сколько токенов занимают отзывы товаров в каждом формате промпта.")
+    parser.add_argument("--product", type=int, action="append", help="Товар (можно несколько раз); по умолчанию — товары с наибольшим числом отзывов")
+    parser.add_argument("--limit", type=int, default=20, help="Сколько товаров взять без --product")
+    args = parser.parse_args(argv)
+
+    async def run() -> List[tuple]:
+        from sqlalchemy import func, select
+
+        from app.database.session import AsyncSessionLocal
+        from app.models import Review
+        from app.schemas.review import ReviewFilters
+        from app.services.analysis_jobs import collect_structured_reviews
+
+        async with AsyncSessionLocal() as db:
+            product_ids = args.product or (await db.execute(
+                select(Review.product_id).group_by(Review.product_id).order_by(func.count().desc()).limit(args.limit)
+            )).scalars().all()
+            stats = []
+            for product_id in product_ids:
+                reviews = await collect_structured_reviews(db, product_id, None, ReviewFilters())
+                stats.append((product_id, len(reviews), measure(reviews)))
+            return stats
+
+    stats = asyncio.run(run())
+    print(f"{'товар':>8} {'отзывов':>8} " + " ".join(f"{name:>9}" for name in PROMPT_FORMATS) + "  экономия")
+    totals = dict.fromkeys(PROMPT_FORMATS, 0)
+    for product_id, count, tokens in stats:
+        for name in PROMPT_FORMATS:
+            totals[name] += tokens[name]
+        print(f"{product_id:>8} {count:>8} " + " ".join(f"{tokens[name]:>9}" for name in PROMPT_FORMATS) + f"  {saved(tokens)}")
+    print(f"{'всего':>8} {sum(s[1] for s in stats):>8} " + " ".join(f"{totals[name]:>9}" for name in PROMPT_FORMATS) + f"  {saved(totals)}")
+
+
+def saved(tokens: Dict[str, int]) -> str:
+    """Доля токенов, сэкономленная лучшим компактным форматом против legacy."""
+    best = min(tokens[TABLE], tokens[TSV])
+    return f"{(1 - best / tokens[LEGACY]) * 100:.0f}%" if tokens[LEGACY] else "-"
@@ -0,0 +1,59 @@
+"""
+Потоковая выгрузка отзывов в CSV, NDJSON и XLSX.
+
+Rows come from a server-side cursor (``AsyncSession.stream`` with
+``yield_per``) one partition at a time and are written straight into the
+response body by app.utils.export_writers, so memory use does not depend on
+the number of rows. Only plain columns are selected: no Review entities
+pile up in the session.
+
+The columns are the ones ``parse_reviews_file_to_list`` reads, so an export
+can be imported back as is.
+"""
+
+from typing import AsyncIterator, Optional
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Review
+from app.services.review_service import review_filter_conditions
+from app.utils.export_writers import EXPORT_FORMATS, Rows, streaming_export
+
+EXPORT_FIELDS = (
+    "importance", "source", "text", "advantages", "disadvantages",
+    "raw_rating", "rating", "max_rating", "normalized_rating", "sentiment",
+)
+EXPORT_CHUNK_SIZE = 1000
+
+
+async def iter_review_rows(
+    db: AsyncSession,
+    product_id: int,
+    user_id: Optional[int],
+    filters=None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> AsyncIterator[Rows]:
+    """Пачки строк (кортежи в порядке EXPORT_FIELDS) с серверного курсора."""
+    stmt = select(*(getattr(Review, field) for field in EXPORT_FIELDS)).where(Review.product_id == product_id)
+    if user_id is not None:
+        stmt = stmt.where(Review.user_id == user_id)
+    if filters is not None:
+        stmt = stmt.where(*review_filter_conditions(filters))
+    stmt = stmt.order_by(Review.id).execution_options(yield_per=chunk_size)
+
+    result = await db.stream(stmt)
+    async for partition in result.partitions():
+        yield partition
+
+
+def export_reviews_response(
+    db: AsyncSession,
+    product_id: int,
+    user_id: Optional[int],
+    export_format: str,
+    filters=None,
+) -> StreamingResponse:
+    rows = iter_review_rows(db, product_id, user_id, filters)
+    return streaming_export(EXPORT_FIELDS, rows, export_format, f"reviews_{product_id}")
@@ -1,10 +1,12 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import delete
+from sqlalchemy import delete, update
 
+from app.database.versions import bump_version
+from app.services.sentiment import SCORED_FIELDS, apply_sentiment, rescore_reviews
 from app.utils.converters import parse_int, parse_str, parse_float
 from app.models import Review
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence
 
 
 async def add_review(db: AsyncSession, product_id: int, user_id: Optional[int], review_data: Dict[str, Any]) -> Review:
@@ -21,7 +23,9 @@ async def add_review(db: AsyncSession, product_id: int, user_id: Optional[int],
         max_rating=parse_float(review_data.get('max_rating')),
         normalized_rating=parse_int(review_data.get('normalized_rating')),
     )
+    apply_sentiment(review)
     db.add(review)
+    await bump_version(db, "reviews", product_id)
     return review
 
 async def add_review_to_session(
@@ -30,6 +34,7 @@ async def add_review_to_session(
     user_id: Optional[int],
     review_data: Dict[str, Any]
 ) -> Review:
+    # Для пакетной загрузки: версию "reviews" вызывающий поднимает один раз на пачку
     review = Review(
         product_id=product_id,
         user_id=user_id,
@@ -43,6 +48,7 @@ async def add_review_to_session(
         max_rating=parse_float(review_data.get('max_rating')),
         normalized_rating=parse_int(review_data.get('normalized_rating')),
     )
+    apply_sentiment(review)
     db.add(review)
     return review
 
@@ -68,7 +74,9 @@ async def update_review(db: AsyncSession, review_id: int, user_id: Optional[int]
     review.rating = parse_float(review_data.get('rating', review.rating))
     review.max_rating = parse_float(review_data.get('max_rating', review.max_rating))
     review.normalized_rating = parse_int(review_data.get('normalized_rating', review.normalized_rating))
+    apply_sentiment(review)
 
+    await bump_version(db, "reviews", review.product_id)
     return review
 
 async def delete_review(db: AsyncSession, review_id: int, user_id: Optional[int]) -> bool:
@@ -81,6 +89,7 @@ async def delete_review(db: AsyncSession, review_id: int, user_id: Optional[int]
 
     if review_to_delete:
         await db.delete(review_to_delete)
+        await bump_version(db, "reviews", review_to_delete.product_id)
         return True
     return False
 
@@ -90,4 +99,97 @@ async def delete_all_reviews_for_product(db: AsyncSession, product_id: int, user
         stmt = stmt.filter(Review.user_id == user_id)
 
     result = await db.execute(stmt)
+    if result.rowcount:
+        await bump_version(db, "reviews", product_id)
     return result.rowcount
+
+# Размер пачки id в одном IN (...): ниже лимитов на число параметров у asyncpg и SQLite
+BULK_ID_CHUNK = 1000
+
+
+def review_filter_conditions(filters) -> List[Any]:
+    """Условия WHERE для фильтров страницы анализа (ReviewFilters / AnalyzeFilters); пустые значения пропускаются."""
+    conditions = []
+    if filters.importance:
+        conditions.append(Review.importance == filters.importance)
+    if filters.source:
+        conditions.append(Review.source.ilike(f"%{filters.source}%"))
+    if filters.text:
+        conditions.append(Review.text.ilike(f"%{filters.text}%"))
+    if filters.advantages:
+        conditions.append(Review.advantages.ilike(f"%{filters.advantages}%"))
+    if filters.disadvantages:
+        conditions.append(Review.disadvantages.ilike(f"%{filters.disadvantages}%"))
+    if filters.normalized_rating_min:
+        conditions.append(Review.normalized_rating >= filters.normalized_rating_min)
+    if filters.normalized_rating_max:
+        conditions.append(Review.normalized_rating <= filters.normalized_rating_max)
+    if filters.sentiment_min is not None:
+        conditions.append(Review.sentiment >= filters.sentiment_min)
+    if filters.sentiment_max is not None:
+        conditions.append(Review.sentiment <= filters.sentiment_max)
+    return conditions
+
+
+async def bulk_update_reviews(
+    db: AsyncSession,
+    product_id: int,
+    user_id: Optional[int],
+    values: Dict[str, Any],
+    ids: Optional[Sequence[int]] = None,
+    filters=None,
+) -> int:
+    """Один UPDATE на пачку id (или один на весь фильтр); возвращает число изменённых отзывов."""
+    rescore = bool(set(values) & set(SCORED_FIELDS))
+
+    async def run(conditions) -> int:
+        if rescore:
+            # The ids first: the new values may no longer match a text filter
+            touched = (await db.execute(select(Review.id).where(*conditions))).scalars().all()
+        stmt = update(Review).where(*conditions).values(**values).execution_options(synchronize_session=False)
+        updated = (await db.execute(stmt)).rowcount
+        if updated and rescore:
+            for start in range(0, len(touched), BULK_ID_CHUNK):
+                await rescore_reviews(db, [Review.id.in_(touched[start:start + BULK_ID_CHUNK])])
+        return updated
+
+    updated = await _bulk_apply(run, product_id, user_id, ids, filters)
+    if updated:
+        await bump_version(db, "reviews", product_id)
+    return updated
+
+
+async def bulk_delete_reviews(
+    db: AsyncSession,
+    product_id: int,
+    user_id: Optional[int],
+    ids: Optional[Sequence[int]] = None,
+    filters=None,
+) -> int:
+    """Как bulk_update_reviews, но DELETE; возвращает число удалённых отзывов."""
+    async def run(conditions) -> int:
+        stmt = delete(Review).where(*conditions).execution_options(synchronize_session=False)
+        return (await db.execute(stmt)).rowcount
+
+    deleted = await _bulk_apply(run, product_id, user_id, ids, filters)
+    if deleted:
+        await bump_version(db, "reviews", product_id)
+    return deleted
+
+
+async def _bulk_apply(run, product_id: int, user_id: Optional[int], ids, filters) -> int:
+    conditions = [Review.product_id == product_id]
+    if user_id is not None:
+        conditions.append(Review.user_id == user_id)
+    if filters is not None:
+        conditions.extend(review_filter_conditions(filters))
+
+    if ids is None:
+        return await run(conditions)
+
+    unique_ids = sorted(set(ids))
+    total = 0
+    for start in range(0, len(unique_ids), BULK_ID_CHUNK):
+        chunk = unique_ids[start:start + BULK_ID_CHUNK]
+        total += await run([*conditions, Review.id.in_(chunk)])
+    return total
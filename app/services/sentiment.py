@@ -0,0 +1,338 @@
+"""
+Офлайн-оценка тональности и аспектов отзывов по словарю, без ИИ.
+
+Lexicon entries are stemmed once at import (a light suffix stripper for
+Russian and English) and compiled into a single regex trie. A review is
+scored in one pass per field: every word is either a lexicon stem plus
+any ending, a negator ("не", "без", "not"), an intensifier ("очень",
+"very") or ignored. Negation flips the next term within NEGATION_WINDOW
+words. Terms tied to an aspect (цена, доставка, качество, ...) add their
+clause's score to that aspect; clauses end at sentence punctuation, commas
+and contrasting conjunctions ("но", "а", "but"), so in "Цена хорошая,
+доставка задержалась" the price is praised and the delivery is not.
+
+The text, advantages and disadvantages fields are scored separately. A
+non-empty "advantages" section counts as one positive hit and
+"disadvantages" as one negative hit, so "Доставка" in the disadvantages
+still reads as a complaint about delivery. Scores are
+total / (|hits| + 1): in (-1, 1), 0 for no signal.
+
+Scores are stored on Review (sentiment, sentiment_advantages,
+sentiment_disadvantages, aspects) when a review is saved; ``manage.py
+sentiment`` rescores existing reviews in batches.
+"""
+
+import argparse
+import asyncio
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Review
+
+SCORE_BATCH_SIZE = 1000
+SCORED_FIELDS = ("text", "advantages", "disadvantages")
+NEGATION_WINDOW = 3 # words after a negator that it still applies to
+INTENSIFIER_BOOST = 1.5
+MIN_STEM = 3
+
+# word: weight; words are stemmed, so one form per lemma is enough. Where the forms
+# differ by more than an ending (задержка / задержалась) the shared root is listed.
+POSITIVE = {
+    "хороший": 1, "отличный": 1.5, "прекрасный": 1.5, "замечательный": 1.5, "великолепный": 1.5,
+    "идеальный": 1.5, "супер": 1.5, "классный": 1, "качественный": 1, "удобный": 1, "надежный": 1,
+    "приятный": 1, "красивый": 1, "быстрый": 0.5, "довольный": 1, "доволен": 1, "нравится": 1,
+    "понравился": 1, "рекомендую": 1.5, "советую": 1, "лучший": 1.5, "удобно": 1, "мягкий": 0.5,
+    "прочный": 1, "шикарный": 1.5, "восторг": 1.5, "спасибо": 0.5, "выгодный": 1, "дешевый": 0.5,
+    "good": 1, "great": 1.5, "excellent": 1.5, "perfect": 1.5, "amazing": 1.5, "awesome": 1.5,
+    "love": 1.5, "like": 0.5, "nice": 1, "comfortable": 1, "reliable": 1, "recommend": 1.5,
+    "fast": 0.5, "quick": 0.5, "happy": 1, "best": 1.5, "cheap": 0.5, "sturdy": 1, "worth": 1,
+}
+NEGATIVE = {
+    "плохой": 1, "ужасный": 1.5, "отвратительный": 1.5, "кошмар": 1.5, "брак": 1.5, "бракованный": 1.5,
+    "сломался": 1.5, "сломан": 1.5, "разочарован": 1.5, "разочарование": 1.5, "неудобный": 1,
+    "некачественный": 1, "дорогой": 0.5, "дорого": 0.5, "задерж": 1, "опозд": 1, "медленный": 0.5,
+    "хлипкий": 1, "тонкий": 0.5, "порвался": 1.5, "треснул": 1.5, "воняет": 1, "запах": 0.5,
+    "вернул": 1, "возврат": 1, "обман": 1.5, "царапина": 1, "дефект": 1.5, "мусор": 1,
+    "bad": 1, "terrible": 1.5, "awful": 1.5, "horrible": 1.5, "poor": 1, "broken": 1.5, "broke": 1.5,
+    "defective": 1.5, "disappointed": 1.5, "waste": 1.5, "slow": 0.5, "expensive": 0.5, "flimsy": 1,
+    "refund": 1, "return": 0.5, "scratch": 1, "smell": 0.5, "worst": 1.5, "useless": 1.5,
+}
+# aspect: words that mention it
+ASPECTS = {
+    "качество": ("качество", "материал", "сборка", "шов", "quality", "material", "build"),
+    "цена": ("цена", "стоимость", "деньги", "дорогой", "дешевый", "price", "money", "cost", "expensive", "cheap"),
+    "доставка": ("доставка", "задерж", "опозд", "курьер", "привезли", "пришел", "delivery", "shipping", "arrived", "courier"),
+    "упаковка": ("упаковка", "коробка", "пакет", "упакован", "packaging", "package", "box"),
+    "размер": ("размер", "размерный", "маломерит", "большемерит", "size", "fit"),
+    "продавец": ("продавец", "магазин", "поддержка", "сервис", "seller", "store", "support", "service"),
+}
+NEGATORS = frozenset((
+    "не", "нет", "ни", "без", "никогда",
+    "not", "no", "never", "without", "don't", "doesn't", "didn't", "isn't", "wasn't", "won't", "can't",
+))
+# Words that start a new clause: what follows is scored apart from what precedes
+CLAUSE_BREAKS = frozenset(("но", "а", "однако", "зато", "but", "however", "whereas"))
+INTENSIFIERS = frozenset(("очень", "крайне", "абсолютно", "невероятно", "very", "really", "extremely", "so", "super"))
+# "Недостатки: нет" and the like: the section says nothing
+EMPTY_MARKERS = frozenset((
+    "", "-", "—", "нет", "нету", "не обнаружено", "не выявлено", "не нашел", "не заметил",
+    "недостатков нет", "нет недостатков", "без недостатков", "no", "none", "n/a", "nothing",
+))
+
+RU_REFLEXIVE = ("ся", "сь")
+RU_ENDINGS = tuple(sorted((
+    "ыми", "ими", "ого", "его", "ому", "ему", "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой",
+    "ей", "ую", "юю", "ым", "им", "ом", "ем", "ах", "ях", "ам", "ям", "ов", "ев", "ами", "ями",
+    "ешь", "ет", "ют", "ут", "ит", "ат", "ят", "ть", "ла", "ло", "ли", "ен", "на", "но", "ны",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+), key=len, reverse=True))
+EN_SUFFIXES = ("ingly", "edly", "ness", "ing", "ed", "ly", "es", "s", "e", "y")
+CYRILLIC = re.compile(r"[а-я]")
+
+
+def normalize(text: str) -> str:
+    return text.lower().replace("ё", "е")
+
+
+def stem(word: str) -> str:
+    """Лёгкий стеммер: одно окончание (и -ся) для русского, суффикс для английского; основа не короче MIN_STEM."""
+    word = normalize(word)
+    if CYRILLIC.search(word):
+        for ending in RU_REFLEXIVE:
+            if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+                word = word[:-len(ending)]
+                break
+        endings = RU_ENDINGS
+    else:
+        endings = EN_SUFFIXES
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def trie_regex(words: Iterable[str]) -> str:
+    """Regex-дерево из слов: общие префиксы вынесены, совпадение — всегда самое длинное."""
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+@dataclass(frozen=True)
+class Term:
+    weight: float = 0.0 # signed; 0 for pure aspect mentions
+    aspect: Optional[str] = None
+
+
+def build_lexicon() -> Dict[str, Term]:
+    lexicon: Dict[str, Term] = {}
+    for words, sign in ((POSITIVE, 1), (NEGATIVE, -1)):
+        for word, weight in words.items():
+            lexicon[stem(word)] = Term(sign * weight)
+    for aspect, words in ASPECTS.items():
+        for word in words:
+            key = stem(word)
+            lexicon[key] = Term(lexicon.get(key, Term()).weight, aspect)
+    return lexicon
+
+
+LEXICON = build_lexicon()
+# One scan per field: clause ends, lexicon stems with any ending, any other word
+TOKEN_RE = re.compile(
+    r"(?P<end>[.!?;,\n]+)|\b(?P<term>" + trie_regex(LEXICON) + r")[\w'’]*|(?P<word>\w[\w'’]*)"
+)
+
+
+@dataclass
+class FieldScore:
+    total: float = 0.0
+    magnitude: float = 0.0
+    aspects: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+
+    @property
+    def score(self) -> float:
+        return round(self.total / (self.magnitude + 1), 3)
+
+
+@dataclass
+class ReviewScore:
+    sentiment: Optional[float]
+    advantages: Optional[float]
+    disadvantages: Optional[float]
+    aspects: Dict[str, float]
+
+    def columns(self) -> Dict[str, Any]:
+        """Значения для колонок Review."""
+        return {
+            "sentiment": self.sentiment,
+            "sentiment_advantages": self.advantages,
+            "sentiment_disadvantages": self.disadvantages,
+            "aspects": self.aspects or None,
+        }
+
+
+def score_field(text: Optional[str], prior: float = 0.0) -> Optional[FieldScore]:
+    """Оценка одного поля; None, если сказать нечего. prior — вес самого факта, что поле заполнено."""
+    if not text:
+        return None
+    text = normalize(text)
+    if text.strip(" .!") in EMPTY_MARKERS:
+        return None
+
+    result = FieldScore(total=prior, magnitude=abs(prior))
+    negate_left, boost = 0, 1.0
+    clause_total, clause_aspects = 0.0, set()
+
+    def close_clause():
+        nonlocal negate_left, boost, clause_total, clause_aspects
+        # An aspect named in a neutral clause of a pros/cons section takes the section's sign
+        value = clause_total or prior
+        for aspect in clause_aspects:
+            result.aspects[aspect] += value
+        negate_left, boost = 0, 1.0
+        clause_total, clause_aspects = 0.0, set()
+
+    for match in TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == "end":
+            close_clause()
+        elif kind == "word":
+            word = match.group()
+            if word in CLAUSE_BREAKS:
+                close_clause()
+            elif word in NEGATORS:
+                negate_left = NEGATION_WINDOW
+            elif word in INTENSIFIERS:
+                boost = INTENSIFIER_BOOST
+            elif negate_left:
+                negate_left -= 1
+        else:
+            term = LEXICON[match.group("term")]
+            if term.aspect:
+                clause_aspects.add(term.aspect)
+            if term.weight:
+                value = term.weight * boost * (-1 if negate_left else 1)
+                result.total += value
+                result.magnitude += abs(value)
+                clause_total += value
+                negate_left, boost = 0, 1.0
+    close_clause()
+    return result
+
+
+def score_review(text: Optional[str], advantages: Optional[str], disadvantages: Optional[str]) -> ReviewScore:
+    fields = (score_field(text), score_field(advantages, prior=1.0), score_field(disadvantages, prior=-1.0))
+    present = [f for f in fields if f is not None]
+    if not present:
+        return ReviewScore(None, None, None, {})
+
+    total = sum(f.total for f in present)
+    magnitude = sum(f.magnitude for f in present)
+    aspects: Dict[str, float] = defaultdict(float)
+    for f in present:
+        for aspect, value in f.aspects.items():
+            aspects[aspect] += value
+    return ReviewScore(
+        sentiment=round(total / (magnitude + 1), 3),
+        advantages=fields[1].score if fields[1] else None,
+        disadvantages=fields[2].score if fields[2] else None,
+        aspects={aspect: round(value / (abs(value) + 1), 3) for aspect, value in sorted(aspects.items()) if value},
+    )
+
+
+def score_reviews(rows: Iterable[Sequence[Optional[str]]]) -> List[ReviewScore]:
+    """Пакетная оценка: rows — (text, advantages, disadvantages)."""
+    return [score_review(*row) for row in rows]
+
+
+def apply_sentiment(review: Review) -> None:
+    """Пересчитывает оценки отзыва по его текущим полям (при создании и правке)."""
+    for name, value in score_review(review.text, review.advantages, review.disadvantages).columns().items():
+        setattr(review, name, value)
+
+
+async def rescore_reviews(db: AsyncSession, conditions: Sequence[Any] = (), batch_size: int = SCORE_BATCH_SIZE) -> int:
+    """Пересчитывает оценки отзывов по условиям WHERE пачками: один SELECT и один executemany UPDATE на пачку."""
+    scored, last_id = 0, 0
+    while True:
+        result = await db.execute(
+            select(Review.id, Review.text, Review.advantages, Review.disadvantages)
+            .where(Review.id > last_id, *conditions)
+            .order_by(Review.id)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            return scored
+        scores = score_reviews((r.text, r.advantages, r.disadvantages) for r in rows)
+        await db.execute(
+            update(Review).execution_options(synchronize_session=False),
+            [{"id": r.id, **s.columns()} for r, s in zip(rows, scores)],
+        )
+        scored += len(rows)
+        last_id = rows[-1].id
+
+
+def summarize(rows: Iterable[Sequence[Optional[str]]], threshold: float = 0.2) -> Tuple[int, int, int, Dict[str, float]]:
+    """(позитивных, негативных, нейтральных, средние оценки аспектов) по пачке отзывов."""
+    positives = negatives = neutrals = 0
+    aspect_sums: Dict[str, List[float]] = defaultdict(list)
+    for score in score_reviews(rows):
+        value = score.sentiment or 0.0
+        if value >= threshold:
+            positives += 1
+        elif value <= -threshold:
+            negatives += 1
+        else:
+            neutrals += 1
+        for aspect, aspect_value in score.aspects.items():
+            aspect_sums[aspect].append(aspect_value)
+    aspects = {aspect: round(sum(values) / len(values), 2) for aspect, values in aspect_sums.items()}
+    return positives, negatives, neutrals, aspects
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="manage.py sentiment", description="Пересчитать словарные оценки тональности отзывов.")
+    parser.add_argument("--product", type=int, help="Только отзывы этого товара")
+    parser.add_argument("--batch-size", type=int, default=SCORE_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    from app.database.init_db import add_missing_columns
+    from app.database.sync_session import engine
+    add_missing_columns(engine) # the score columns may not exist yet if the app has not been started since the upgrade
+
+    async def run() -> int:
+        from app.database.session import AsyncSessionLocal
+
+        from app.database.versions import bump_version
+
+        conditions = [Review.product_id == args.product] if args.product else []
+        async with AsyncSessionLocal() as db:
+            scored = await rescore_reviews(db, conditions, args.batch_size)
+            # /analyze/data returns the scores: cached pages of these products are stale now
+            product_ids = (await db.execute(select(Review.product_id).where(*conditions).distinct())).scalars().all()
+            for product_id in product_ids:
+                await bump_version(db, "reviews", product_id)
+            await db.commit()
+        return scored
+
+    print(f"Оценено отзывов: {asyncio.run(run())}")
@@ -0,0 +1,187 @@
+"""
+Сборка мусора в каталоге загрузок.
+
+Files in the uploads directory that no ProductImage, ImageVariant or
+ImageBlob row points at (deleted products and images, requests that failed
+after the write, leftover ``.upload-*`` temporaries) are removed once they
+are older than a grace period. The grace period protects files whose rows
+are not committed yet; reusing an existing blob or variant refreshes its
+mtime for the same reason.
+
+Referenced paths are streamed from the DB into a set, the directory is
+walked with ``os.scandir`` in a worker thread and deletions happen in
+batches. ``python manage.py gcuploads --dry-run`` only reports.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import settings
+from app.models.image import ProductImage
+from app.models.image_blob import ImageBlob
+from app.models.image_variant import ImageVariant
+from app.utils.uploads import UPLOAD_DIR
+
+logger = logging.getLogger(__name__)
+
+KEEP_FILES = {".gitkeep"}
+REPORT_SAMPLE_SIZE = 20
+
+
+@dataclass
+class GCReport:
+    dry_run: bool
+    scanned: int = 0
+    referenced: int = 0
+    too_recent: int = 0
+    orphaned: int = 0
+    deleted: int = 0
+    orphaned_bytes: int = 0
+    errors: int = 0
+    sample: List[str] = field(default_factory=list) # first orphans found, for the report
+
+
+async def referenced_paths(db: AsyncSession, chunk_size: int = 1000) -> Set[str]:
+    """Все пути, на которые ссылается БД, без загрузки ORM-объектов целиком."""
+    paths: Set[str] = set()
+    for column in (ProductImage.image_path, ImageVariant.path, ImageBlob.path):
+        result = await db.stream_scalars(select(column).execution_options(yield_per=chunk_size))
+        async for path in result:
+            paths.add(path)
+    return paths
+
+
+def iter_files(root: str, rel_dir: str = "") -> Iterator[Tuple[str, os.DirEntry]]:
+    """(путь относительно root, DirEntry) для каждого файла, рекурсивно."""
+    with os.scandir(os.path.join(root, rel_dir) if rel_dir else root) as entries:
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_files(root, rel_path)
+            elif entry.is_file(follow_symlinks=False):
+                yield rel_path, entry
+
+
+def sweep(
+    upload_dir: str,
+    referenced: Set[str],
+    grace_seconds: float,
+    batch_size: int,
+    dry_run: bool = False,
+    now: Optional[float] = None,
+) -> GCReport:
+    report = GCReport(dry_run=dry_run)
+    if not os.path.isdir(upload_dir):
+        return report
+
+    cutoff = (now if now is not None else time.time()) - grace_seconds
+    batch: List[str] = []
+    for rel_path, entry in iter_files(upload_dir):
+        if entry.name in KEEP_FILES:
+            continue
+        report.scanned += 1
+        if rel_path in referenced:
+            report.referenced += 1
+            continue
+        try:
+            stat = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        if stat.st_mtime > cutoff:
+            report.too_recent += 1
+            continue
+
+        report.orphaned += 1
+        report.orphaned_bytes += stat.st_size
+        if len(report.sample) < REPORT_SAMPLE_SIZE:
+            report.sample.append(rel_path)
+        if not dry_run:
+            batch.append(rel_path)
+            if len(batch) >= batch_size:
+                _delete_batch(upload_dir, batch, report)
+                batch = []
+
+    if batch:
+        _delete_batch(upload_dir, batch, report)
+    return report
+
+
+def _delete_batch(upload_dir: str, batch: List[str], report: GCReport) -> None:
+    parents = set()
+    for rel_path in batch:
+        try:
+            os.remove(os.path.join(upload_dir, rel_path))
+            report.deleted += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            report.errors += 1
+            logger.warning(f"Не удалось удалить {rel_path}: {e}")
+        parents.add(os.path.dirname(rel_path))
+
+    # blobs/ab/ and variants/ab/ directories left empty
+    for parent in parents:
+        if parent:
+            try:
+                os.rmdir(os.path.join(upload_dir, parent))
+            except OSError:
+                pass
+    logger.info(f"Загрузки: удалено {report.deleted} неиспользуемых файлов")
+
+
+async def collect_garbage(
+    db: AsyncSession,
+    upload_dir: str = UPLOAD_DIR,
+    grace_seconds: Optional[float] = None,
+    batch_size: Optional[int] = None,
+    dry_run: bool = False,
+) -> GCReport:
+    """Находит (и, если не dry_run, удаляет) неиспользуемые файлы загрузок."""
+    grace_seconds = settings.UPLOAD_GC_GRACE_PERIOD if grace_seconds is None else grace_seconds
+    batch_size = batch_size or settings.UPLOAD_GC_BATCH_SIZE
+    referenced = await referenced_paths(db)
+    return await asyncio.to_thread(sweep, upload_dir, referenced, grace_seconds, batch_size, dry_run)
+
+
+async def run_periodic(interval: float) -> None:
+    """Фоновая задача воркера: периодическая сборка мусора в загрузках."""
+    from app.database.session import AsyncSessionLocal
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSessionLocal() as db:
+                await collect_garbage(db)
+        except Exception as e:
+            logger.warning(f"Upload GC failed: {e}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Remove uploaded files no longer referenced by the database")
+    parser.add_argument("--upload-dir", default=UPLOAD_DIR)
+    parser.add_argument("--grace-hours", type=float, default=settings.UPLOAD_GC_GRACE_PERIOD / 3600)
+    parser.add_argument("--batch-size", type=int, default=settings.UPLOAD_GC_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+    args = parser.parse_args(argv)
+
+    from app.database.session import AsyncSessionLocal
+
+    async def run() -> GCReport:
+        async with AsyncSessionLocal() as db:
+            return await collect_garbage(db, args.upload_dir, args.grace_hours * 3600, args.batch_size, args.dry_run)
+
+    report = asyncio.run(run())
+    print(json.dumps(asdict(report), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -121,6 +121,16 @@ class AnalyzeProductManager {
     
     // Кнопка очистки отзывов
     this.clearReviewsBtn?.addEventListener('click', (event) => this.handleClearReviews(event));
+
+    // Выгрузка отзывов с текущими фильтрами таблицы
+    document.querySelectorAll('.review-export-link').forEach(link => {
+      link.addEventListener('click', () => {
+        const params = new URLSearchParams(TableUtils.getNonDefaultFiltersForUrl());
+        ['page', 'limit', 'sort_by', 'sort_dir', 'product_id'].forEach(key => params.delete(key));
+        params.set('format', link.dataset.format);
+        link.href = `/api/review/export/${this.productId}?${params.toString()}`;
+      });
+    });
     
     // Кнопка показа блока загрузки файлов
     const showUploadBtn = document.getElementById('show-upload-btn');
@@ -688,9 +698,15 @@ class AnalyzeProductManager {
           throw new Error(data.detail || "Ошибка на сервере");
       }
 
+      analyzeStatus.textContent = "Анализ в очереди...";
+      const job = await this.waitForAnalysisJob(data.job_id, analyzeStatus);
+      if (job.status !== "done") {
+          throw new Error(job.error || "Анализ не выполнен");
+      }
+
       analyzeStatus.textContent = "Анализ завершён успешно!";
       analyzeStatus.style.color = "green";
-      document.getElementById('analysis_result').value = data.result;
+      document.getElementById('analysis_result').value = job.result;
     } catch (error) {
       const analyzeStatus = document.getElementById('analyze-status');
       analyzeStatus.textContent = "Ошибка анализа: " + error.message;
@@ -700,6 +716,26 @@ class AnalyzeProductManager {
     }
   }
 
+  // Long-poll задачи анализа: сервер держит запрос до завершения или до wait секунд
+  async waitForAnalysisJob(jobId, statusElement) {
+    while (true) {
+      const response = await fetch(`/analyze/jobs/${jobId}?wait=25`, {
+        headers: { "X-Requested-With": "XMLHttpRequest" },
+        credentials: "same-origin"
+      });
+      const job = await response.json();
+      if (!response.ok) {
+        throw new Error(job.detail || "Ошибка на сервере");
+      }
+      if (job.status === "done" || job.status === "failed") {
+        return job;
+      }
+      if (job.status === "running") {
+        statusElement.textContent = "Анализируем отзывы...";
+      }
+    }
+  }
+
   async handleFiles(fileList) {
     if (!fileList || fileList.length === 0) return;
     
@@ -90,6 +90,19 @@ class DashboardManager {
 
 
 
+// Миниатюра вместо оригинала: WebP, если браузер его берёт, иначе JPEG/PNG-копия
+function productImageHtml(product, imgClass) {
+  const uploads = '/static/uploads/';
+  const src = product.main_thumbnail_filename || product.main_image_filename;
+  if (!src) {
+    return `<img src="/static/images/placeholder.png" alt="Фото" class="${imgClass}" />`;
+  }
+  const webp = product.main_thumbnail_webp_filename
+    ? `<source type="image/webp" srcset="${uploads + product.main_thumbnail_webp_filename}" />`
+    : '';
+  return `<picture>${webp}<img src="${uploads + src}" alt="Фото" loading="lazy" class="${imgClass}" /></picture>`;
+}
+
 // ====================
 // === INIT ON LOAD ===
 // ====================
@@ -113,7 +126,7 @@ function renderProductCards(products, cardsContainer) {
       <div class="card relative bg-white rounded-xl shadow-custom p-[10px] shadow-[0px_2px_6px_0px_rgba(0,0,0,0.25)]" data-id="${product.id}">
         <div class="font-semibold text-sm leading-none tracking-normal align-middle mb-[4px] md:hidden">${product.name || ''}</div>
         <div class="bg-white rounded-xl shadow-custom flex flex-row gap-4">
-          <img src="${product.main_image_filename ? '/static/uploads/' + product.main_image_filename : '/static/images/placeholder.png'}" alt="Фото" class="min-w-[140px] max-w-[160px] min-h-[140px] max-h-[160px] object-cover rounded-xl mx-auto md:mx-0" />
+          ${productImageHtml(product, 'min-w-[140px] max-w-[160px] min-h-[140px] max-h-[160px] object-cover rounded-xl mx-auto md:mx-0')}
           <div class="flex-1 flex flex-col justify-between">
             <div class="card-wrap">
               <div class="font-semibold text-sm leading-none tracking-normal align-middle mb-[4px] hidden md:block">${product.name || ''}</div>
@@ -206,8 +219,7 @@ TableUtils.init({
     return `
       <tr id="product-row-${product.id}" class=" h-[80px] align-middle border-b border-gray-200 table-row cursor-pointer">
         <td class="w-[80px] p-[5px]">
-          <img src="${product.main_image_filename ? '/static/uploads/' + product.main_image_filename : '/static/images/placeholder.png'}"
-               alt="Фото" class="w-16 h-16 object-cover rounded-xl shadow">
+          ${productImageHtml(product, 'w-16 h-16 object-cover rounded-xl shadow')}
         </td>
         <td class="p-[5px] align-middle font-semibold text-gray-900 line-clamp-3">${product.name || ""}</td>
         <td class="w-[125px] p-[5px] align-middle text-gray-700">${product.ean || ""}</td>
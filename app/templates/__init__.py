@@ -1,3 +1,8 @@
 from fastapi.templating import Jinja2Templates
 
-templates = Jinja2Templates(directory="app/templates")
\ No newline at end of file
+from app.core.assets import asset_url
+from app.templates.fragment_cache import FragmentCacheExtension, fragment_cache
+
+templates = Jinja2Templates(directory="app/templates")
+templates.env.add_extension(FragmentCacheExtension)
+templates.env.globals["asset_url"] = asset_url
\ No newline at end of file
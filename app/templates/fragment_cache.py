@@ -0,0 +1,113 @@
+"""
+Кеш отрендеренных фрагментов шаблонов.
+
+Usage in a template::
+
+    {% cache "sidebar", active_menu, request.base_url %} ... {% endcache %}
+
+The first argument names the fragment, the rest are the inputs the block
+depends on; the block output is reused for as long as those inputs (and the
+template) are the same. Keys must be explicit: anything the block reads but
+the key does not mention is frozen at the first render.
+
+Per-request values must stay outside of cached blocks. As a safety net a
+block whose output contains the request's CSRF token is rendered but never
+stored.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from jinja2 import Undefined, nodes
+from jinja2.ext import Extension
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FragmentCache:
+    """LRU of rendered fragments: key -> (html, seconds it took to render)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, html: str, render_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (html, render_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+fragment_cache = FragmentCache(settings.FRAGMENT_CACHE_SIZE)
+
+
+def _make_key(template_name: Optional[str], fragment: str, args: Tuple[Any, ...]) -> str:
+    raw = "\x1f".join([template_name or "", fragment, *(repr(arg) for arg in args)])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        call = self.call_method(
+            "_render_cached",
+            [nodes.Const(parser.name), nodes.List(args), nodes.ContextReference()],
+        )
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, template_name: Optional[str], args, context, caller) -> str:
+        # Неопределённая переменная в ключе заморозила бы фрагмент навсегда
+        if not settings.FRAGMENT_CACHE_ENABLED or any(isinstance(arg, Undefined) for arg in args):
+            return caller()
+
+        fragment = str(args[0])
+        key = _make_key(template_name, fragment, tuple(args[1:]))
+        cached = fragment_cache.get(key)
+        if cached is not None:
+            html, render_seconds = cached
+            metrics.FRAGMENT_CACHE_HITS.labels(fragment).inc()
+            metrics.FRAGMENT_RENDER_SAVED.labels(fragment).inc(render_seconds)
+            return html
+
+        started_at = time.perf_counter()
+        html = caller()
+        render_seconds = time.perf_counter() - started_at
+
+        csrf_token = context.get("csrf_token")
+        if csrf_token and str(csrf_token) in html:
+            logger.warning("Fragment %r in %s contains the CSRF token and will not be cached", fragment, template_name)
+            return html
+
+        fragment_cache.set(key, html, render_seconds)
+        metrics.FRAGMENT_CACHE_MISSES.labels(fragment).inc()
+        return html
+
@@ -1,4 +1,5 @@
 from app.utils import converters
+from app.utils import http_cache
 from app.utils import parsers
 from app.utils import permissions
 from app.utils import query_params
@@ -0,0 +1,129 @@
+"""
+Потоковые writer'ы для выгрузок: CSV, NDJSON и XLSX.
+
+Each writer takes the column names and an async iterator of row batches
+(tuples in column order) and yields encoded chunks, so a response never
+holds more than one batch. XLSX uses openpyxl's write-only mode, which
+spills rows to a temporary file; the zip container can only be produced at
+the end, so that format starts sending once all rows are written.
+
+Texts are user content, and a cell starting with "=", "+", "-" or "@" is
+run as a formula when the file is opened in a spreadsheet. CSV cells like
+that get a leading apostrophe (the importers strip it again), and XLSX
+cells are written as plain strings.
+"""
+
+import csv
+import io
+import tempfile
+from typing import AsyncIterator, Dict, Sequence, Tuple
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.core import metrics
+from app.core.responses import dumps
+
+# format -> (media type, file extension)
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+XLSX_SPOOL_SIZE = 8 * 1024 * 1024 # in memory below this, then on disk
+STREAM_CHUNK_SIZE = 64 * 1024
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+Rows = Sequence[Sequence]
+
+
+async def csv_chunks(fields: Sequence[str], batches: AsyncIterator[Rows]) -> AsyncIterator[bytes]:
+    # BOM so that Excel picks UTF-8; the importers decode utf-8-sig
+    yield "\ufeff".encode("utf-8") + _csv_lines([fields])
+    async for rows in batches:
+        yield _csv_lines(rows)
+        metrics.EXPORT_ROWS.labels("csv").inc(len(rows))
+
+
+async def ndjson_chunks(fields: Sequence[str], batches: AsyncIterator[Rows]) -> AsyncIterator[bytes]:
+    async for rows in batches:
+        yield b"".join(dumps(dict(zip(fields, row))) + b"\n" for row in rows)
+        metrics.EXPORT_ROWS.labels("ndjson").inc(len(rows))
+
+
+async def xlsx_chunks(fields: Sequence[str], batches: AsyncIterator[Rows], sheet_title: str = "Export") -> AsyncIterator[bytes]:
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_title)
+    sheet.append(list(fields))
+    async for rows in batches:
+        await run_in_threadpool(_append_rows, sheet, rows)
+        metrics.EXPORT_ROWS.labels("xlsx").inc(len(rows))
+
+    with tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_SIZE) as spool:
+        await run_in_threadpool(workbook.save, spool)
+        spool.seek(0)
+        while True:
+            chunk = await run_in_threadpool(spool.read, STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+WRITERS = {
+    "csv": csv_chunks,
+    "ndjson": ndjson_chunks,
+    "xlsx": xlsx_chunks,
+}
+
+
+def streaming_export(fields: Sequence[str], batches: AsyncIterator[Rows], export_format: str, filename: str) -> StreamingResponse:
+    """StreamingResponse с телом в формате export_format; filename без расширения."""
+    media_type, extension = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        WRITERS[export_format](fields, batches),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'},
+    )
+
+
+def escape_formula(value):
+    """Апостроф перед текстом, который Excel принял бы за формулу; уже экранированный — ещё раз, чтобы импорт вернул его как есть."""
+    if isinstance(value, str) and (value.startswith(FORMULA_PREFIXES) or unescape_formula(value) != value):
+        return "'" + value
+    return value
+
+
+def unescape_formula(value):
+    """Обратное escape_formula: для ячеек CSV при импорте."""
+    if isinstance(value, str) and value[:1] == "'":
+        rest = value[1:]
+        if rest.startswith(FORMULA_PREFIXES) or unescape_formula(rest) != rest:
+            return rest
+    return value
+
+
+def _csv_lines(rows: Rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(["" if value is None else escape_formula(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _xlsx_cell(sheet, value):
+    if not isinstance(value, str):
+        return value
+    # Control characters pasted into texts are not allowed in XLSX cells
+    value = ILLEGAL_CHARACTERS_RE.sub("", value)
+    if not value.startswith("="):
+        return value
+    cell = WriteOnlyCell(sheet, value)
+    cell.data_type = "s" # openpyxl would store it as a formula
+    return cell
+
+
+def _append_rows(sheet, rows: Rows) -> None:
+    for row in rows:
+        sheet.append([_xlsx_cell(sheet, value) for value in row])
@@ -0,0 +1,49 @@
+"""
+ETag / If-None-Match для JSON-эндпоинтов.
+
+The ETag is weak: it identifies the data behind a URL (versions, user, query
+string), not the exact bytes, which may differ after compression.
+"""
+
+import hashlib
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.versions import VersionScope, get_versions_token
+from app.models import User
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: object) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison as required for If-None-Match (RFC 9110, 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+async def data_etag(db: AsyncSession, request: Request, user: User, scopes: Iterable[VersionScope]) -> str:
+    versions = await get_versions_token(db, scopes)
+    query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+    return make_etag(request.url.path, query, user.id, user.is_superuser, versions)
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Возвращает 304, если клиент уже имеет актуальную версию, иначе None."""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+    return None
+
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
@@ -0,0 +1,97 @@
+"""
+Уменьшенные копии изображений (миниатюры и WebP).
+
+Runs inside a worker process, so it only depends on Pillow and the file
+system. Variant paths are derived from the source path, which for
+content-addressed blobs means identical uploads share their variants and
+an existing variant is never rendered twice.
+"""
+
+import os
+import uuid
+from typing import List, Sequence, Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError: # optional: without Pillow the originals are served
+    Image = None
+
+VARIANT_DIR = "variants"
+# format -> (file extension, Pillow format name)
+FORMATS = {
+    "webp": (".webp", "WEBP"),
+    "jpeg": (".jpg", "JPEG"),
+    "png": (".png", "PNG"),
+}
+
+# (width, format, path relative to the uploads directory)
+RenderedVariant = Tuple[int, str, str]
+
+
+def variant_path(image_path: str, width: int, fmt: str) -> str:
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    return f"{VARIANT_DIR}/{stem[:2]}/{stem}-{width}w{FORMATS[fmt][0]}"
+
+
+def render_variants(
+    upload_dir: str,
+    image_path: str,
+    widths: Sequence[int],
+    webp_quality: int = 80,
+    jpeg_quality: int = 85,
+) -> List[RenderedVariant]:
+    """
+    Для каждой ширины пишет WebP и копию в исходном семействе форматов
+    (PNG при прозрачности, иначе JPEG). Images narrower than a width are
+    not upscaled: that variant keeps the original width.
+    """
+    if Image is None:
+        return []
+
+    source = os.path.join(upload_dir, image_path)
+    try:
+        with Image.open(source) as opened:
+            image = ImageOps.exif_transpose(opened)
+            image.load()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return [] # not an image Pillow understands: keep serving the original
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    fallback = "png" if has_alpha else "jpeg"
+
+    rendered: List[RenderedVariant] = []
+    for width in sorted(set(widths)):
+        target_width = min(width, image.width)
+        target_height = max(1, round(image.height * target_width / image.width))
+        resized = None
+        for fmt in ("webp", fallback):
+            path = variant_path(image_path, width, fmt)
+            full_path = os.path.join(upload_dir, path)
+            try:
+                os.utime(full_path) # reused: refresh the mtime for the upload GC grace period
+            except FileNotFoundError:
+                if resized is None:
+                    resized = image if target_width == image.width else image.resize(
+                        (target_width, target_height), Image.Resampling.LANCZOS, reducing_gap=3.0
+                    )
+                _save(resized, full_path, fmt, webp_quality, jpeg_quality)
+            rendered.append((width, fmt, path))
+    return rendered
+
+
+def _save(image, full_path: str, fmt: str, webp_quality: int, jpeg_quality: int) -> None:
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    options = {
+        "webp": {"quality": webp_quality, "method": 4},
+        "jpeg": {"quality": jpeg_quality, "optimize": True, "progressive": True},
+        "png": {"optimize": True},
+    }[fmt]
+    # Written under a temporary name so readers never see a half-written file
+    tmp_path = f"{full_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        image.save(tmp_path, FORMATS[fmt][1], **options)
+        os.replace(tmp_path, full_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
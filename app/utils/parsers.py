@@ -1,12 +1,15 @@
 import io
 import csv
 import json
+import time
 import openpyxl
 from fastapi import UploadFile
 from fastapi.concurrency import run_in_threadpool # Import run_in_threadpool
 from pydantic import ValidationError
 from typing import Dict, List, Any, Optional # Added for type hints
 
+from app.core import metrics
+from app.utils.export_writers import unescape_formula
 from app.schemas.review import preprocess_review_row, ReviewUploadIn
 
 def prettify_pydantic_error(err: Dict[str, Any], raw_row: Dict[str, Any], row_number: int) -> str:
@@ -57,9 +60,16 @@ def _parse_and_process_content_sync(content_bytes: bytes, filename: str) -> Dict
             items = json.loads(content_bytes.decode())
             total_rows = len(items)
             reviews = process_reviews_list(items, errors)
+        elif ext in ("ndjson", "jsonl"):
+            # Один объект на строку (формат выгрузки /api/review/export)
+            items = [json.loads(line) for line in content_bytes.decode("utf-8-sig").splitlines() if line.strip()]
+            total_rows = len(items)
+            reviews = process_reviews_list(items, errors)
         elif ext == "csv":
-            reader = csv.DictReader(io.StringIO(content_bytes.decode()))
-            items = list(reader)
+            # utf-8-sig: CSV из Excel и из нашей выгрузки начинается с BOM
+            reader = csv.DictReader(io.StringIO(content_bytes.decode("utf-8-sig")))
+            # Our export escapes formula-like cells with an apostrophe
+            items = [{k: unescape_formula(v) for k, v in row.items()} for row in reader]
             total_rows = len(items)
             reviews = process_reviews_list(items, errors)
         elif ext == "xlsx":
@@ -84,7 +94,7 @@ def _parse_and_process_content_sync(content_bytes: bytes, filename: str) -> Dict
             total_rows = len(items)
             reviews = process_reviews_list(items, errors)
         else:
-            errors.append("Формат файла должен быть .json, .csv или .xlsx")
+            errors.append("Формат файла должен быть .json, .ndjson, .csv или .xlsx")
             # No need to return here, let it fall through to the main return
 
     except Exception as e: # Catch parsing specific errors
@@ -108,7 +118,11 @@ async def parse_reviews_file_to_list(file: UploadFile) -> Dict[str, Any]:
 
     try:
         # Run the synchronous parsing logic in a thread pool
+        started_at = time.perf_counter()
         result = await run_in_threadpool(_parse_and_process_content_sync, content_bytes, filename)
+        metrics.IMPORT_DURATION.observe(time.perf_counter() - started_at)
+        metrics.IMPORT_ROWS.labels("ok").inc(result.get("success_count", 0))
+        metrics.IMPORT_ROWS.labels("rejected").inc(max(result.get("total_rows", 0) - result.get("success_count", 0), 0))
 
         # Check if parsing itself failed critically within the sync function
         if not result.get("reviews") and result.get("errors") and "Формат файла должен быть" in result["errors"][0]:
@@ -139,6 +139,8 @@ class AnalyzeFilters(BaseModel):
     disadvantages: Optional[str] = ""
     normalized_rating_min: Optional[int] = 0
     normalized_rating_max: Optional[int] = 0
+    sentiment_min: Optional[float] = None # -1..1, see app/services/sentiment.py
+    sentiment_max: Optional[float] = None
 
 
 # Универсальный фильтр для SQLAlchemy
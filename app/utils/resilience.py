@@ -0,0 +1,186 @@
+"""
+Повторы, хеджирование и circuit breaker для вызовов внешних сервисов.
+
+call_with_retries() runs an attempt function. TransientError (timeouts,
+429, 5xx) is retried with exponential backoff and full jitter. A
+Retry-After sent by the server replaces the computed delay. Other
+exceptions propagate at once.
+
+With hedge_delay set, an attempt that has not finished after that many
+seconds gets a second identical request, and the first answer wins. That
+cuts tail latency but may pay for two calls.
+
+The CircuitBreaker opens after failure_threshold transient failures in a
+row. While open, calls fail immediately with CircuitOpenError instead of
+waiting out timeouts. After reset_timeout one trial call is let through:
+success closes the circuit, failure opens it again.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional
+
+from app.core import metrics
+
+
+class TransientError(Exception):
+    """Сбой, после которого имеет смысл повторить запрос."""
+
+    def __init__(self, reason: str, status_code: int = 503, retry_after: Optional[float] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """Сервис считается недоступным: запрос не отправлялся."""
+
+
+def parse_retry_after(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """Retry-After: число секунд или HTTP-дата."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+@dataclass
+class RetryPolicy:
+    attempts: int = 3 # including the first one
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+    max_retry_after: float = 60.0 # a longer Retry-After is not worth waiting for: give up
+
+    def backoff(self, retry: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """Пауза перед повтором номер retry (с 0); None — не повторять."""
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, name: str = "default", clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+
+    @property
+    def available(self) -> bool:
+        """Пропустит ли before_call() вызов сейчас; состояние не меняется."""
+        if self.failure_threshold <= 0 or self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return self.clock() - self.opened_at >= self.reset_timeout
+        return not self._trial_running
+
+    def before_call(self) -> None:
+        if self.failure_threshold <= 0 or self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN and not self._trial_running:
+            self._trial_running = True # one trial call, the rest keep failing fast
+            return
+        raise CircuitOpenError(f"circuit {self.name} is open")
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._trial_running = False
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_running = False
+        if self.failure_threshold > 0 and (self.state == self.HALF_OPEN or self.failures >= self.failure_threshold):
+            self.opened_at = self.clock()
+            self._set_state(self.OPEN)
+
+    def release(self) -> None:
+        """Вызов прерван (отмена): результат неизвестен, пробный слот освобождается."""
+        self._trial_running = False
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        metrics.AI_CIRCUIT_OPEN.labels(self.name).set(0 if state == self.CLOSED else 1)
+
+
+async def hedged(call: Callable[[], Awaitable[Any]], delay: float, name: str = "default") -> Any:
+    """Второй такой же запрос, если первый не ответил за delay секунд; побеждает первый успешный."""
+    pending = {asyncio.ensure_future(call())}
+    error: Optional[BaseException] = None
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return done.pop().result()
+
+        metrics.AI_HEDGED.labels(name).inc()
+        pending.add(asyncio.ensure_future(call()))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def call_with_retries(
+    call: Callable[[], Awaitable[Any]],
+    policy: RetryPolicy,
+    breaker: Optional[CircuitBreaker] = None,
+    hedge_delay: float = 0,
+    name: str = "default",
+    sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+) -> Any:
+    retry = 0
+    while True:
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            result = await (hedged(call, hedge_delay, name) if hedge_delay > 0 else call())
+        except TransientError as e:
+            if breaker is not None:
+                breaker.record_failure()
+            delay = policy.backoff(retry, e.retry_after) if retry + 1 < policy.attempts else None
+            if delay is None:
+                raise
+            metrics.AI_RETRIES.labels(name, e.reason).inc()
+            retry += 1
+            await sleep(delay)
+            continue
+        except Exception:
+            # The service answered (4xx, bad payload): it is up, only this request failed
+            if breaker is not None:
+                breaker.record_success()
+            raise
+        except BaseException:
+            if breaker is not None:
+                breaker.release()
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        return result
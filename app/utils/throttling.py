@@ -0,0 +1,119 @@
+"""
+Ограничение частоты и объединение одинаковых запросов к внешним API.
+
+RateLimiter keeps two token buckets, requests per minute and tokens per
+minute. Callers wait in FIFO order until both have room, so a burst is
+queued in the process instead of turning into 429s from the provider.
+SingleFlight lets concurrent callers with the same key share one in-flight
+call. Both are per process.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core import metrics
+
+
+class TokenBucket:
+    """Ведро на limit единиц в минуту; limit <= 0 — без ограничения."""
+
+    def __init__(self, limit_per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(limit_per_minute)
+        self.rate = self.capacity / 60.0
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Сколько секунд ждать, пока в ведре наберётся amount."""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity) # a request larger than the bucket waits for a full one
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        if not self.unlimited:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Поправка после ответа: списать (amount > 0) или вернуть разницу с оценкой."""
+        if not self.unlimited:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RateLimiter:
+    """RPM + TPM: acquire() ждёт в очереди, пока оба ведра не позволят запрос."""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, name: str = "default", clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.requests = TokenBucket(rpm, clock)
+        self.tokens = TokenBucket(tpm, clock)
+        self.waiting = 0
+        self._lock = asyncio.Lock()
+
+    def configure(self, rpm: float, tpm: float) -> None:
+        self.requests = TokenBucket(rpm, self.requests.clock)
+        self.tokens = TokenBucket(tpm, self.tokens.clock)
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Ждёт своей очереди; возвращает время ожидания в секундах."""
+        started_at = time.perf_counter()
+        self.waiting += 1
+        metrics.AI_QUEUE_DEPTH.labels(self.name).set(self.waiting)
+        try:
+            # The lock keeps waiters in arrival order: a small request cannot overtake a big one
+            async with self._lock:
+                while True:
+                    delay = max(self.requests.delay(1), self.tokens.delay(tokens))
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(delay)
+                self.requests.take(1)
+                self.tokens.take(tokens)
+        finally:
+            self.waiting -= 1
+            metrics.AI_QUEUE_DEPTH.labels(self.name).set(self.waiting)
+        waited = time.perf_counter() - started_at
+        metrics.AI_QUEUE_WAIT.labels(self.name).observe(waited)
+        return waited
+
+    def record_usage(self, estimated: int, actual: Optional[int]) -> None:
+        """Учесть фактический расход токенов вместо оценки."""
+        if actual is not None:
+            self.tokens.adjust(actual - estimated)
+
+
+class SingleFlight:
+    """Одновременные вызовы с одинаковым ключом ждут один общий вызов."""
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            metrics.AI_COALESCED.labels(self.name).inc()
+        # A cancelled caller must not cancel the call the others are waiting for
+        return await asyncio.shield(task)
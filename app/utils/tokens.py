@@ -0,0 +1,86 @@
+"""
+Оценка числа токенов без токенизатора модели.
+
+The text is split the way BPE pre-tokenizers split it (letter runs, digit
+runs, punctuation, whitespace) and each piece is charged by script:
+Latin words average about five characters per token, Cyrillic about two
+and a half, digits three, and every punctuation mark counts as a token.
+The ratios are rounded towards more tokens: the estimate decides whether
+a request fits the context, so it should err high.
+"""
+
+import math
+import re
+from typing import Callable, List, Sequence
+
+CHARS_PER_TOKEN_LATIN = 5.0
+CHARS_PER_TOKEN_CYRILLIC = 2.5
+CHARS_PER_TOKEN_DIGITS = 3.0
+CHARS_PER_TOKEN_OTHER = 2.0 # other scripts: CJK, Greek, ...
+MESSAGE_OVERHEAD = 7 # chat framing: role markers plus the reply priming
+
+# Context windows by model name prefix; the longest matching prefix wins
+MODEL_CONTEXT = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "o1": 200000,
+    "o3": 200000,
+    "o4": 200000,
+}
+DEFAULT_CONTEXT = 8192
+
+PIECE_RE = re.compile(r"(?P<latin>[A-Za-z]+)|(?P<cyrillic>[А-Яа-яЁё]+)|(?P<digits>\d+)|(?P<space>\s+)|(?P<other>[^\W\d_]+)|(?P<symbol>.)", re.S)
+
+
+def estimate_tokens(text: str) -> int:
+    """Примерное число токенов текста (с небольшим запасом вверх)."""
+    tokens = 0
+    for match in PIECE_RE.finditer(text):
+        kind, size = match.lastgroup, match.end() - match.start()
+        if kind == "latin":
+            tokens += math.ceil(size / CHARS_PER_TOKEN_LATIN)
+        elif kind == "cyrillic":
+            tokens += math.ceil(size / CHARS_PER_TOKEN_CYRILLIC)
+        elif kind == "digits":
+            tokens += math.ceil(size / CHARS_PER_TOKEN_DIGITS)
+        elif kind == "space":
+            # A single space is glued to the next word; newlines and indentation are tokens of their own
+            if match.group() != " ":
+                tokens += 1
+        elif kind == "other":
+            tokens += math.ceil(size / CHARS_PER_TOKEN_OTHER)
+        else:
+            tokens += 1
+    return tokens
+
+
+def estimate_message_tokens(text: str) -> int:
+    """Токены одного сообщения чата вместе с обвязкой."""
+    return estimate_tokens(text) + MESSAGE_OVERHEAD
+
+
+def context_window(model: str) -> int:
+    matches = [prefix for prefix in MODEL_CONTEXT if model.startswith(prefix)]
+    return MODEL_CONTEXT[max(matches, key=len)] if matches else DEFAULT_CONTEXT
+
+
+def fit_lines(lines: Sequence[str], budget: int, priority: Callable[[int], object]) -> List[int]:
+    """
+    Индексы строк, которые помещаются в budget токенов (по одной на строку
+    уходит на перевод строки). Строки берутся в порядке priority(index) —
+    меньше значит важнее; результат — в исходном порядке.
+    """
+    costs = [estimate_tokens(line) + 1 for line in lines]
+    if sum(costs) <= budget:
+        return list(range(len(lines)))
+
+    kept, used = [], 0
+    for index in sorted(range(len(lines)), key=priority):
+        if used + costs[index] <= budget:
+            kept.append(index)
+            used += costs[index]
+    return sorted(kept)
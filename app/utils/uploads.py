@@ -0,0 +1,93 @@
+"""
+Потоковое сохранение загруженных файлов.
+
+The upload is copied in fixed-size chunks into a temporary file next to its
+final location while its SHA-256 is computed, so memory use does not depend
+on the file size and an oversized file is rejected as soon as it crosses
+the limit. The temporary file is then atomically renamed into place.
+"""
+
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile
+
+from app.core import settings
+
+UPLOAD_DIR = "app/static/uploads" # served under /static/uploads/
+TMP_PREFIX = ".upload-"
+
+
+@dataclass
+class ReceivedUpload:
+    tmp_path: str
+    directory: str
+    size: int
+    sha256: str
+    extension: str
+
+
+async def receive_upload(
+    upload: UploadFile,
+    directory: str,
+    max_bytes: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> ReceivedUpload:
+    """Копирует UploadFile во временный файл в directory, считая размер и SHA-256."""
+    max_bytes = settings.MAX_UPLOAD_SIZE if max_bytes is None else max_bytes
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+
+    # Starlette already knows the size of the spooled part: reject without copying
+    if upload.size is not None and upload.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f"{TMP_PREFIX}{uuid.uuid4().hex}")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large(max_bytes)
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        await discard_upload_path(tmp_path)
+        raise
+
+    extension = os.path.splitext(upload.filename or "")[1].lower()
+    return ReceivedUpload(tmp_path=tmp_path, directory=directory, size=size, sha256=digest.hexdigest(), extension=extension)
+
+
+async def store_upload(received: ReceivedUpload, filename: str) -> str:
+    """Атомарно переносит временный файл в directory/filename, возвращает filename."""
+    await aiofiles.os.replace(received.tmp_path, os.path.join(received.directory, filename))
+    return filename
+
+
+async def discard_upload(received: ReceivedUpload) -> None:
+    await discard_upload_path(received.tmp_path)
+
+
+async def discard_upload_path(path: str) -> None:
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Файл слишком большой (максимум {max_bytes // (1024 * 1024)} МБ)",
+    )
@@ -41,6 +41,46 @@ def test():
     #subprocess.run(["pytest", "tests", "-v"])
     subprocess.run(["pytest", "tests/test_db_connection.py", "-v"])
     
+def seedbench():
+    """Заполнить БД синтетическими данными для бенчмарков (аргументы: см. --help)"""
+    from tests.benchmarks.datagen import main as datagen_main
+    datagen_main(sys.argv[2:])
+
+def bench():
+    """Нагрузочный прогон горячих эндпоинтов, результат в JSON (аргументы: см. --help)"""
+    from tests.benchmarks.run import main as bench_main
+    bench_main(sys.argv[2:])
+
+def assets():
+    """Собрать статику: хешированные имена, .gz/.br копии и manifest.json"""
+    from app.core.assets import main as assets_main
+    assets_main(sys.argv[2:])
+
+def thumbnails():
+    """Создать миниатюры и WebP-копии для изображений, загруженных раньше (аргументы: см. --help)"""
+    from app.services.image_variants import main as thumbnails_main
+    thumbnails_main(sys.argv[2:])
+
+def gcuploads():
+    """Удалить файлы загрузок, на которые не ссылается БД (аргументы: см. --help)"""
+    from app.services.upload_gc import main as gc_main
+    gc_main(sys.argv[2:])
+
+def worker():
+    """Выполнять задачи ИИ-анализа в отдельном процессе (аргументы: см. --help)"""
+    from app.services.analysis_jobs import main as worker_main
+    worker_main(sys.argv[2:])
+
+def sentiment():
+    """Пересчитать словарные оценки тональности отзывов (аргументы: см. --help)"""
+    from app.services.sentiment import main as sentiment_main
+    sentiment_main(sys.argv[2:])
+
+def promptstats():
+    """Сравнить размер промпта в токенах для разных форматов отзывов (аргументы: см. --help)"""
+    from app.services.prompt_format import main as promptstats_main
+    promptstats_main(sys.argv[2:])
+
 def createsuperuser():
     """Создать суперпользователя (пример для интерактивного скрипта)"""
     subprocess.run([sys.executable, "scripts/create_superuser.py"])
@@ -56,6 +96,14 @@ def help():
   makemigrations— Создать новую миграцию Alembic
   downgrade     — Откатить одну миграцию назад
   test          — Запустить тесты (pytest)
+  seedbench     — Сгенерировать синтетические данные для бенчмарков
+  bench         — Нагрузочный прогон, p50/p95/p99 и RPS в JSON
+  assets        — Собрать статику с хешем в имени и сжатыми копиями (.gz/.br)
+  thumbnails    — Создать миниатюры и WebP-копии для уже загруженных изображений
+  gcuploads     — Удалить неиспользуемые файлы загрузок (--dry-run: только отчёт)
+  worker        — Выполнять задачи ИИ-анализа из очереди (отдельный процесс)
+  sentiment     — Пересчитать оценки тональности и аспектов отзывов (без ИИ)
+  promptstats   — Сколько токенов экономит компактный формат отзывов в промпте
   createsuperuser — Создать суперпользователя (нужен скрипт scripts/create_superuser.py)
   help          — Показать это сообщение
 """)
@@ -67,6 +115,14 @@ COMMANDS = {
     "makemigrations": makemigrations,
     "downgrade": downgrade,
     "test": test,
+    "seedbench": seedbench,
+    "bench": bench,
+    "assets": assets,
+    "thumbnails": thumbnails,
+    "gcuploads": gcuploads,
+    "worker": worker,
+    "sentiment": sentiment,
+    "promptstats": promptstats,
     "createsuperuser": createsuperuser,
     "help": help,
 }
@@ -0,0 +1,88 @@
+"""
+Локальный OpenAI-совместимый сервер с внедрением сбоев для тестов.
+
+    with AIStub([Fault(429, retry_after="1"), Fault(delay=2.0), Fault()]) as stub:
+        settings.OPENAI_API_BASE = stub.base_url
+
+Each POST /chat/completions consumes the next Fault from the script; when
+the script is exhausted the last one repeats. A Fault with status 200
+answers with a chat completion whose content is ``reply``.
+"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+@dataclass
+class Fault:
+    status: int = 200
+    delay: float = 0.0
+    retry_after: Optional[str] = None
+    reply: str = "ok"
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class AIStub:
+    def __init__(self, script: Optional[List[Fault]] = None):
+        self.script = list(script or [Fault()])
+        self.requests: List[dict] = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def next_fault(self, body: dict) -> Fault:
+        with self._lock:
+            self.requests.append(body)
+            return self.script.pop(0) if len(self.script) > 1 else self.script[0]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                fault = stub.next_fault(body)
+                if fault.delay:
+                    time.sleep(fault.delay)
+                if fault.status == 200:
+                    payload = {
+                        "choices": [{"message": {"role": "assistant", "content": fault.reply}}],
+                        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+                    }
+                else:
+                    payload = {"error": {"message": f"injected {fault.status}"}}
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(fault.status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    if fault.retry_after is not None:
+                        self.send_header("Retry-After", fault.retry_after)
+                    for name, value in fault.headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass # the client gave up (timeout or cancelled hedge)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "AIStub":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
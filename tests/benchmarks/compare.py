@@ -0,0 +1,53 @@
+"""
+Сравнение двух прогонов бенчмарка.
+
+    python -m tests.benchmarks.compare baseline.json current.json --threshold 10
+
+Exits with code 1 when p95 latency of any scenario regressed by more than
+--threshold percent (or throughput dropped by more than that).
+"""
+
+import argparse
+import json
+import sys
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    regressions = []
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if not old:
+            continue
+        p95_delta = (new["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+        rps_delta = (new["throughput_rps"] - old["throughput_rps"]) / old["throughput_rps"] * 100 if old["throughput_rps"] else 0.0
+        print(
+            f"{name:20} p50 {old['p50_ms']:>9.2f} -> {new['p50_ms']:>9.2f} ms | "
+            f"p95 {old['p95_ms']:>9.2f} -> {new['p95_ms']:>9.2f} ms ({p95_delta:+.1f}%) | "
+            f"rps {old['throughput_rps']:>8.2f} -> {new['throughput_rps']:>8.2f} ({rps_delta:+.1f}%)"
+        )
+        if p95_delta > threshold or rps_delta < -threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression, percent")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    with open(args.current, encoding="utf-8") as fh:
+        current = json.load(fh)
+
+    print(f"baseline {baseline['meta'].get('commit')}  vs  current {current['meta'].get('commit')}")
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
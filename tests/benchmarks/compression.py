@@ -0,0 +1,75 @@
+"""
+Байты на проводе против CPU для сжатия JSON-страниц.
+
+Compresses representative payloads (an /analyze/data page with long review
+texts, a /dashboard/data page and an import result) with gzip and brotli at
+several levels and prints size, ratio and compression time per payload.
+
+    python -m tests.benchmarks.compression --rows 100 --text-words 300
+"""
+
+import argparse
+import gzip
+import json
+import random
+import timeit
+
+from app.core.middleware.compression_middleware import MAX_BROTLI_QUALITY, MAX_GZIP_LEVEL
+from app.core.responses import dumps
+from tests.benchmarks.serialization import product_page, review_page
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVELS = (1, 4, MAX_GZIP_LEVEL, 9)
+BROTLI_QUALITIES = (1, 4, MAX_BROTLI_QUALITY, 11)
+
+
+def import_result(rows: int, text_words: int, rng: random.Random) -> dict:
+    page = review_page(rows, text_words, rng)
+    return {"status": "ok", "items": page["items"], "success_count": rows, "total_rows": rows, "empty_rows": 0, "errors": [], "total": rows}
+
+
+def measure(body: bytes, number: int) -> list:
+    codecs = [(f"gzip-{level}", lambda data, level=level: gzip.compress(data, compresslevel=level, mtime=0)) for level in GZIP_LEVELS]
+    if brotli is not None:
+        codecs += [(f"br-{quality}", lambda data, quality=quality: brotli.compress(data, quality=quality)) for quality in BROTLI_QUALITIES]
+
+    results = []
+    for name, compress in codecs:
+        size = len(compress(body))
+        seconds = min(timeit.repeat(lambda: compress(body), number=number, repeat=3)) / number
+        results.append({
+            "codec": name,
+            "bytes": size,
+            "ratio": round(size / len(body), 4),
+            "compress_ms": round(seconds * 1000, 3),
+            "mb_per_s": round(len(body) / seconds / 1e6, 1) if seconds else None,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure compressed size vs CPU time for JSON pages")
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--text-words", type=int, default=300)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    payloads = {
+        "analyze_data": review_page(args.rows, args.text_words, rng),
+        "dashboard_data": product_page(args.rows, rng),
+        "import_result": import_result(args.rows * 10, args.text_words, rng),
+    }
+    report = {}
+    for name, payload in payloads.items():
+        body = dumps(payload)
+        report[name] = {"raw_bytes": len(body), "codecs": measure(body, args.number)}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Генератор синтетических данных для нагрузочных тестов.
+
+Writes users, brands, categories, promts, products and reviews straight into
+the database configured by SYNC_DATABASE_URL using Core bulk inserts (and
+COPY FROM STDIN on PostgreSQL), so millions of reviews take minutes, not hours.
+The output is deterministic for a given --seed.
+
+    python -m tests.benchmarks.datagen --users 10 --products-per-user 200 --reviews-per-product 500
+"""
+
+import argparse
+import csv
+import io
+import json
+import random
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, Iterator, List
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.engine import Engine
+
+from app.database.base import Base
+from app.models import Brand, Category, Product, Promt, Review, User
+from app.utils.security import hash_password
+
+BENCH_PASSWORD = "bench-password"
+BATCH_SIZE = 10_000
+
+WORDS = (
+    "отличный хороший плохой ужасный удобный качество цена доставка батарея экран "
+    "звук камера корпус быстро медленно рекомендую возврат брак гарантия упаковка "
+    "great good bad terrible battery screen price delivery quality fast slow cheap "
+    "works broke recommend refund support size weight color design comfortable"
+).split()
+SOURCES = ("ozon", "wildberries", "yandex_market", "amazon", "site", "email")
+
+
+@dataclass
+class Scale:
+    users: int = 5
+    brands: int = 50
+    categories: int = 30
+    promts: int = 5
+    products_per_user: int = 100
+    reviews_per_product: int = 200
+    seed: int = 42
+
+
+@dataclass
+class SeedResult:
+    users: List[str]
+    password: str
+    product_ids: List[int]
+    products_by_user: Dict[str, List[int]]
+    rows: Dict[str, int]
+    seconds: float
+
+
+def _next_id(conn, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _sentence(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def _bulk_insert(conn, model, rows: Iterable[Dict]) -> int:
+    """Вставляет строки пачками; на PostgreSQL через COPY."""
+    table = model.__table__
+    total = 0
+    batch: List[Dict] = []
+    use_copy = conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2"
+
+    def flush():
+        nonlocal total
+        if not batch:
+            return
+        if use_copy:
+            columns = list(batch[0].keys())
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in batch:
+                writer.writerow(["\\N" if row[c] is None else row[c] for c in columns])
+            buffer.seek(0)
+            cursor = conn.connection.dbapi_connection.cursor()
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+            cursor.close()
+        else:
+            conn.execute(insert(table), batch)
+        total += len(batch)
+        batch.clear()
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    flush()
+    return total
+
+
+def _fix_sequences(conn) -> None:
+    if conn.dialect.name != "postgresql":
+        return
+    for model in (User, Brand, Category, Promt, Product, Review):
+        name = model.__tablename__
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), COALESCE((SELECT MAX(id) FROM {name}), 1))"
+        ))
+
+
+def _review_rows(rng: random.Random, product_owner: Dict[int, int], per_product: int, start_id: int) -> Iterator[Dict]:
+    review_id = start_id
+    for product_id, user_id in product_owner.items():
+        for _ in range(per_product):
+            max_rating = 5.0
+            rating = float(rng.randint(1, 5))
+            yield {
+                "id": review_id,
+                "product_id": product_id,
+                "user_id": user_id,
+                "importance": rng.randint(1, 100),
+                "source": rng.choice(SOURCES),
+                "text": _sentence(rng, 8, 80),
+                "advantages": _sentence(rng, 0, 12) or None,
+                "disadvantages": _sentence(rng, 0, 12) or None,
+                "raw_rating": f"{rating:g}/{max_rating:g}",
+                "rating": rating,
+                "max_rating": max_rating,
+                "normalized_rating": round(rating / max_rating * 100),
+            }
+            review_id += 1
+
+
+def seed(engine: Engine, scale: Scale) -> SeedResult:
+    started_at = time.perf_counter()
+    rng = random.Random(scale.seed)
+    Base.metadata.create_all(bind=engine)
+    hashed = hash_password(BENCH_PASSWORD) # Хешируем один раз — argon2 медленный
+    rows: Dict[str, int] = {}
+
+    with engine.begin() as conn:
+        run_tag = f"{scale.seed}_{_next_id(conn, User)}"
+        user_start = _next_id(conn, User)
+        usernames = [f"bench_{run_tag}_{i}" for i in range(scale.users)]
+        user_ids = list(range(user_start, user_start + scale.users))
+        rows["users"] = _bulk_insert(conn, User, (
+            {"id": uid, "username": name, "hashed_password": hashed, "is_superuser": False}
+            for uid, name in zip(user_ids, usernames)
+        ))
+
+        directories = {}
+        for model, count in ((Brand, scale.brands), (Category, scale.categories), (Promt, scale.promts)):
+            start = _next_id(conn, model)
+            items = [
+                {"id": start + i, "name": f"{model.__name__} {i}", "description": _sentence(rng, 3, 10), "user_id": user_ids[i % len(user_ids)]}
+                for i in range(count)
+            ]
+            rows[model.__tablename__] = _bulk_insert(conn, model, items)
+            directories[model] = [item["id"] for item in items]
+
+        product_start = _next_id(conn, Product)
+        product_owner: Dict[int, int] = {}
+        products = []
+        for n in range(scale.users * scale.products_per_user):
+            product_id = product_start + n
+            user_id = user_ids[n % len(user_ids)]
+            product_owner[product_id] = user_id
+            products.append({
+                "id": product_id,
+                "name": f"Product {n} {rng.choice(WORDS)}",
+                "description": _sentence(rng, 5, 30),
+                "ean": f"{rng.randrange(10**12, 10**13)}",
+                "upc": f"{rng.randrange(10**11, 10**12)}",
+                "user_id": user_id,
+                "brand_id": rng.choice(directories[Brand]) if directories[Brand] else None,
+                "category_id": rng.choice(directories[Category]) if directories[Category] else None,
+                "promt_id": rng.choice(directories[Promt]) if directories[Promt] else None,
+                "analysis_result": None,
+            })
+        rows["products"] = _bulk_insert(conn, Product, products)
+
+        rows["reviews"] = _bulk_insert(
+            conn, Review, _review_rows(rng, product_owner, scale.reviews_per_product, _next_id(conn, Review))
+        )
+        _fix_sequences(conn)
+
+    return SeedResult(
+        users=usernames,
+        password=BENCH_PASSWORD,
+        product_ids=list(product_owner.keys()),
+        products_by_user={
+            name: [pid for pid, owner in product_owner.items() if owner == uid]
+            for uid, name in zip(user_ids, usernames)
+        },
+        rows=rows,
+        seconds=round(time.perf_counter() - started_at, 3),
+    )
+
+
+def reviews_csv(count: int, seed: int = 0) -> bytes:
+    """CSV-файл отзывов в формате импортёра (для /parse-reviews-file)."""
+    rng = random.Random(seed)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["importance", "source", "text", "advantages", "disadvantages", "raw_rating"])
+    for _ in range(count):
+        writer.writerow([
+            rng.randint(1, 100), rng.choice(SOURCES), _sentence(rng, 8, 80),
+            _sentence(rng, 1, 12), _sentence(rng, 1, 12), f"{rng.randint(1, 5)}/5",
+        ])
+    return buffer.getvalue().encode()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic benchmark data")
+    for field, default in asdict(Scale()).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, default=default)
+    parser.add_argument("--output", help="Write the seed summary (users, product ids) to this JSON file")
+    args = parser.parse_args(argv)
+
+    from app.database.sync_session import engine
+
+    scale = Scale(**{field: getattr(args, field) for field in asdict(Scale())})
+    result = seed(engine, scale)
+    summary = json.dumps(asdict(result), ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(summary)
+    print(json.dumps({"rows": result.rows, "seconds": result.seconds}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Нагрузочный прогон горячих эндпоинтов с фиксированной конкуренцией.
+
+Drives /dashboard/data, /analyze/data, /parse-reviews-file/{id} and
+/analyze/{id} (against the stub LLM) and prints p50/p95/p99 latency and
+throughput per scenario as JSON, ready for ``compare.py``. /analyze/{id}
+only queues a job, so that scenario times the whole round trip: submit,
+then long-poll GET /analyze/jobs/{job_id} until the job is done or failed.
+
+    python -m tests.benchmarks.datagen --output bench_seed.json
+    python -m tests.benchmarks.run --seed-file bench_seed.json --concurrency 16 --requests 500 --output bench.json
+
+Without --base-url the app is driven in-process through ASGITransport and
+the analysis runner is started here (the app's lifespan does not run);
+--local-ai answers with the built-in local provider instead of the stub
+LLM. With --base-url it hits a running server, which must run analysis
+workers itself (start the stub LLM for it separately, and lower
+ANALYSIS_WAIT_INTERVAL there so the long-poll does not round latencies up
+to whole seconds).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from tests.benchmarks.datagen import reviews_csv
+
+CSRF_TOKEN = "bench-csrf-token"
+JOB_WAIT = 30 # seconds per long-poll request, the most GET /analyze/jobs/{id} allows
+BENCH_WAIT_INTERVAL = 0.02 # in-process job status polling, fine enough not to skew latencies
+
+
+@dataclass
+class Context:
+    product_ids: List[int]
+    rng: random.Random
+    upload_rows: int
+    upload_body: bytes = b""
+
+
+@dataclass
+class ScenarioResult:
+    requests: int = 0
+    errors: int = 0
+    latencies: List[float] = field(default_factory=list)
+    wall_seconds: float = 0.0
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "throughput_rps": round(self.requests / self.wall_seconds, 2) if self.wall_seconds else 0.0,
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+            "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        }
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+# --- Scenarios ---
+
+async def dashboard_data(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    page = ctx.rng.randint(1, 5)
+    return await client.get("/dashboard/data", params={"page": page, "limit": 100, "sort_by": "name"})
+
+
+async def analyze_data(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    product_id = ctx.rng.choice(ctx.product_ids)
+    return await client.get("/analyze/data", params={"product_id": product_id, "page": 1, "limit": 100})
+
+
+async def parse_reviews_file(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    product_id = ctx.rng.choice(ctx.product_ids)
+    files = {"file": ("bench.csv", ctx.upload_body, "text/csv")}
+    return await client.post(f"/parse-reviews-file/{product_id}", files=files)
+
+
+async def analyze_llm(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    product_id = ctx.rng.choice(ctx.product_ids)
+    response = await client.post(f"/analyze/{product_id}", json={"promt_id": None})
+    if response.status_code != 202:
+        return response
+    job_id = response.json()["job_id"]
+    while True:
+        response = await client.get(f"/analyze/jobs/{job_id}", params={"wait": JOB_WAIT})
+        if response.status_code >= 400:
+            return response
+        job = response.json()
+        if job["status"] == "done":
+            return response
+        if job["status"] == "failed":
+            # The poll itself succeeded; the analysis did not
+            return httpx.Response(500, json=job, request=response.request)
+
+
+SCENARIOS: Dict[str, Callable[[httpx.AsyncClient, Context], Awaitable[httpx.Response]]] = {
+    "dashboard_data": dashboard_data,
+    "analyze_data": analyze_data,
+    "parse_reviews_file": parse_reviews_file,
+    "analyze_llm": analyze_llm,
+}
+
+
+# --- Driver ---
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> None:
+    client.cookies.set("csrf_token", CSRF_TOKEN)
+    client.headers["X-CSRF-Token"] = CSRF_TOKEN
+    response = await client.post("/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    client.cookies.set("access_token", response.cookies["access_token"])
+
+
+async def run_scenario(make_client, username: str, password: str, scenario, ctx: Context, concurrency: int, total: int, timeout: float) -> ScenarioResult:
+    result = ScenarioResult()
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        async with make_client(timeout) as client:
+            await login(client, username, password)
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    response = await scenario(client, ctx)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                result.latencies.append(time.perf_counter() - start)
+                result.requests += 1
+                result.errors += int(failed)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.wall_seconds = time.perf_counter() - started_at
+    return result
+
+
+def start_stub_llm(port: int, latency: float) -> str:
+    import uvicorn
+    from tests.benchmarks.stub_llm import create_stub_app
+
+    config = uvicorn.Config(create_stub_app(latency), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+async def main_async(args) -> Dict:
+    with open(args.seed_file, encoding="utf-8") as fh:
+        seed = json.load(fh)
+    username, password = seed["users"][0], seed["password"]
+
+    if args.base_url:
+        def make_client(timeout):
+            return httpx.AsyncClient(base_url=args.base_url, timeout=timeout)
+    else:
+        from app.core import settings
+        from app.main import app
+
+        from app.services.analysis_jobs import runner as analysis_runner
+
+        if "analyze_llm" in args.scenarios:
+            if args.local_ai:
+                settings.AI_PROVIDER = "local"
+                settings.AI_LOCAL_LATENCY = args.stub_latency
+            else:
+                settings.AI_PROVIDER = "openai"
+                settings.OPENAI_API_BASES = []
+                settings.OPENAI_API_BASE = start_stub_llm(args.stub_port, args.stub_latency)
+                settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "stub"
+            settings.ANALYSIS_WAIT_INTERVAL = BENCH_WAIT_INTERVAL
+            # Normally started by the app's lifespan, which ASGITransport does not run
+            await analysis_runner.start(max(args.concurrency, settings.ANALYSIS_WORKERS), settings.ANALYSIS_POLL_INTERVAL)
+
+        def make_client(timeout):
+            return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=timeout)
+
+    # Only products of the logged-in user are visible to it
+    ctx = Context(product_ids=seed["products_by_user"][username], rng=random.Random(args.seed), upload_rows=args.upload_rows)
+    ctx.upload_body = reviews_csv(args.upload_rows, seed=args.seed)
+
+    results = {}
+    try:
+        for name in args.scenarios:
+            scenario = SCENARIOS[name]
+            if args.warmup:
+                await run_scenario(make_client, username, password, scenario, ctx, 1, args.warmup, args.timeout)
+            outcome = await run_scenario(make_client, username, password, scenario, ctx, args.concurrency, args.requests, args.timeout)
+            results[name] = outcome.summary()
+            print(f"{name}: {results[name]}")
+    finally:
+        if not args.base_url:
+            await analysis_runner.stop()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "target": args.base_url or "in-process",
+            "ai": "local" if args.local_ai else "stub",
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "upload_rows": args.upload_rows,
+            "seed_rows": seed.get("rows"),
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hot endpoints")
+    parser.add_argument("--seed-file", required=True, help="JSON written by tests.benchmarks.datagen --output")
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--upload-rows", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument("--stub-latency", type=float, default=0.2)
+    parser.add_argument("--local-ai", action="store_true", help="In-process: answer /analyze with AI_PROVIDER=local instead of the stub LLM")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write results JSON to this file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(main_async(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
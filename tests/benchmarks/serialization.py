@@ -0,0 +1,83 @@
+"""
+Время сериализации одной страницы data-эндпоинтов.
+
+Compares FastAPI's default path (jsonable_encoder + JSONResponse) with
+FastJSONResponse on synthetic pages shaped like /analyze/data and
+/dashboard/data output.
+
+    python -m tests.benchmarks.serialization --rows 100 --text-words 300
+"""
+
+import argparse
+import json
+import random
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core import responses
+from app.core.responses import FastJSONResponse
+from tests.benchmarks.datagen import SOURCES, WORDS
+
+
+def review_page(rows: int, text_words: int, rng: random.Random) -> dict:
+    items = [{
+        "id": i,
+        "product_id": 1,
+        "user_id": 1,
+        "importance": rng.randint(1, 100),
+        "source": rng.choice(SOURCES),
+        "text": " ".join(rng.choices(WORDS, k=text_words)),
+        "advantages": " ".join(rng.choices(WORDS, k=20)),
+        "disadvantages": " ".join(rng.choices(WORDS, k=20)),
+        "raw_rating": "4/5",
+        "rating": 4.0,
+        "max_rating": 5.0,
+        "normalized_rating": 80,
+    } for i in range(rows)]
+    return {"items": items, "total": rows * 10, "page": 1, "limit": rows, "total_pages": 10}
+
+
+def product_page(rows: int, rng: random.Random) -> dict:
+    items = [{
+        "id": i, "name": f"Product {i}", "description": " ".join(rng.choices(WORDS, k=30)),
+        "ean": "4600000000000", "upc": "000000000000", "user_id": 1,
+        "brand_id": 1, "category_id": 2, "promt_id": None,
+        "brand": {"id": 1, "name": "Brand"}, "category": {"id": 2, "name": "Category"}, "promt": None,
+        "analysis_result": None, "main_image_filename": f"{i:032x}.png",
+    } for i in range(rows)]
+    return {"items": items, "total": rows * 10, "page": 1, "limit": rows, "total_pages": 10, "sort_by": "id", "sort_dir": "asc"}
+
+
+def measure(page: dict, number: int) -> dict:
+    default_path = lambda: JSONResponse(jsonable_encoder(page)).body
+    fast_path = lambda: FastJSONResponse(page).body
+    default_ms = min(timeit.repeat(default_path, number=number, repeat=5)) / number * 1000
+    fast_ms = min(timeit.repeat(fast_path, number=number, repeat=5)) / number * 1000
+    return {
+        "bytes": len(fast_path()),
+        "default_ms_per_page": round(default_ms, 4),
+        "fast_ms_per_page": round(fast_ms, 4),
+        "speedup": round(default_ms / fast_ms, 2) if fast_ms else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure JSON serialization time per page")
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--text-words", type=int, default=300, help="Words per review text")
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    report = {
+        "encoder": "orjson" if responses.orjson is not None else "json",
+        "analyze_data": measure(review_page(args.rows, args.text_words, rng), args.number),
+        "dashboard_data": measure(product_page(args.rows, rng), args.number),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
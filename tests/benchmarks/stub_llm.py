@@ -0,0 +1,60 @@
+"""
+Локальная заглушка OpenAI-совместимого API для бенчмарков.
+
+Answers POST /chat/completions with a canned completion after a configurable
+delay, so /analyze/{id} can be load-tested without network calls or costs.
+
+    python -m tests.benchmarks.stub_llm --port 8100 --latency 0.3
+    OPENAI_API_BASE=http://127.0.0.1:8100 OPENAI_API_KEY=stub python manage.py prod
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
+
+
+def create_stub_app(latency: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Stub LLM")
+    app.state.latency = latency
+    app.state.calls = 0
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        app.state.calls += 1
+        if app.state.latency:
+            await asyncio.sleep(app.state.latency)
+        prompt = "".join(m.get("content", "") for m in payload.get("messages", []))
+        prompt_tokens = max(1, len(prompt) // 4)
+        content = f"Итоговый анализ (stub): {prompt.count(chr(10))} строк в запросе."
+        return {
+            "id": f"stub-{app.state.calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+            },
+        }
+
+    return app
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial delay per completion, seconds")
+    args = parser.parse_args(argv)
+    uvicorn.run(create_stub_app(args.latency), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,9 @@ logger = logging.getLogger(__name__)
 
 import pytest_asyncio
 
+# SQLite-backed fixtures for service and route tests: engine, db, user, other_user, product, app_client
+from tests.fixtures import app_client, db, engine, other_user, product, session_factory, user  # noqa: F401
+
 @pytest_asyncio.fixture
 async def test_client_without_csrf():
     transport = ASGITransport(app=app)
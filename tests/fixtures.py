@@ -0,0 +1,84 @@
+"""
+Общие фикстуры для тестов на SQLite: база, сессия, пользователи, товар и
+HTTP-клиент приложения, вошедший под пользователем.
+
+Each test gets its own database file, so code that opens sessions of its
+own (the analysis runner) sees the test's commits. ``app_client`` drives
+the real app through ASGITransport: the test session goes into
+scope["state"]["db"], which DatabaseMiddleware and get_db use as is, and
+the client sends a real access token plus a matching CSRF cookie/header.
+"""
+
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database.base import Base
+from app.models import Product, User
+from app.utils.security import create_jwt_token
+
+CSRF_TOKEN = "test-csrf-token"
+
+
+@pytest_asyncio.fixture(loop_scope="function")
+async def engine(tmp_path_factory):
+    # Not in tmp_path: tests that scan their tmp_path for files must not see the database
+    path = tmp_path_factory.mktemp("db") / "test.db"
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture(loop_scope="function")
+async def session_factory(engine):
+    # Same as AsyncSessionLocal: objects stay readable after commit
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture(loop_scope="function")
+async def db(session_factory):
+    async with session_factory() as session:
+        yield session
+
+
+async def create_user(db, username: str, is_superuser: bool = False) -> User:
+    user = User(username=username, hashed_password="x", is_superuser=is_superuser)
+    db.add(user)
+    await db.commit()
+    return user
+
+
+@pytest_asyncio.fixture(loop_scope="function")
+async def user(db):
+    return await create_user(db, "owner")
+
+
+@pytest_asyncio.fixture(loop_scope="function")
+async def other_user(db):
+    return await create_user(db, "other")
+
+
+@pytest_asyncio.fixture(loop_scope="function")
+async def product(db, user):
+    product = Product(name="Товар", user_id=user.id)
+    db.add(product)
+    await db.commit()
+    return product
+
+
+@pytest_asyncio.fixture(loop_scope="function")
+async def app_client(db, user):
+    from app.main import app
+
+    async def with_test_session(scope, receive, send):
+        if scope["type"] == "http":
+            scope["state"] = {"db": db}
+        await app(scope, receive, send)
+
+    async with AsyncClient(transport=ASGITransport(app=with_test_session), base_url="http://test") as client:
+        client.cookies.set("access_token", create_jwt_token({"sub": str(user.id)}))
+        client.cookies.set("csrf_token", CSRF_TOKEN)
+        client.headers["X-CSRF-Token"] = CSRF_TOKEN
+        yield client
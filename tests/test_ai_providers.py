@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import settings
+from app.services import openai_service
+from app.services.ai_providers import LocalProvider, OpenAICompatibleProvider, ProviderRouter, build_router
+from app.utils.resilience import CircuitBreaker, CircuitOpenError
+from app.utils.throttling import RateLimiter
+from tests.ai_stub import AIStub, Fault
+
+
+def provider(base_url="http://a", weight=1.0):
+    return OpenAICompatibleProvider(base_url, "test", "model", weight, CircuitBreaker(1, 60, name=base_url))
+
+
+@pytest.fixture
+def ai(monkeypatch):
+    monkeypatch.setattr(settings, "AI_PROVIDER", "openai")
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(settings, "OPENAI_TIMEOUT", 0.5)
+    monkeypatch.setattr(settings, "OPENAI_RETRY_ATTEMPTS", 2)
+    monkeypatch.setattr(settings, "OPENAI_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(settings, "OPENAI_HEDGE_DELAY", 0)
+    monkeypatch.setattr(openai_service, "limiter", RateLimiter(name="test"))
+    monkeypatch.setattr(openai_service, "router", None)
+    return monkeypatch
+
+
+def analyze(text="отзыв"):
+    return asyncio.run(openai_service.analyze_reviews([text], db=None))
+
+
+def test_weighted_routing_follows_weights():
+    heavy, light = provider("http://heavy", 3), provider("http://light", 1)
+    router = ProviderRouter([heavy, light], rng=iter([i / 100 for i in range(100)]).__next__)
+
+    picks = [router.pick() for _ in range(100)]
+
+    assert picks.count(heavy) == 75 and picks.count(light) == 25
+
+
+def test_latency_routing_measures_then_prefers_the_fastest():
+    slow, fast = provider("http://slow"), provider("http://fast")
+    router = ProviderRouter([slow, fast], ProviderRouter.LATENCY)
+
+    assert router.pick() is slow # not measured yet
+    slow.observe(0.8)
+    assert router.pick() is fast
+    fast.observe(0.1)
+    assert router.pick() is fast
+    assert router.pick(exclude={fast}) is slow # a retry tries the other endpoint
+
+
+def test_endpoints_with_an_open_circuit_are_skipped():
+    down, up = provider("http://down"), provider("http://up")
+    down.breaker.record_failure()
+    router = ProviderRouter([down, up], rng=lambda: 0.0)
+
+    assert router.pick() is up
+    up.breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        router.pick()
+
+
+def test_retry_fails_over_to_another_endpoint(ai):
+    with AIStub([Fault(503)]) as broken, AIStub([Fault(reply="с резервного")]) as spare:
+        openai_service.router = ProviderRouter([provider(broken.base_url), provider(spare.base_url)], rng=lambda: 0.0)
+
+        assert analyze("a") == "с резервного"
+        # The broken endpoint's circuit is open now: the next call goes straight to the spare one
+        assert analyze("b") == "с резервного"
+
+    assert len(broken.requests) == 1 and len(spare.requests) == 2
+
+
+def test_build_router_from_settings(ai):
+    ai.setattr(settings, "OPENAI_API_BASES", ["http://a/v1/", "http://b/v1"])
+    ai.setattr(settings, "OPENAI_API_WEIGHTS", [2])
+    ai.setattr(settings, "AI_ROUTING", "latency")
+
+    router = build_router()
+
+    assert [(p.base_url, p.weight) for p in router.providers] == [("http://a/v1", 2), ("http://b/v1", 1.0)]
+    assert router.strategy == ProviderRouter.LATENCY
+    ai.setattr(settings, "AI_ROUTING", "fastest")
+    with pytest.raises(ValueError):
+        build_router()
+
+
+def test_local_provider_is_deterministic_and_needs_no_key(ai):
+    ai.setattr(settings, "AI_PROVIDER", "local")
+    ai.setattr(settings, "OPENAI_API_KEY", "")
+
+    async def scenario():
+        reviews = ["Отличный товар", "Плохая упаковка", "Нормально"]
+        return [await openai_service.analyze_reviews(reviews, db=None) for _ in range(2)]
+
+    first, second = asyncio.run(scenario())
+
+    assert first == second
+    assert "Всего отзывов: 3" in first and "Позитивных: 1" in first and "Негативных: 1" in first
+    assert isinstance(openai_service.router.providers[0], LocalProvider)
+
+
+def test_client_errors_are_not_failed_over(ai):
+    with AIStub([Fault(400)]) as stub:
+        openai_service.router = ProviderRouter([provider(stub.base_url)])
+        with pytest.raises(HTTPException) as error:
+            analyze()
+    assert error.value.status_code == 400 and len(stub.requests) == 1
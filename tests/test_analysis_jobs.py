@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.core import settings
+from app.models import AnalysisJob, Product, Review
+from app.models.analysis_job import utcnow
+from app.services import analysis_jobs
+from app.utils.query_params import AnalyzeFilters
+
+
+@pytest.fixture(autouse=True)
+def stub_analysis(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "") # analyze_reviews answers with its stub text
+
+
+@pytest_asyncio.fixture(loop_scope="function")
+async def reviews(db, user, product):
+    db.add_all([Review(product_id=product.id, user_id=user.id, text=f"review {i}", importance=i) for i in (1, 2)])
+    await db.commit()
+
+
+async def wait_until_finished(session_factory, job_id, timeout=5.0):
+    async with session_factory() as db:
+        return await analysis_jobs.wait_for_job(db, job_id, timeout, interval=0.05)
+
+
+async def test_runner_stores_result_on_job_and_product(session_factory, db, user, product, reviews):
+    runner = analysis_jobs.AnalysisRunner(session_factory)
+    await runner.start(workers=2, poll_interval=60)
+    try:
+        job = await analysis_jobs.submit_job(db, product, user, AnalyzeFilters(importance=2))
+        await db.commit()
+        runner.enqueue(job.id)
+        finished = await wait_until_finished(session_factory, job.id)
+    finally:
+        await runner.stop()
+    async with session_factory() as check:
+        stored = await check.scalar(select(Product.analysis_result).where(Product.id == product.id))
+        history = await analysis_jobs.job_history(check, product.id)
+
+    assert (finished.status, finished.attempts, finished.filters["importance"]) == ("done", 1, 2)
+    assert finished.result and stored == finished.result
+    assert [job.id for job in history] == [finished.id]
+
+
+async def test_poll_picks_up_queued_and_stale_jobs(session_factory, db, user, product, reviews):
+    queued = AnalysisJob(product_id=product.id, user_id=user.id, filters={})
+    stale = AnalysisJob(product_id=product.id, user_id=user.id, filters={}, status="running", attempts=1,
+                        started_at=utcnow() - timedelta(hours=2))
+    exhausted = AnalysisJob(product_id=product.id, user_id=user.id, filters={}, status="running",
+                            attempts=settings.ANALYSIS_MAX_ATTEMPTS, started_at=utcnow() - timedelta(hours=2))
+    db.add_all([queued, stale, exhausted])
+    await db.commit()
+
+    # A restarted process: nothing was enqueued in memory, the poll finds the work
+    runner = analysis_jobs.AnalysisRunner(session_factory)
+    await runner.start(workers=1, poll_interval=0.05)
+    try:
+        results = [await wait_until_finished(session_factory, job.id) for job in (queued, stale, exhausted)]
+    finally:
+        await runner.stop()
+
+    assert [(job.status, job.attempts) for job in results] == [("done", 1), ("done", 2), ("failed", settings.ANALYSIS_MAX_ATTEMPTS)]
+
+
+async def test_job_is_claimed_once(session_factory, db, user, product):
+    job = await analysis_jobs.submit_job(db, product, user, AnalyzeFilters())
+    await db.commit()
+    async with session_factory() as first, session_factory() as second:
+        claims = [await analysis_jobs.claim_job(first, job.id), await analysis_jobs.claim_job(second, job.id)]
+    # Shutdown puts jobs in progress back in the queue
+    runner = analysis_jobs.AnalysisRunner(session_factory)
+    await runner.start(workers=1, poll_interval=60)
+    runner.running.add(job.id)
+    await runner.stop()
+    async with session_factory() as check:
+        status = await check.scalar(select(AnalysisJob.status).where(AnalysisJob.id == job.id))
+
+    assert (claims, status) == ([True, False], "queued")
+
+
+async def test_job_routes_queue_report_and_check_the_owner(app_client, db, other_user, product):
+    foreign = Product(name="Чужой товар", user_id=other_user.id)
+    db.add(foreign)
+    await db.commit()
+
+    queued = await app_client.post(f"/analyze/{product.id}", json={})
+    assert queued.status_code == 202 and queued.json()["status"] == "queued"
+    job = await app_client.get(f"/analyze/jobs/{queued.json()['job_id']}")
+    assert job.status_code == 200 and job.json()["product_id"] == product.id
+    history = await app_client.get(f"/analyze/{product.id}/jobs")
+    assert [item["id"] for item in history.json()["items"]] == [queued.json()["job_id"]]
+
+    assert (await app_client.post("/analyze/999999", json={})).status_code == 404
+    assert (await app_client.get("/analyze/jobs/999999")).status_code == 404
+    assert (await app_client.post(f"/analyze/{foreign.id}", json={})).status_code == 403
+    assert (await app_client.get(f"/analyze/{foreign.id}/jobs")).status_code == 403
+    foreign_job = AnalysisJob(product_id=foreign.id, user_id=other_user.id, filters={})
+    db.add(foreign_job)
+    await db.commit()
+    assert (await app_client.get(f"/analyze/jobs/{foreign_job.id}")).status_code == 403
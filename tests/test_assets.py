@@ -0,0 +1,34 @@
+import gzip
+import json
+import os
+
+from app.core.assets import BUILD_DIR, MANIFEST_NAME, build_assets
+from app.core.static_files import choose_encoding
+
+
+def test_build_assets_hashes_compresses_and_rewrites_css(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "images").mkdir()
+    (tmp_path / "uploads").mkdir()
+    (tmp_path / "images" / "logo.png").write_bytes(b"\x89PNG" + b"\x00" * 64)
+    (tmp_path / "css" / "main.css").write_text("body { background: url('../images/logo.png'); }\n" * 40)
+    (tmp_path / "uploads" / "user.png").write_bytes(b"skip me")
+
+    build_assets(str(tmp_path))
+    manifest = json.loads((tmp_path / BUILD_DIR / MANIFEST_NAME).read_text())
+
+    assert set(manifest) == {"css/main.css", "images/logo.png"}
+    css_path = tmp_path / manifest["css/main.css"]
+    hashed_logo = os.path.basename(manifest["images/logo.png"])
+    css = css_path.read_text()
+    assert f"url('../images/{hashed_logo}')" in css
+    assert gzip.decompress((tmp_path / f"{manifest['css/main.css']}.gz").read_bytes()).decode() == css
+    assert not (tmp_path / f"{manifest['images/logo.png']}.gz").exists()
+
+
+def test_choose_encoding_respects_quality():
+    assert choose_encoding("gzip, br", ("br", "gzip")) == "br"
+    assert choose_encoding("gzip;q=1.0, br;q=0.5", ("br", "gzip")) == "gzip"
+    assert choose_encoding("br;q=0, identity", ("br", "gzip")) is None
+    assert choose_encoding("*", ("gzip",)) == "gzip"
+    assert choose_encoding(None, ("br", "gzip")) is None
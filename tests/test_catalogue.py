@@ -0,0 +1,119 @@
+import io
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from app.core import settings
+from app.models import Brand, Category, Product
+from app.services.catalogue import CATALOGUE_FIELDS, import_catalogue, iter_catalogue_rows
+from app.utils.export_writers import EXPORT_FORMATS, WRITERS
+
+CSV = (
+    "Name,Description,EAN,UPC,Brand,Category\n"
+    "Чайник,Стальной,4006381333931,,Bosch,Кухня\n"
+    "Тостер,,,012345678905,bosch,кухня\n"
+    "Миксер,,,,Philips,Кухня\n"
+    ",без имени,,,,\n"
+).encode("utf-8")
+
+
+@pytest_asyncio.fixture(loop_scope="function")
+async def bosch(db, user):
+    db.add(Brand(name="Bosch", user_id=user.id))
+    await db.commit()
+
+
+async def export(db, user_id, export_format):
+    rows = iter_catalogue_rows(db, user_id, chunk_size=2)
+    return b"".join([chunk async for chunk in WRITERS[export_format](CATALOGUE_FIELDS, rows)])
+
+
+async def test_import_resolves_directories_once_and_reports_bad_rows(db, user, bosch):
+    report = await import_catalogue(db, io.BytesIO(CSV), "catalogue.csv", user.id, batch_size=2)
+    await db.commit()
+    brands = sorted((await db.execute(select(Brand.name))).scalars().all())
+    categories = (await db.execute(select(Category.name))).scalars().all()
+    products = (await db.execute(select(Product.name, Product.brand_id).order_by(Product.id))).all()
+
+    assert (report.total_rows, report.created, report.updated, report.skipped) == (4, 3, 0, 1)
+    assert "Строка #5" in report.errors[0]
+    # "bosch" matches the existing "Bosch", "кухня" the "Кухня" created for the first row
+    assert brands == ["Bosch", "Philips"] and categories == ["Кухня"]
+    assert (report.brands_created, report.categories_created) == (1, 1)
+    assert products[0][1] == products[1][1]
+
+
+async def test_reimport_updates_by_ean_and_upc(db, user, bosch):
+    update = (
+        "name,ean,upc,brand\n"
+        "Чайник 2,4006381333931,,\n"
+        ",,012345678905,Philips\n"
+    ).encode("utf-8")
+
+    await import_catalogue(db, io.BytesIO(CSV), "catalogue.csv", user.id)
+    report = await import_catalogue(db, io.BytesIO(update), "update.csv", user.id)
+    await db.commit()
+    products = (await db.execute(
+        select(Product.name, Product.description, Brand.name).join(Brand).order_by(Product.id)
+    )).all()
+
+    assert (report.created, report.updated) == (0, 2)
+    # empty cells keep the stored values
+    assert products[0] == ("Чайник 2", "Стальной", "Bosch")
+    assert products[1] == ("Тостер", "", "Philips")
+
+
+@pytest.mark.parametrize("export_format", list(EXPORT_FORMATS))
+async def test_export_round_trips_through_import(db, user, bosch, export_format):
+    await import_catalogue(db, io.BytesIO(CSV), "catalogue.csv", user.id)
+    body = await export(db, user.id, export_format)
+    report = await import_catalogue(db, io.BytesIO(body), f"catalogue.{export_format}", user.id)
+    count = await db.scalar(select(func.count(Product.id)))
+
+    # Rows with a barcode are matched by it, the one without (Миксер) by name
+    assert (report.total_rows, report.updated, report.created, report.skipped) == (3, 3, 0, 0)
+    assert count == 3
+    if export_format == "csv":
+        assert body.decode("utf-8-sig").splitlines()[1] == "Чайник,Стальной,4006381333931,,Bosch,Кухня"
+
+
+async def test_rows_without_barcode_match_by_name_and_ambiguous_names_are_reported(db, user):
+    rows = (
+        "name,description\n"
+        "MIXER,Новый\n"
+        "Блендер,Без кода\n"
+        "Блендер,Повтор\n"
+    ).encode("utf-8")
+
+    db.add_all([
+        Product(name="Mixer", user_id=user.id),
+        Product(name="Блендер", user_id=user.id),
+        Product(name="Блендер", user_id=user.id),
+    ])
+    await db.commit()
+    report = await import_catalogue(db, io.BytesIO(rows), "rows.csv", user.id)
+    await db.commit()
+    mixer = await db.scalar(select(Product.description).where(Product.name == "MIXER"))
+    count = await db.scalar(select(func.count(Product.id)))
+
+    assert (report.updated, report.created, report.skipped) == (1, 0, 2)
+    assert mixer == "Новый" and count == 3
+    assert "несколько товаров" in report.errors[0]
+
+
+async def test_import_and_export_routes_work_on_the_users_own_catalogue(app_client, db, other_user, monkeypatch):
+    db.add(Product(name="Чужой товар", user_id=other_user.id))
+    await db.commit()
+
+    imported = await app_client.post("/product/import", files={"file": ("catalogue.csv", CSV, "text/csv")})
+    assert imported.status_code == 200
+    assert (imported.json()["created"], imported.json()["skipped"]) == (3, 1)
+
+    exported = await app_client.get("/product/export", params={"format": "csv"})
+    assert exported.status_code == 200
+    assert "Чужой" not in exported.text and exported.text.count("\r\n") == 4 # header and the three imported
+
+    assert (await app_client.post("/product/import", files={"file": ("catalogue.pdf", b"x", "application/pdf")})).status_code == 400
+    monkeypatch.setattr(settings, "MAX_IMPORT_SIZE", len(CSV) - 1)
+    assert (await app_client.post("/product/import", files={"file": ("catalogue.csv", CSV, "text/csv")})).status_code == 413
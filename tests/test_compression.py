@@ -0,0 +1,98 @@
+import asyncio
+import gzip
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app.core.middleware.compression_middleware import MAX_GZIP_LEVEL, CompressionMiddleware
+
+BIG = {"items": [{"text": "отзыв " * 50, "id": i} for i in range(100)]}
+
+
+async def big_json(request):
+    return JSONResponse(BIG)
+
+
+async def small_json(request):
+    return JSONResponse({"ok": True})
+
+
+async def png(request):
+    return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+
+async def precompressed(request):
+    return Response(gzip.compress(b"x" * 5000), media_type="text/css", headers={"Content-Encoding": "gzip"})
+
+
+async def html(request):
+    return Response("<p>отзыв</p>" * 500, media_type="text/html")
+
+
+async def stream(request):
+    async def chunks():
+        for i in range(50):
+            yield f"{i},{'row ' * 40}\n"
+    return StreamingResponse(chunks(), media_type="text/csv")
+
+
+def make_client():
+    app = Starlette(routes=[
+        Route("/big", big_json), Route("/small", small_json), Route("/png", png),
+        Route("/pre", precompressed), Route("/stream", stream), Route("/html", html),
+    ])
+    app.add_middleware(CompressionMiddleware, minimum_size=500, gzip_level=9)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_compresses_large_json_and_skips_the_rest():
+    async def scenario():
+        async with make_client() as client:
+            headers = {"Accept-Encoding": "gzip"}
+            big = await client.get("/big", headers=headers)
+            small = await client.get("/small", headers=headers)
+            image = await client.get("/png", headers=headers)
+            plain = await client.get("/big", headers={"Accept-Encoding": "identity"})
+            page = await client.get("/html", headers=headers)
+            return big, small, image, plain, page
+
+    big, small, image, plain, page = run(scenario())
+    assert big.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in big.headers["vary"].lower()
+    assert int(big.headers["content-length"]) < len(plain.content)
+    assert big.json() == BIG
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in image.headers
+    assert "content-encoding" not in plain.headers
+    assert "content-encoding" not in page.headers # pages with CSRF tokens are never compressed (BREACH)
+
+
+def test_precompressed_response_passes_through():
+    async def scenario():
+        async with make_client() as client:
+            return await client.get("/pre", headers={"Accept-Encoding": "gzip"})
+
+    response = run(scenario())
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == b"x" * 5000
+
+
+def test_streaming_body_is_compressed_incrementally():
+    async def scenario():
+        async with make_client() as client:
+            return await client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    response = run(scenario())
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text.count("\n") == 50
+
+
+def test_level_is_capped():
+    assert CompressionMiddleware(None, gzip_level=9).gzip_level == MAX_GZIP_LEVEL
@@ -0,0 +1,68 @@
+from sqlalchemy import event, select
+
+from app.database import crud
+from app.models import Brand
+from app.schemas.brand import BrandCreate, BrandUpdate
+
+
+async def brands(db):
+    return (await db.execute(select(Brand.id, Brand.name, Brand.description, Brand.user_id).order_by(Brand.id))).all()
+
+
+async def test_create_many_returns_ids_in_input_order(db, user):
+    ids = await crud.create_directory_items(db, [BrandCreate(name=f"B{i}") for i in range(2500)], Brand, user)
+    rows = await brands(db)
+
+    assert len(ids) == 2500
+    assert {row.id: row.name for row in rows} == {item_id: f"B{i}" for i, item_id in enumerate(ids)}
+    assert {row.user_id for row in rows} == {user.id}
+
+
+async def test_upsert_by_name_is_scoped_to_the_user(db, user, other_user):
+    [own_id] = await crud.create_directory_items(db, [BrandCreate(name="Bosch", description="old")], Brand, user)
+    [foreign_id] = await crud.create_directory_items(db, [BrandCreate(name="Philips")], Brand, other_user)
+    ids, created, updated = await crud.upsert_directory_items(
+        db,
+        [BrandCreate(name="Philips"), BrandCreate(name="Bosch", description="new"), BrandCreate(name="Philips", description="x")],
+        Brand,
+        user,
+    )
+    rows = await brands(db)
+
+    assert (created, updated) == (1, 1)
+    assert ids[1] == own_id and ids[0] == ids[2] and ids[0] not in (own_id, foreign_id)
+    by_id = {row.id: row for row in rows}
+    assert by_id[own_id].description == "new"
+    assert (by_id[ids[0]].description, by_id[ids[0]].user_id) == ("x", user.id)
+
+
+async def test_delete_many_skips_foreign_items(db, user, other_user):
+    own = await crud.create_directory_items(db, [BrandCreate(name="A"), BrandCreate(name="B")], Brand, user)
+    foreign = await crud.create_directory_items(db, [BrandCreate(name="C")], Brand, other_user)
+    deleted = await crud.delete_directory_items(db, [own[1], foreign[0], 999, own[0]], Brand, user)
+
+    assert deleted == [own[1], own[0]]
+    assert [row.name for row in await brands(db)] == ["C"]
+
+
+def count_statements(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+async def test_update_and_delete_are_one_statement_and_keep_permissions(db, user, other_user):
+    [item_id] = await crud.create_directory_items(db, [BrandCreate(name="A", description="old")], Brand, user)
+    statements = count_statements(db)
+
+    denied = await crud.update_directory_item(db, item_id, BrandUpdate(description="x"), Brand, other_user)
+    updated = await crud.update_directory_item(db, item_id, BrandUpdate(description="new"), Brand, user)
+    update_statements = [s for s in statements if not s.lstrip().upper().startswith(("INSERT INTO DATA_VERSIONS", "SAVEPOINT"))]
+
+    not_deleted = await crud.delete_directory_item(db, item_id, Brand, other_user)
+    deleted = await crud.delete_directory_item(db, item_id, Brand, user)
+
+    assert denied is None and not_deleted is False and deleted is True
+    assert (updated.id, updated.name, updated.description) == (item_id, "A", "new")
+    assert [s.split()[0] for s in update_statements] == ["UPDATE", "UPDATE"]
+    assert await brands(db) == []
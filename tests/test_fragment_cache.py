@@ -0,0 +1,24 @@
+from jinja2 import DictLoader, Environment
+
+from app.templates.fragment_cache import FragmentCacheExtension, fragment_cache
+
+
+def make_env(source: str) -> Environment:
+    return Environment(loader=DictLoader({"page.html": source}), extensions=[FragmentCacheExtension], autoescape=True)
+
+
+def test_fragment_reused_until_key_changes():
+    fragment_cache.clear()
+    template = make_env('{% cache "names", version %}{{ names | join(",") }}{% endcache %}').get_template("page.html")
+    assert template.render(version=1, names=["a"]) == "a"
+    assert template.render(version=1, names=["b"]) == "a"
+    assert template.render(version=2, names=["b"]) == "b"
+
+
+def test_fragment_with_csrf_token_or_undefined_key_is_not_cached():
+    fragment_cache.clear()
+    template = make_env('{% cache "form", version %}<input value="{{ csrf_token }}">{% endcache %}').get_template("page.html")
+    assert "token-one" in template.render(version=1, csrf_token="token-one")
+    assert "token-two" in template.render(version=1, csrf_token="token-two")
+    assert template.render(csrf_token="token-three") == '<input value="token-three">'
+    assert len(fragment_cache) == 0
@@ -0,0 +1,41 @@
+from app.database.versions import bump_version, get_versions_token
+from app.utils.http_cache import etag_matches, make_etag
+
+
+def test_etag_matches_weak_and_lists():
+    etag = make_etag("/dashboard/data", "page=1", 1, False, "products=3")
+    assert etag.startswith('W/"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(etag.removeprefix("W/"), etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches(make_etag("/dashboard/data", "page=1", 1, False, "products=4"), etag)
+
+
+async def test_versions_token_per_scope_and_table(db):
+    assert await get_versions_token(db, [("products", 1)]) == ""
+    await bump_version(db, "products", 1)
+    await bump_version(db, "products", 1)
+    await bump_version(db, "products", 2)
+    await bump_version(db, "brands", None)
+    user_token = await get_versions_token(db, [("products", 1), ("brands", None)])
+    all_token = await get_versions_token(db, [("products", None)])
+    await bump_version(db, "products", 2)
+    after_other = await get_versions_token(db, [("products", 1), ("brands", None)])
+
+    assert user_token == "brands=1;products=2"
+    assert all_token == "products=3"
+    assert after_other == user_token
+
+
+async def test_analyze_data_revalidates_with_etag(app_client, product):
+    first = await app_client.get("/analyze/data", params={"product_id": product.id})
+    assert first.status_code == 200 and first.headers["etag"]
+
+    cached = await app_client.get("/analyze/data", params={"product_id": product.id}, headers={"If-None-Match": first.headers["etag"]})
+    assert cached.status_code == 304
+
+    await app_client.post(f"/api/review/{product.id}/add", json={"text": "новый"})
+    changed = await app_client.get("/analyze/data", params={"product_id": product.id}, headers={"If-None-Match": first.headers["etag"]})
+    assert changed.status_code == 200 and changed.json()["total"] == 1
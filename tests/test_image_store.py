@@ -0,0 +1,40 @@
+import io
+import os
+
+from fastapi import UploadFile
+from sqlalchemy import select
+
+from app.models import ImageBlob
+from app.services.image_store import blob_path, release_image, store_image
+from app.utils.uploads import receive_upload
+
+
+async def test_duplicate_uploads_share_one_blob(tmp_path, db):
+    content = os.urandom(50_000)
+
+    async def upload(name):
+        received = await receive_upload(UploadFile(io.BytesIO(content), filename=name), str(tmp_path))
+        return await store_image(db, received)
+
+    first = await upload("a.png")
+    second = await upload("copy.PNG")
+    counts = [(await db.execute(select(ImageBlob.ref_count))).scalar_one()]
+    await release_image(db, first)
+    counts.append((await db.execute(select(ImageBlob.ref_count))).scalar_one())
+    await release_image(db, second)
+    await release_image(db, "legacy.png")
+    remaining = (await db.execute(select(ImageBlob))).scalars().all()
+
+    assert first == second
+    assert first.startswith("blobs/") and first.endswith(".png")
+    assert counts == [2, 1]
+    assert remaining == []
+    # One file on disk, no temporary leftovers from the duplicate
+    files = [os.path.join(root, name) for root, _, names in os.walk(tmp_path) for name in names]
+    assert files == [str(tmp_path / first)]
+    assert (tmp_path / first).read_bytes() == content
+
+
+def test_blob_path_layout():
+    sha = "ab" + "0" * 62
+    assert blob_path(sha, ".jpg") == f"blobs/ab/{sha}.jpg"
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from app.utils.images import render_variants, variant_path
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def make_image(path, size, mode="RGB"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new(mode, size, (200, 30, 30, 128) if mode == "RGBA" else (200, 30, 30)).save(path)
+
+
+def test_variants_are_resized_and_not_upscaled(tmp_path):
+    make_image(tmp_path / "blobs" / "ab" / "abcdef.jpg", (1000, 500))
+
+    rendered = render_variants(str(tmp_path), "blobs/ab/abcdef.jpg", [320, 2000])
+
+    assert [(width, fmt) for width, fmt, _ in rendered] == [(320, "webp"), (320, "jpeg"), (2000, "webp"), (2000, "jpeg")]
+    sizes = {path: Image.open(tmp_path / path).size for _, _, path in rendered}
+    assert sizes[variant_path("blobs/ab/abcdef.jpg", 320, "webp")] == (320, 160)
+    assert sizes[variant_path("blobs/ab/abcdef.jpg", 2000, "jpeg")] == (1000, 500)
+
+
+def test_transparent_images_keep_png_and_existing_variants_are_reused(tmp_path):
+    make_image(tmp_path / "logo.png", (400, 400), mode="RGBA")
+    first = render_variants(str(tmp_path), "logo.png", [100])
+    inodes = [os.stat(tmp_path / path).st_ino for _, _, path in first]
+
+    second = render_variants(str(tmp_path), "logo.png", [100])
+
+    assert [fmt for _, fmt, _ in first] == ["webp", "png"]
+    assert second == first
+    assert [os.stat(tmp_path / path).st_ino for _, _, path in second] == inodes
+
+
+def test_non_images_are_skipped(tmp_path):
+    (tmp_path / "notes.png").write_bytes(b"not an image")
+    assert render_variants(str(tmp_path), "notes.png", [320]) == []
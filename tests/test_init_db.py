@@ -0,0 +1,36 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app.database.init_db import add_missing_columns
+
+
+def test_add_missing_columns_upgrades_an_existing_reviews_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        # reviews as created before the sentiment columns existed
+        conn.execute(text("CREATE TABLE reviews (id INTEGER PRIMARY KEY, text TEXT, product_id INTEGER, user_id INTEGER)"))
+        conn.execute(text("INSERT INTO reviews (id, text, product_id, user_id) VALUES (1, 'Отлично', 1, 1)"))
+
+    added = add_missing_columns(engine)
+    assert added == ["reviews.sentiment", "reviews.sentiment_advantages", "reviews.sentiment_disadvantages", "reviews.aspects"]
+
+    inspector = inspect(engine)
+    assert {"sentiment", "aspects"} <= {column["name"] for column in inspector.get_columns("reviews")}
+    assert "ix_reviews_sentiment" in {index["name"] for index in inspector.get_indexes("reviews")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT text, sentiment FROM reviews")).one() == ("Отлично", None)
+
+    assert add_missing_columns(engine) == [] # idempotent
+
+
+def test_add_missing_columns_skips_tables_that_do_not_exist(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    assert add_missing_columns(engine) == []
+
+
+def test_add_missing_columns_adds_the_promt_review_format(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE promts (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, description TEXT, user_id INTEGER)"))
+
+    assert add_missing_columns(engine) == ["promts.review_format"]
+    assert "review_format" in {column["name"] for column in inspect(engine).get_columns("promts")}
@@ -0,0 +1,51 @@
+from app.core.metrics import Counter, Gauge, Histogram, Registry, merge_snapshots, render
+
+
+def make_registry():
+    registry = Registry()
+    requests = Counter("t_requests_total", "Requests.", ("route",), registry=registry)
+    in_flight = Gauge("t_in_flight", "In flight.", registry=registry)
+    latency = Histogram("t_latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+    return registry, requests, in_flight, latency
+
+
+def test_render_exposition_format():
+    registry, requests, in_flight, latency = make_registry()
+    requests.labels("dashboard_data").inc()
+    requests.labels(route="dashboard_data").inc(2)
+    in_flight.inc()
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = render(registry.snapshot())
+    assert "# TYPE t_requests_total counter" in text
+    assert 't_requests_total{route="dashboard_data"} 3' in text
+    assert "t_in_flight 1" in text
+    assert 't_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 't_latency_seconds_bucket{le="1"} 2' in text
+    assert 't_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "t_latency_seconds_count 3" in text
+
+
+def test_merge_sums_counters_and_skips_dead_gauges():
+    registry_a, requests_a, in_flight_a, latency_a = make_registry()
+    registry_b, requests_b, in_flight_b, latency_b = make_registry()
+    requests_a.labels("x").inc(2)
+    requests_b.labels("x").inc(3)
+    in_flight_a.set(4)
+    in_flight_b.set(7)
+    latency_a.observe(0.5)
+    latency_b.observe(0.5)
+
+    merged = merge_snapshots([(registry_a.snapshot(), True), (registry_b.snapshot(), False)])
+    text = render(merged)
+    assert 't_requests_total{route="x"} 5' in text
+    assert "t_in_flight 4" in text
+    assert "t_latency_seconds_count 2" in text
+
+
+def test_label_values_are_escaped():
+    registry, requests, _, _ = make_registry()
+    requests.labels('a"b\\c').inc()
+    assert 't_requests_total{route="a\\"b\\\\c"} 1' in render(registry.snapshot())
@@ -0,0 +1,51 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.future import select
+
+from app.database.base import Base
+from app.core import settings
+from app.models import Brand, Category, ImageVariant, Product, ProductImage, Promt, User
+
+
+def test_row_to_dict_matches_to_dict():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="projection", hashed_password="x")
+        session.add(user)
+        session.flush()
+        brand = Brand(name="Brand", user_id=user.id)
+        category = Category(name="Category", user_id=user.id)
+        promt = Promt(name="Promt", user_id=user.id)
+        session.add_all([brand, category, promt])
+        session.flush()
+        full = Product(name="Full", description="d", ean="1", upc="2", user_id=user.id,
+                       brand_id=brand.id, category_id=category.id, promt_id=promt.id, analysis_result="ok")
+        bare = Product(name="Bare", user_id=user.id)
+        dangling = Product(name="Dangling", user_id=user.id, brand_id=999)
+        session.add_all([full, bare, dangling])
+        session.flush()
+        session.add_all([
+            ProductImage(product_id=full.id, user_id=user.id, image_path="gallery.png", is_main=False),
+            ProductImage(product_id=full.id, user_id=user.id, image_path="main.png", is_main=True, variants=[
+                ImageVariant(width=settings.IMAGE_THUMBNAIL_WIDTH, format="webp", path="main-thumb.webp"),
+                ImageVariant(width=settings.IMAGE_THUMBNAIL_WIDTH, format="png", path="main-thumb.png"),
+                ImageVariant(width=9999, format="png", path="main-large.png"),
+            ]),
+            ProductImage(product_id=full.id, user_id=user.id, image_path="second_main.png", is_main=True),
+        ])
+        session.commit()
+        session.expunge_all()
+
+        rows = session.execute(Product.list_select().order_by(Product.id)).all()
+        products = session.execute(
+            select(Product)
+            .options(selectinload(Product.brand), selectinload(Product.category),
+                     selectinload(Product.promt), selectinload(Product.images))
+            .order_by(Product.id)
+        ).scalars().all()
+
+        assert [Product.row_to_dict(row) for row in rows] == [p.to_dict() for p in products]
+        assert Product.row_to_dict(rows[0])["main_image_filename"] == "main.png"
+        assert Product.row_to_dict(rows[0])["main_thumbnail_filename"] == "main-thumb.png"
+        assert Product.row_to_dict(rows[0])["main_thumbnail_webp_filename"] == "main-thumb.webp"
@@ -0,0 +1,57 @@
+import time
+
+from app.core.profiling import SamplingProfiler, parse_collapsed, render_collapsed
+
+
+def busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_sampling_profiler_collects_collapsed_stacks():
+    profiler = SamplingProfiler(interval=0.001).start()
+    busy_wait(0.05)
+    profiler.stop()
+
+    assert profiler.samples > 0
+    stacks = parse_collapsed(profiler.collapsed())
+    assert sum(stacks.values()) == profiler.samples
+    assert any("busy_wait" in stack for stack in stacks)
+
+
+def test_collapsed_round_trip():
+    text = render_collapsed(parse_collapsed("a;b 3\na;c 1\na;b 2\n"))
+    assert parse_collapsed(text) == {"a;b": 5, "a;c": 1}
+
+
+async def test_explicit_profile_is_for_superusers_only():
+    from types import SimpleNamespace
+
+    import httpx
+    from starlette.applications import Starlette
+    from starlette.responses import StreamingResponse
+    from starlette.routing import Route
+
+    from app.core.middleware.profiling_middleware import ProfilingMiddleware
+
+    async def export(request):
+        # What get_current_user does for an authenticated request
+        request.state.user = SimpleNamespace(is_superuser=request.query_params.get("root") == "1")
+
+        async def rows():
+            for i in range(3):
+                yield f"{i}\n"
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    app = Starlette(routes=[Route("/export", export)])
+    app.add_middleware(ProfilingMiddleware)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        anonymous = await client.get("/export", headers={"X-Profile": "1"})
+        client.cookies.set("access_token", "t")
+        user = await client.get("/export", headers={"X-Profile": "1"})
+        root = await client.get("/export?root=1", headers={"X-Profile": "1"})
+
+    assert anonymous.text == user.text == "0\n1\n2\n"
+    assert "x-profile-samples" not in user.headers
+    assert "x-profile-samples" in root.headers and root.text != "0\n1\n2\n"
@@ -0,0 +1,72 @@
+import asyncio
+
+from app.core import settings
+from app.services import openai_service
+from app.services.ai_providers import Completion
+from app.services.prompt_format import format_reviews, legacy_row, measure, resolve_format
+
+REVIEWS = [
+    {"importance": None, "source": None, "text": "Отличный   товар,\n рекомендую", "advantages": "Цена | качество", "disadvantages": None, "rating": 90},
+    {"importance": None, "source": None, "text": "Сломался", "advantages": None, "disadvantages": "Брак", "rating": None},
+    {"importance": None, "source": None, "text": "Нормально", "advantages": None, "disadvantages": None, "rating": 60.0},
+]
+
+
+def test_legacy_matches_the_old_dict_rows():
+    assert format_reviews(REVIEWS, "legacy").legend == ""
+    assert legacy_row(REVIEWS[1]) == str({
+        "importance": 100, "source": "неизвестно", "text": "Сломался",
+        "advantages": "", "disadvantages": "Брак", "rating": "нет оценки",
+    })
+
+
+def test_table_has_one_header_and_drops_empty_fields():
+    formatted = format_reviews(REVIEWS, "table")
+
+    assert "оценка|отзыв|плюсы|минусы." in formatted.legend
+    assert "важность" not in formatted.legend and "источник" not in formatted.legend
+    assert formatted.rows == [
+        "90|Отличный товар, рекомендую|Цена / качество",
+        "|Сломался||Брак",
+        "60|Нормально",
+    ]
+    assert format_reviews(REVIEWS, "tsv").rows[1] == "\tСломался\t\tБрак"
+
+
+def test_constant_columns_go_to_the_legend():
+    reviews = [dict(r, source="Ozon") for r in REVIEWS]
+    formatted = format_reviews(reviews, "table")
+    assert "У всех отзывов: источник Ozon." in formatted.legend
+    assert all("Ozon" not in row for row in formatted.rows)
+
+
+def test_compact_formats_save_tokens():
+    tokens = measure(REVIEWS * 20)
+    assert tokens["table"] < tokens["legacy"] * 0.6
+    assert tokens["tsv"] <= tokens["table"] * 1.1
+
+
+def test_format_per_prompt_falls_back_to_settings(monkeypatch):
+    monkeypatch.setattr(settings, "AI_PROMPT_FORMAT", "tsv")
+    assert resolve_format("legacy") == "legacy"
+    assert resolve_format(None) == "tsv"
+    monkeypatch.setattr(settings, "AI_PROMPT_FORMAT", "bogus")
+    assert resolve_format("bogus") == "table"
+
+
+def test_prompt_sent_to_the_provider(monkeypatch):
+    prompts = []
+
+    async def fake_complete(prompt, model):
+        prompts.append(prompt)
+        return Completion("ok", "test", model)
+
+    monkeypatch.setattr(settings, "AI_PROVIDER", "local")
+    monkeypatch.setattr(settings, "AI_PROMPT_FORMAT", "table")
+    monkeypatch.setattr(openai_service, "_complete", fake_complete)
+
+    asyncio.run(openai_service.analyze_reviews(REVIEWS, db=None))
+
+    title, legend, caption, *rows = prompts[0].split("\n")
+    assert title == "Проанализируй отзывы" and legend.startswith("Формат:")
+    assert caption == openai_service.REVIEWS_CAPTION and len(rows) == 3
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import settings
+from app.services import openai_service
+from app.utils.resilience import CircuitBreaker, parse_retry_after
+from app.utils.throttling import RateLimiter
+from tests.ai_stub import AIStub, Fault
+
+
+@pytest.fixture
+def ai(monkeypatch):
+    """analyze_reviews против локального заглушечного сервера, с быстрыми повторами."""
+    monkeypatch.setattr(settings, "AI_PROVIDER", "openai")
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(settings, "OPENAI_API_BASES", [])
+    monkeypatch.setattr(settings, "OPENAI_TIMEOUT", 0.5)
+    monkeypatch.setattr(settings, "OPENAI_RETRY_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "OPENAI_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(settings, "OPENAI_HEDGE_DELAY", 0)
+    monkeypatch.setattr(settings, "OPENAI_BREAKER_THRESHOLD", 4)
+    monkeypatch.setattr(settings, "OPENAI_BREAKER_RESET", 0.2)
+    monkeypatch.setattr(openai_service, "router", None)
+    monkeypatch.setattr(openai_service, "limiter", RateLimiter(name="test"))
+
+    def start(*script):
+        stub = AIStub(list(script)).__enter__()
+        monkeypatch.setattr(settings, "OPENAI_API_BASE", stub.base_url)
+        openai_service.router = None # rebuilt for the new endpoint, with a fresh breaker
+        stubs.append(stub)
+        return stub
+
+    stubs = []
+    yield start
+    for stub in stubs:
+        stub.__exit__()
+
+
+def analyze(text="отзыв"):
+    return asyncio.run(openai_service.analyze_reviews([text], db=None))
+
+
+def test_retries_transient_errors_honouring_retry_after(ai):
+    stub = ai(Fault(429, retry_after="0"), Fault(503), Fault(reply="готово"))
+
+    assert analyze() == "готово"
+    assert len(stub.requests) == 3
+
+
+def test_gives_up_after_attempts_and_does_not_retry_client_errors(ai):
+    stub = ai(Fault(500))
+    with pytest.raises(HTTPException) as error:
+        analyze("a")
+    assert error.value.status_code == 500 and len(stub.requests) == 3
+
+    stub.script = [Fault(400)]
+    with pytest.raises(HTTPException) as error:
+        analyze("b")
+    assert error.value.status_code == 400 and len(stub.requests) == 4
+
+
+def test_timeouts_are_retried_then_reported_as_504(ai):
+    stub = ai(Fault(delay=1.0))
+    with pytest.raises(HTTPException) as error:
+        analyze()
+    assert error.value.status_code == 504 and len(stub.requests) == 3
+
+
+def test_circuit_breaker_fails_fast_and_recovers(ai, monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_RETRY_ATTEMPTS", 1)
+    stub = ai(Fault(502))
+    for text in "abcd":
+        with pytest.raises(HTTPException):
+            analyze(text)
+
+    started = time.perf_counter()
+    with pytest.raises(HTTPException) as error:
+        analyze("e")
+    assert error.value.status_code == 503 and time.perf_counter() - started < 0.1
+    assert len(stub.requests) == 4 # the open circuit sent nothing
+
+    time.sleep(0.25)
+    stub.script = [Fault(reply="снова работает")]
+    assert analyze("f") == "снова работает"
+    assert openai_service.router.providers[0].breaker.state == CircuitBreaker.CLOSED
+
+
+def test_hedged_request_wins_over_slow_one(ai, monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_TIMEOUT", 5.0)
+    monkeypatch.setattr(settings, "OPENAI_HEDGE_DELAY", 0.1)
+    stub = ai(Fault(delay=2.0, reply="slow"), Fault(reply="fast"))
+
+    started = time.perf_counter()
+    assert analyze() == "fast"
+    assert time.perf_counter() - started < 1.0 and len(stub.requests) == 2
+
+
+def test_parse_retry_after():
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(format_datetime(now + timedelta(seconds=30), usegmt=True), now=now) == 30.0
+    assert parse_retry_after("soon") is None and parse_retry_after(None) is None
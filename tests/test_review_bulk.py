@@ -0,0 +1,95 @@
+import pytest
+import pytest_asyncio
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from app.database.versions import get_versions_token
+from app.models import Product, Review
+from app.schemas.review import ReviewBulkSelection, ReviewBulkUpdate, ReviewFilters
+from app.services.review_service import bulk_delete_reviews, bulk_update_reviews, review_filter_conditions
+
+
+@pytest_asyncio.fixture(loop_scope="function")
+async def reviews(db, user, other_user, product):
+    db.add_all([
+        Review(product_id=product.id, user_id=user.id, source="shop", text="good", normalized_rating=90),
+        Review(product_id=product.id, user_id=user.id, source="shop", text="bad", normalized_rating=10),
+        Review(product_id=product.id, user_id=user.id, source="forum", text="bad too", normalized_rating=20),
+        Review(product_id=product.id, user_id=other_user.id, source="shop", text="bad", normalized_rating=10),
+    ])
+    await db.commit()
+
+
+async def test_bulk_update_by_filter_is_scoped_to_user(db, user, product, reviews):
+    filters = ReviewFilters(source="shop", normalized_rating_max=50)
+    updated = await bulk_update_reviews(db, product.id, user.id, {"importance": 5}, filters=filters)
+    rows = (await db.execute(select(Review.user_id, Review.text, Review.importance).order_by(Review.id))).all()
+
+    assert updated == 1
+    assert [row.importance for row in rows] == [None, 5, None, None]
+    assert await get_versions_token(db, [("reviews", product.id)]) == "reviews=1"
+
+
+async def test_bulk_delete_by_ids_and_filter_intersection(db, user, product, reviews):
+    ids = (await db.execute(select(Review.id).order_by(Review.id))).scalars().all()
+    deleted = await bulk_delete_reviews(db, product.id, user.id, ids=ids, filters=ReviewFilters(text="bad"))
+    remaining = (await db.execute(select(Review.text).order_by(Review.id))).scalars().all()
+    nothing = await bulk_delete_reviews(db, product.id, user.id, ids=[])
+
+    assert (deleted, nothing) == (2, 0)
+    assert remaining == ["good", "bad"] # the other user's review is out of scope
+    assert await get_versions_token(db, [("reviews", product.id)]) == "reviews=1"
+
+
+async def test_bulk_routes_update_and_delete_the_selection(app_client, db, other_user, product, reviews):
+    updated = await app_client.post("/api/review/bulk/update", json={
+        "product_id": product.id, "filters": {"source": "forum"}, "values": {"importance": 7},
+    })
+    assert updated.status_code == 200 and updated.json()["updated"] == 1
+
+    everything = await app_client.post("/api/review/bulk/delete", json={"product_id": product.id, "filters": {}})
+    assert everything.status_code == 422 # an empty selection no longer means "all reviews"
+
+    deleted = await app_client.post("/api/review/bulk/delete", json={"product_id": product.id, "all": True})
+    assert deleted.status_code == 200 and deleted.json()["deleted"] == 3
+    assert (await db.execute(select(Review.user_id))).scalars().all() == [other_user.id] # not theirs to delete
+
+
+async def test_bulk_routes_check_the_product(app_client, db, other_user):
+    foreign = Product(name="Чужой товар", user_id=other_user.id)
+    db.add(foreign)
+    await db.commit()
+
+    for path, extra in [("/api/review/bulk/update", {"values": {"importance": 1}}), ("/api/review/bulk/delete", {})]:
+        missing = await app_client.post(path, json={"product_id": 999999, "all": True, **extra})
+        denied = await app_client.post(path, json={"product_id": foreign.id, "all": True, **extra})
+        assert (missing.status_code, denied.status_code) == (404, 403)
+
+
+def test_bulk_requests_need_a_selection_and_values():
+    with pytest.raises(ValidationError):
+        ReviewBulkSelection(product_id=1)
+    with pytest.raises(ValidationError):
+        ReviewBulkUpdate(product_id=1, ids=[1], values={})
+    assert ReviewBulkUpdate(product_id=1, ids=[1], values={"source": None}).values.model_fields_set == {"source"}
+
+
+@pytest.mark.parametrize("selection", [
+    {"filters": {}},
+    {"ids": []},
+    {"ids": [], "filters": {"text": "", "normalized_rating_min": 0}},
+    {"all": True, "ids": [1]},
+])
+def test_empty_selections_are_rejected(selection):
+    # {"filters": {}} used to select every review of the product
+    with pytest.raises(ValidationError):
+        ReviewBulkSelection(product_id=1, **selection)
+
+
+def test_everything_needs_all_and_active_matches_review_filter_conditions():
+    assert ReviewBulkSelection(product_id=1, all=True).all
+    assert ReviewBulkSelection(product_id=1, filters={"sentiment_max": 0}).filters.active
+    for field, value in [("importance", 2), ("source", "ozon"), ("normalized_rating_max", 40), ("sentiment_min", -1.0)]:
+        filters = ReviewFilters(**{field: value})
+        assert filters.active == bool(review_filter_conditions(filters))
+    assert not ReviewFilters().active and not review_filter_conditions(ReviewFilters())
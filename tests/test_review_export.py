@@ -0,0 +1,67 @@
+import io
+
+import openpyxl
+import pytest
+import pytest_asyncio
+
+from app.models import Product, Review
+from app.schemas.review import ReviewFilters
+from app.services.review_export import EXPORT_FIELDS, iter_review_rows
+from app.utils.export_writers import EXPORT_FORMATS, WRITERS
+from app.utils.parsers import _parse_and_process_content_sync
+
+REVIEWS = [
+    dict(importance=3, source="shop", text='Текст, с "кавычками"\nи переносом', advantages="быстро",
+         disadvantages=None, raw_rating="4.5/5", rating=4.5, max_rating=5.0, normalized_rating=90),
+    dict(importance=None, source="forum", text='=HYPERLINK("http://evil","plain")', advantages="-5% к цене", disadvantages="дорого",
+         raw_rating="2/10", rating=2.0, max_rating=10.0, normalized_rating=20),
+]
+
+
+@pytest_asyncio.fixture(loop_scope="function")
+async def reviews(db, user, product):
+    db.add_all([Review(product_id=product.id, user_id=user.id, **review) for review in REVIEWS])
+    await db.commit()
+
+
+async def export(db, product, user, export_format, filters=None):
+    rows = iter_review_rows(db, product.id, user.id, filters, chunk_size=1)
+    return b"".join([chunk async for chunk in WRITERS[export_format](EXPORT_FIELDS, rows)])
+
+
+@pytest.mark.parametrize("export_format", list(EXPORT_FORMATS))
+async def test_export_round_trips_through_importer(db, user, product, reviews, export_format):
+    body = await export(db, product, user, export_format)
+
+    parsed = _parse_and_process_content_sync(body, f"reviews.{EXPORT_FORMATS[export_format][1]}")
+
+    assert parsed["errors"] == []
+    assert parsed["reviews"] == REVIEWS
+
+
+async def test_export_applies_filters(db, user, product, reviews):
+    body = await export(db, product, user, "ndjson", filters=ReviewFilters(source="forum"))
+    assert body.count(b"\n") == 1 and b'"forum"' in body
+
+
+async def test_formula_like_cells_are_not_formulas(db, user, product, reviews):
+    csv_body = (await export(db, product, user, "csv")).decode("utf-8-sig")
+    assert "'=HYPERLINK" in csv_body and "'-5% к цене" in csv_body
+
+    sheet = openpyxl.load_workbook(io.BytesIO(await export(db, product, user, "xlsx"))).active
+    cell = next(c for row in sheet.iter_rows() for c in row if c.value == '=HYPERLINK("http://evil","plain")')
+    assert cell.data_type == "s"
+
+
+async def test_export_route_checks_product_and_owner(app_client, db, other_user, product, reviews):
+    response = await app_client.get(f"/api/review/export/{product.id}", params={"format": "csv", "source": "shop"})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith('.csv"')
+    assert response.content.decode("utf-8-sig").count("\r\n") == 2 # header and the one "shop" review
+
+    foreign = Product(name="Чужой", user_id=other_user.id)
+    db.add(foreign)
+    await db.commit()
+    assert (await app_client.get(f"/api/review/export/{foreign.id}")).status_code == 403
+    assert (await app_client.get("/api/review/export/999999")).status_code == 404
+    assert (await app_client.get(f"/api/review/export/{product.id}", params={"format": "pdf"})).status_code == 422
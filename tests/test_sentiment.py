@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import select
+
+from app.models import Review
+from app.schemas.review import ReviewFilters
+from app.services.review_service import add_review, bulk_update_reviews, review_filter_conditions
+from app.services.sentiment import rescore_reviews, score_review, stem, trie_regex
+
+
+def test_stemmer_strips_one_ending():
+    assert stem("Отличные") == stem("отличный") == "отличн"
+    assert stem("сломался") == "сломал"
+    assert stem("Ёлка") == "елк"
+    assert stem("recommended") == "recommend"
+    assert stem("мал") == "мал" # never shorter than three letters
+
+
+def test_trie_regex_prefers_the_longest_stem():
+    import re
+
+    pattern = re.compile(trie_regex(["плох", "плохо", "брак", "бра"]))
+    assert pattern.fullmatch("плохо") and pattern.fullmatch("бра")
+    assert pattern.match("браковано").group() == "брак"
+
+
+def test_negation_and_intensifiers():
+    plain = score_review("хороший товар", None, None).sentiment
+    assert score_review("очень хороший товар", None, None).sentiment > plain > 0
+    assert score_review("не очень хороший товар", None, None).sentiment < 0
+    assert score_review("not bad at all", None, None).sentiment > 0
+    assert score_review("Нормально", None, None).sentiment == 0
+    assert score_review(None, "", None).sentiment is None
+
+
+def test_advantages_and_disadvantages_are_scored_separately():
+    score = score_review("Пришёл вовремя.", "Цена, быстрая доставка", "Недостатков нет")
+    assert score.advantages > 0 and score.disadvantages is None
+    assert set(score.aspects) == {"доставка", "цена"} and min(score.aspects.values()) > 0
+
+    score = score_review("", "Удобный", "нет")
+    assert score.advantages > 0 and score.disadvantages is None and score.sentiment > 0
+
+    score = score_review("Качество отличное. Упаковка порвалась", None, "Доставка")
+    assert score.aspects["качество"] > 0 and score.aspects["упаковка"] < 0 and score.aspects["доставка"] < 0
+    assert score.disadvantages < 0
+
+
+def test_aspects_take_their_clause_score():
+    # Praise for the price must not spill over onto the delivery complaint
+    score = score_review("Цена хорошая, доставка задержалась", None, None)
+    assert score.aspects["цена"] > 0 and score.aspects["доставка"] < 0
+
+    score = score_review("Курьер опоздал, но товар отличный", None, None)
+    assert score.aspects["доставка"] < 0 and score.sentiment > 0
+    assert score_review("Доставку задержали", None, None).sentiment < 0
+    assert score_review("Качество хорошее а упаковка порвалась", None, None).aspects["качество"] > 0
+
+
+async def test_scores_are_stored_and_filterable(db, user, product):
+    for text in ("Отличный товар, рекомендую", "Ужасно, брак", "Обычный"):
+        await add_review(db, product.id, user.id, {"text": text})
+    await db.flush()
+
+    positive = ReviewFilters(sentiment_min=0.2)
+    rows = (await db.execute(
+        select(Review.text).where(*review_filter_conditions(positive)).order_by(Review.sentiment.desc())
+    )).scalars().all()
+
+    await bulk_update_reviews(db, product.id, user.id, {"text": "плохо"}, filters=ReviewFilters(text="Отличный"))
+    after = (await db.execute(select(Review.sentiment).order_by(Review.id))).scalars().all()
+
+    assert rows == ["Отличный товар, рекомендую"]
+    assert after[0] < 0 and after[1] < 0 and after[2] == 0
+
+
+async def test_rescore_reviews_in_batches(db, user, product):
+    db.add_all([Review(product_id=product.id, user_id=user.id, text=f"хороший {i}") for i in range(5)])
+    await db.flush()
+    scored = await rescore_reviews(db, [Review.product_id == product.id], batch_size=2)
+    values = (await db.execute(select(Review.sentiment))).scalars().all()
+
+    assert scored == 5 and all(value == pytest.approx(0.5) for value in values)
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core import settings
+from app.services import openai_service
+from app.services.ai_providers import Completion
+from app.utils.throttling import RateLimiter, SingleFlight, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_per_minute():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock) # 1 per second
+
+    bucket.take(60)
+    assert bucket.delay(3) == pytest.approx(3.0)
+    clock.now = 2.0
+    assert bucket.delay(3) == pytest.approx(1.0)
+    # Actual usage above the estimate is charged afterwards
+    bucket.adjust(2)
+    assert bucket.delay(1) == pytest.approx(1.0)
+    assert TokenBucket(0, clock).delay(10**6) == 0
+
+
+def test_rate_limiter_queues_instead_of_failing():
+    async def scenario():
+        limiter = RateLimiter(tpm=600) # 10 tokens per second
+        await limiter.acquire(600)
+        started = time.perf_counter()
+        waits = await asyncio.gather(limiter.acquire(2), limiter.acquire(2))
+        return waits, time.perf_counter() - started
+
+    waits, elapsed = asyncio.run(scenario())
+
+    # FIFO: the second call waits for the first one's tokens too
+    assert 0.15 < waits[0] < 0.35 and 0.35 < waits[1] < 0.6
+    assert elapsed < 0.7
+
+
+def test_single_flight_shares_one_call():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def scenario():
+        flight = SingleFlight("test")
+        cancelled = asyncio.ensure_future(flight.do("key", call))
+        others = [asyncio.ensure_future(flight.do("key", call)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        cancelled.cancel() # one caller gives up, the shared call goes on
+        results = await asyncio.gather(*others)
+        again = await flight.do("key", call)
+        return results, again, flight.in_flight
+
+    results, again, in_flight = asyncio.run(scenario())
+
+    assert results == ["result"] * 3 and again == "result"
+    assert len(calls) == 2 and in_flight == 0
+
+
+def test_analyze_reviews_coalesces_identical_prompts(monkeypatch):
+    prompts = []
+
+    async def fake_complete(prompt, model):
+        prompts.append(prompt)
+        await asyncio.sleep(0.05)
+        return Completion(f"analysis of {len(prompt)} chars", "test", model)
+
+    monkeypatch.setattr(settings, "AI_PROVIDER", "openai")
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(openai_service, "_complete", fake_complete)
+
+    async def scenario():
+        same = [openai_service.analyze_reviews(["a", "b"], db=None) for _ in range(3)]
+        return await asyncio.gather(*same, openai_service.analyze_reviews(["c"], db=None))
+
+    results = asyncio.run(scenario())
+
+    assert len(prompts) == 2
+    assert results[0] == results[1] == results[2] != results[3]
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.core import settings
+from app.models import AIUsage, Product
+from app.services import openai_service
+from app.services.ai_providers import Completion
+from app.services.ai_usage import usage_summary
+from app.services.prompt_format import format_reviews
+from app.utils.tokens import context_window, estimate_tokens, fit_lines
+
+
+def test_estimate_tokens_by_script():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("the cat sat") == 3
+    assert estimate_tokens("Отличный товар") == 4 + 2
+    assert estimate_tokens("2024, ok!") == 2 + 1 + 1 + 1
+    assert estimate_tokens("a\n\nb") == 3
+
+
+def test_context_window_by_longest_prefix():
+    assert context_window("gpt-4o-mini") == 128000
+    assert context_window("gpt-4-0613") == 8192
+    assert context_window("my-local-model") == 8192
+
+
+def test_fit_lines_keeps_priority_order_within_budget():
+    lines = ["aaaa", "bbbb", "cccc"] # one token plus the newline each
+    assert fit_lines(lines, 10, priority=lambda i: i) == [0, 1, 2]
+    assert fit_lines(lines, 4, priority=lambda i: -i) == [1, 2]
+
+
+@pytest.fixture
+def local_ai(monkeypatch):
+    monkeypatch.setattr(settings, "AI_PROVIDER", "local")
+    monkeypatch.setattr(settings, "AI_LOCAL_LATENCY", 0)
+    monkeypatch.setattr(settings, "OPENAI_COMPLETION_TOKENS", 0)
+    monkeypatch.setattr(openai_service, "router", None)
+    return monkeypatch
+
+
+def review(importance, rating, text="отзыв " * 20):
+    return {"importance": importance, "text": text, "rating": rating}
+
+
+async def test_overflow_is_truncated_by_importance_then_rating(local_ai):
+    reviews = [review(10, 50), review(100, 50), review(10, 5), review(10, None)]
+    formatted = format_reviews(reviews, "table")
+    header = f"Проанализируй отзывы\n{formatted.legend}\n{openai_service.REVIEWS_CAPTION}"
+    kept_cost = sum(estimate_tokens(formatted.rows[i]) + 1 for i in (1, 2))
+    local_ai.setattr(settings, "OPENAI_CONTEXT_TOKENS", estimate_tokens(header) + 1 + kept_cost + 7)
+
+    lines = openai_service.fit_reviews(header, reviews, formatted.rows, settings.OPENAI_MODEL)
+
+    assert lines == [formatted.rows[1], formatted.rows[2]]
+    result = await openai_service.analyze_reviews(reviews, db=None)
+    assert "Проанализировано отзывов: 2 из 4" in result
+
+
+async def test_reject_mode_fails_before_any_call(local_ai):
+    local_ai.setattr(settings, "AI_PROMPT_OVERFLOW", "reject")
+    local_ai.setattr(settings, "OPENAI_CONTEXT_TOKENS", 100)
+
+    async def no_call(prompt, model):
+        raise AssertionError("the provider must not be called")
+
+    local_ai.setattr(openai_service, "_complete", no_call)
+    with pytest.raises(HTTPException) as error:
+        await openai_service.analyze_reviews([review(100, 50)] * 10, db=None)
+    assert error.value.status_code == 413
+
+
+async def test_usage_is_recorded_once_per_call_and_summarized(local_ai, monkeypatch, db, user):
+    calls = []
+
+    async def fake_complete(prompt, model):
+        calls.append(prompt)
+        await asyncio.sleep(0.05)
+        return Completion("ok", "https://api.example/v1", model, prompt_tokens=1000, completion_tokens=200)
+
+    monkeypatch.setattr(openai_service, "_complete", fake_complete)
+    monkeypatch.setattr(settings, "OPENAI_PROMPT_PRICE", 1.0)
+    monkeypatch.setattr(settings, "OPENAI_COMPLETION_PRICE", 2.0)
+
+    products = [Product(name=name, user_id=user.id) for name in ("A", "B")]
+    db.add_all(products)
+    await db.flush()
+
+    # The same prompt twice at once is one call, recorded once
+    await asyncio.gather(*(
+        openai_service.analyze_reviews([review(100, 90)], db=db, user_id=user.id, product_id=products[0].id)
+        for _ in range(2)
+    ))
+    await openai_service.analyze_reviews([review(100, 10)], db=db, user_id=user.id, product_id=products[1].id)
+    await db.commit()
+
+    rows = (await db.execute(select(AIUsage).order_by(AIUsage.id))).scalars().all()
+    by_product = await usage_summary(db, "product", days=1)
+    by_user = await usage_summary(db, "user", days=1, user=user)
+
+    assert len(calls) == 2 and len(rows) == 2
+    assert rows[0].prompt_tokens == 1000 and rows[0].reviews_sent == 1 and rows[0].estimated_tokens > 0
+    assert rows[0].cost == pytest.approx(0.0014)
+    assert [item["calls"] for item in by_product] == [1, 1]
+    assert by_user[0]["calls"] == 2 and by_user[0]["cost"] == pytest.approx(0.0028)
@@ -0,0 +1,48 @@
+import os
+import time
+
+from app.models import ImageVariant, ProductImage
+from app.services.upload_gc import collect_garbage, sweep
+
+OLD = time.time() - 7 * 24 * 3600
+
+
+def write(root, rel_path, age=OLD):
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * 10)
+    os.utime(path, (age, age))
+
+
+def test_sweep_removes_only_old_unreferenced_files(tmp_path):
+    for rel_path in ("keep.png", "blobs/ab/orphan.png", "blobs/cd/orphan2.png", ".upload-dead"):
+        write(tmp_path, rel_path)
+    write(tmp_path, "fresh.png", age=time.time())
+    write(tmp_path, ".gitkeep")
+
+    dry = sweep(str(tmp_path), {"keep.png"}, grace_seconds=3600, batch_size=2, dry_run=True)
+    assert (dry.scanned, dry.referenced, dry.too_recent, dry.orphaned, dry.deleted) == (5, 1, 1, 3, 0)
+    assert sorted(dry.sample) == [".upload-dead", "blobs/ab/orphan.png", "blobs/cd/orphan2.png"]
+    assert (tmp_path / "blobs/ab/orphan.png").exists()
+
+    report = sweep(str(tmp_path), {"keep.png"}, grace_seconds=3600, batch_size=2)
+    assert report.deleted == 3 and report.orphaned_bytes == 30
+    remaining = sorted(os.listdir(tmp_path))
+    assert remaining == [".gitkeep", "blobs", "fresh.png", "keep.png"]
+    assert os.listdir(tmp_path / "blobs") == [] # emptied prefix directories are removed
+
+
+async def test_collect_garbage_keeps_paths_referenced_in_db(tmp_path, db, user, product):
+    write(tmp_path, "blobs/aa/main.jpg")
+    write(tmp_path, "variants/aa/main-320w.webp")
+    write(tmp_path, "deleted.jpg")
+    db.add(ProductImage(product_id=product.id, user_id=user.id, image_path="blobs/aa/main.jpg", is_main=True, variants=[
+        ImageVariant(width=320, format="webp", path="variants/aa/main-320w.webp"),
+    ]))
+    await db.commit()
+
+    report = await collect_garbage(db, str(tmp_path), grace_seconds=60, batch_size=10)
+
+    assert (report.referenced, report.deleted) == (2, 1)
+    assert not (tmp_path / "deleted.jpg").exists()
+    assert (tmp_path / "variants/aa/main-320w.webp").exists()
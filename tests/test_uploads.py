@@ -0,0 +1,37 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.utils.uploads import receive_upload, store_upload
+
+
+def make_upload(content: bytes, name: str = "photo.JPG", known_size: bool = True) -> UploadFile:
+    return UploadFile(io.BytesIO(content), filename=name, size=len(content) if known_size else None)
+
+
+def test_upload_is_streamed_hashed_and_renamed(tmp_path):
+    content = os.urandom(300_000)
+
+    async def scenario():
+        received = await receive_upload(make_upload(content), str(tmp_path), max_bytes=1_000_000, chunk_size=64 * 1024)
+        return received, await store_upload(received, f"{received.sha256}{received.extension}")
+
+    received, filename = asyncio.run(scenario())
+    assert received.size == len(content)
+    assert received.sha256 == hashlib.sha256(content).hexdigest()
+    assert filename.endswith(".jpg")
+    assert (tmp_path / filename).read_bytes() == content
+    assert os.listdir(tmp_path) == [filename]
+
+
+@pytest.mark.parametrize("known_size", [True, False])
+def test_oversized_upload_is_rejected_without_leftovers(tmp_path, known_size):
+    upload = make_upload(b"x" * 5000, known_size=known_size)
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(receive_upload(upload, str(tmp_path), max_bytes=4096, chunk_size=1024))
+    assert exc_info.value.status_code == 413
+    assert os.listdir(tmp_path) == []